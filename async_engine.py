@@ -0,0 +1,400 @@
+# async_engine.py
+# PostgreSQL queries multiplexed on one I/O thread with psycopg2's asynchronous
+# connections, as an alternative to blocking one QThreadPool thread per query.
+import collections
+import concurrent.futures
+import selectors
+import socket
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions
+
+from connection_pool import IDLE_TIMEOUT_SEC, RESET_SESSION_SQL, _pool_key
+from query_worker import PG_CONNECT_TIMEOUT_SEC, PG_KEEPALIVE_OPTIONS
+from result_store import DEFAULT_TAB_BUDGET_BYTES, FETCH_BATCH_ROWS, RowStore
+from sql_params import to_pyformat
+
+# Queries beyond this wait in the engine's queue, like runnables beyond maxThreadCount
+MAX_IN_FLIGHT = 64
+MAX_IDLE_PER_CONNECTION = 4
+# Threads that drain finished results into RowStores, which may spill to disk
+DRAIN_WORKERS = 4
+# How often the loop wakes with nothing ready, to expire idle connections and connect attempts
+LOOP_TICK_SEC = 0.5
+
+_CONNECTING = "connecting"
+_EXECUTING = "executing"
+
+
+class AsyncQuery:
+    """One query submitted to the engine; cancel() matches RunnableQuery.cancel()."""
+
+    def __init__(self, engine, conn_data, query, signals, params, memory_budget_bytes):
+        self.engine = engine
+        self.conn_data = conn_data
+        self.query = query
+        self.signals = signals
+        self.params = params
+        self.memory_budget_bytes = memory_budget_bytes
+        self.conn = None
+        self.cursor = None
+        self.phase = _CONNECTING
+        self.fd = None
+        self.backend_pid = None
+        self.start_time = time.time()
+        self.connect_deadline = None
+        self._is_cancelled = False
+
+    @property
+    def is_cancelled(self):
+        return self._is_cancelled
+
+    def cancel(self):
+        self._is_cancelled = True
+        self.engine._wake()
+
+
+class _SessionReset:
+    """A finished query's connection, clearing its session state before it goes idle."""
+
+    def __init__(self, conn_data, conn):
+        self.conn_data = conn_data
+        self.conn = conn
+        self.cursor = None  # psycopg2 only keeps a weak reference to an async cursor
+        self.fd = None
+
+
+class AsyncQueryEngine:
+    """Runs submitted PostgreSQL queries on a single background I/O thread.
+
+    Results are delivered through each query's QuerySignals with the same
+    arguments RunnableQuery emits, so the result handlers don't change. Async
+    connections are always in autocommit mode and can't use named cursors, so
+    the whole result arrives in libpq before it is streamed into a RowStore;
+    that happens on a drain thread so the loop never waits on a spill.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._pending = collections.deque()
+        self._in_flight = set()
+        self._idle = {}  # pool key -> [(connection, last_used), ...]
+        self._resetting = set()
+        self._drained = collections.deque()  # (conn_data, connection) back from the drain threads
+        self._drainers = concurrent.futures.ThreadPoolExecutor(
+            DRAIN_WORKERS, thread_name_prefix="async-query-drain")
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ, None)
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def active_count(self):
+        return len(self._in_flight)
+
+    def submit(self, conn_data, query, signals, params=None,
+               memory_budget_bytes=DEFAULT_TAB_BUDGET_BYTES):
+        if not conn_data or conn_data.get("db_path"):
+            raise ValueError("The async engine only runs PostgreSQL connections.")
+        job = AsyncQuery(self, conn_data, query, signals, params, memory_budget_bytes)
+        with self._lock:
+            self._pending.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="async-query-engine", daemon=True)
+                self._thread.start()
+        self._wake()
+        return job
+
+    def stop(self, timeout=5):
+        """Stops the loop; running queries are abandoned and every connection closed."""
+        self._stopping = True
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._drainers.shutdown(wait=False)
+
+    def _wake(self):
+        try:
+            self._wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Buffer full means a wake-up is already pending
+
+    # --- I/O loop (engine thread only) ---
+    def _run(self):
+        last_expiry = time.time()
+        try:
+            while not self._stopping:
+                self._reset_drained()
+                self._start_pending()
+                for key, _ in self._selector.select(LOOP_TICK_SEC):
+                    if key.data is None:
+                        self._drain_wake()
+                    elif key.data in self._in_flight:
+                        self._advance(key.data)
+                    elif key.data in self._resetting:
+                        self._advance_reset(key.data)
+                self._check_in_flight()
+                if time.time() - last_expiry > LOOP_TICK_SEC * 20:
+                    self._expire_idle()
+                    last_expiry = time.time()
+        finally:
+            for job in list(self._in_flight) + list(self._pending):
+                self._drop(job)
+            for reset in self._resetting:
+                self._close(reset.conn)
+            self._reset_drained()
+            for conns in self._idle.values():
+                for conn, _ in conns:
+                    self._close(conn)
+            self._idle.clear()
+
+    def _drain_wake(self):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _start_pending(self):
+        while len(self._in_flight) < self.max_in_flight:
+            with self._lock:
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+            if job.is_cancelled:
+                continue
+            self._in_flight.add(job)
+            conn = self._take_idle(job.conn_data)
+            try:
+                if conn is not None:
+                    job.conn = conn
+                    self._send_query(job)
+                else:
+                    data = job.conn_data
+                    job.conn = psycopg2.connect(
+                        host=data["host"], database=data["database"],
+                        user=data["user"], password=data["password"],
+                        port=int(data["port"]), async_=1, **PG_KEEPALIVE_OPTIONS)
+                    # libpq ignores connect_timeout for non-blocking connects
+                    job.connect_deadline = time.time() + PG_CONNECT_TIMEOUT_SEC
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            self._advance(job)
+
+    def _send_query(self, job):
+        job.phase = _EXECUTING
+        job.backend_pid = job.conn.get_backend_pid()
+        job.cursor = job.conn.cursor()
+        if job.params is None:
+            job.cursor.execute(job.query)
+        else:
+            job.cursor.execute(to_pyformat(job.query), job.params)
+
+    def _advance(self, job):
+        """Polls the job's connection and moves it on as far as it can go without blocking."""
+        while True:
+            try:
+                state = job.conn.poll()
+                if state == extensions.POLL_OK and job.phase == _CONNECTING:
+                    self._send_query(job)
+                    continue
+            except Exception as e:
+                self._fail(job, e)
+                return
+            if state == extensions.POLL_OK:
+                self._complete(job)
+            elif state == extensions.POLL_READ:
+                self._watch(job, selectors.EVENT_READ)
+            elif state == extensions.POLL_WRITE:
+                self._watch(job, selectors.EVENT_WRITE)
+            else:
+                self._fail(job, psycopg2.OperationalError(f"Unexpected poll state {state}"))
+            return
+
+    def _watch(self, job, events):
+        fd = job.conn.fileno()
+        if job.fd is not None and job.fd != fd:
+            # libpq may move to another socket while trying the host's addresses
+            self._unwatch(job)
+        if job.fd is None:
+            self._selector.register(fd, events, job)
+            job.fd = fd
+        else:
+            self._selector.modify(fd, events, job)
+
+    def _unwatch(self, job):
+        if job.fd is not None:
+            try:
+                self._selector.unregister(job.fd)
+            except (KeyError, ValueError):
+                pass
+            job.fd = None
+
+    def _check_in_flight(self):
+        now = time.time()
+        for job in list(self._in_flight):
+            if job.is_cancelled:
+                self._drop(job)
+            elif job.phase == _CONNECTING and job.connect_deadline and now > job.connect_deadline:
+                self._fail(job, psycopg2.OperationalError("timeout expired"))
+
+    def _complete(self, job):
+        self._unwatch(job)
+        self._in_flight.discard(job)
+        self._drainers.submit(self._drain, job)
+
+    def _drain(self, job):
+        """Drain thread: reads the finished result, then hands the connection back to the loop."""
+        try:
+            is_select_query = job.query.lower().strip().startswith("select")
+            row_count = 0
+            results = []
+            columns = []
+            if is_select_query and job.cursor.description:
+                columns = [desc[0] for desc in job.cursor.description]
+                results = RowStore(len(columns), job.memory_budget_bytes)
+                try:
+                    batch = job.cursor.fetchmany(FETCH_BATCH_ROWS)
+                    while batch:
+                        results.extend(batch)
+                        batch = job.cursor.fetchmany(FETCH_BATCH_ROWS)
+                except Exception:
+                    results.release()
+                    raise
+                row_count = len(results)
+            elif not is_select_query:
+                row_count = job.cursor.rowcount if job.cursor.rowcount != -1 else 0
+        except Exception as e:
+            self._close(job.conn)
+            if not job.is_cancelled:
+                job.signals.error.emit(str(e))
+            return
+        job.cursor.close()
+        with self._lock:
+            stopping = self._stopping
+            if not stopping:
+                self._drained.append((job.conn_data, job.conn))
+        if stopping:
+            self._close(job.conn)
+        else:
+            self._wake()
+        if job.is_cancelled:
+            if isinstance(results, RowStore):
+                results.release()
+            return
+        job.signals.finished.emit(
+            job.conn_data, job.query, results, columns, row_count,
+            time.time() - job.start_time, is_select_query)
+
+    def _reset_drained(self):
+        while True:
+            with self._lock:
+                if not self._drained:
+                    return
+                conn_data, conn = self._drained.popleft()
+            if self._stopping:
+                self._close(conn)
+            else:
+                self._reset_session(conn_data, conn)
+
+    def _fail(self, job, error):
+        self._unwatch(job)
+        self._in_flight.discard(job)
+        self._close(job.conn)
+        if not job.is_cancelled:
+            job.signals.error.emit(str(error))
+
+    def _drop(self, job):
+        """Abandons a cancelled job: the server is asked to stop, then the connection is closed."""
+        self._unwatch(job)
+        self._in_flight.discard(job)
+        if job.conn is not None and job.phase == _EXECUTING:
+            # cancel() blocks on its own connection to the server, so it can't run on the loop
+            threading.Thread(target=self._cancel_and_close, args=(job.conn,),
+                             name="async-query-cancel", daemon=True).start()
+        else:
+            self._close(job.conn)
+
+    def _cancel_and_close(self, conn):
+        try:
+            conn.cancel()
+        except Exception:
+            pass
+        self._close(conn)
+
+    # --- Idle connections, reused for the next query on the same saved connection ---
+    def _take_idle(self, conn_data):
+        idle = self._idle.get(_pool_key(conn_data))
+        while idle:
+            conn, _ = idle.pop()
+            if not conn.closed:
+                return conn
+        return None
+
+    def _reset_session(self, conn_data, conn):
+        """Sends RESET_SESSION_SQL (the session's SETs, temp tables, advisory locks...);
+        the connection goes idle once the reply is in."""
+        reset = _SessionReset(conn_data, conn)
+        try:
+            reset.cursor = conn.cursor()
+            reset.cursor.execute(RESET_SESSION_SQL)
+        except Exception:
+            self._close(conn)
+            return
+        self._resetting.add(reset)
+        self._advance_reset(reset)
+
+    def _advance_reset(self, reset):
+        try:
+            state = reset.conn.poll()
+        except Exception:
+            state = None
+        if state in (extensions.POLL_READ, extensions.POLL_WRITE):
+            events = selectors.EVENT_READ if state == extensions.POLL_READ else selectors.EVENT_WRITE
+            if reset.fd is None:
+                reset.fd = reset.conn.fileno()
+                self._selector.register(reset.fd, events, reset)
+            else:
+                self._selector.modify(reset.fd, events, reset)
+            return
+        if reset.fd is not None:
+            self._selector.unregister(reset.fd)
+        self._resetting.discard(reset)
+        reset.cursor = None
+        if state == extensions.POLL_OK:
+            self._release_idle(reset.conn_data, reset.conn)
+        else:
+            self._close(reset.conn)
+
+    def _release_idle(self, conn_data, conn):
+        idle = self._idle.setdefault(_pool_key(conn_data), [])
+        if conn.closed or len(idle) >= MAX_IDLE_PER_CONNECTION:
+            self._close(conn)
+        else:
+            idle.append((conn, time.time()))
+
+    def _expire_idle(self):
+        now = time.time()
+        for key, idle in self._idle.items():
+            keep = []
+            for conn, last_used in idle:
+                if conn.closed or now - last_used > IDLE_TIMEOUT_SEC:
+                    self._close(conn)
+                else:
+                    keep.append((conn, last_used))
+            self._idle[key] = keep
+
+    def _close(self, conn):
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
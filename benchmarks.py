@@ -0,0 +1,219 @@
+# benchmarks.py
+# Command-line benchmarks for the query execution paths, run outside the GUI:
+#   python benchmarks.py async-engine --host localhost --database postgres --user postgres
+#   python benchmarks.py sqlite-profile /path/to/large.db
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # Unix only; used for context-switch counts
+except ImportError:
+    resource = None
+
+from async_engine import AsyncQueryEngine
+from query_worker import RunnableQuery, open_connection
+from result_store import FETCH_BATCH_ROWS
+from sqlite_profile import BROWSING_PROFILE, describe
+
+DEFAULT_QUERY = "SELECT pg_sleep(0.05), g FROM generate_series(1, 100) AS g;"
+
+
+class _Emitter:
+    def __init__(self, callback):
+        self.emit = callback
+
+
+class _Signals:
+    """Stands in for QuerySignals; both engines call finished/error/progress.emit."""
+
+    def __init__(self, on_finished, on_error):
+        self.finished = _Emitter(on_finished)
+        self.error = _Emitter(on_error)
+        self.progress = _Emitter(lambda rows, rate: None)
+
+
+class _Run:
+    """Collects completions and samples the process thread count while queries run."""
+
+    def __init__(self, total):
+        self.total = total
+        self.latencies = []
+        self.errors = []
+        self.peak_threads = threading.active_count()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def signals(self):
+        submitted = time.perf_counter()
+
+        def finished(conn_data, query, results, columns, row_count, elapsed, is_select):
+            if hasattr(results, "release"):
+                results.release()
+            self._record(time.perf_counter() - submitted)
+
+        def error(message):
+            self.errors.append(message)
+            self._record(None)
+
+        return _Signals(finished, error)
+
+    def _record(self, latency):
+        with self._lock:
+            if latency is not None:
+                self.latencies.append(latency)
+            if len(self.latencies) + len(self.errors) >= self.total:
+                self._done.set()
+
+    def wait(self):
+        while not self._done.wait(0.01):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+
+
+def _context_switches():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_nvcsw + usage.ru_nivcsw
+
+
+def run_threads(conn_data, query, concurrency, max_connections):
+    """Thread-per-query: each query blocks a worker thread, as RunnableQuery does in QThreadPool."""
+    run = _Run(concurrency)
+    with ThreadPoolExecutor(max_workers=min(concurrency, max_connections)) as executor:
+        for _ in range(concurrency):
+            executor.submit(RunnableQuery(conn_data, query, run.signals()).run)
+        run.wait()
+    return run
+
+
+def run_async_engine(conn_data, query, concurrency, max_connections):
+    run = _Run(concurrency)
+    engine = AsyncQueryEngine(max_in_flight=max_connections)
+    try:
+        for _ in range(concurrency):
+            engine.submit(conn_data, query, run.signals())
+        run.wait()
+    finally:
+        engine.stop()
+    return run
+
+
+def _measure(runner, conn_data, query, concurrency, max_connections):
+    switches = _context_switches()
+    cpu = time.process_time()
+    start = time.perf_counter()
+    run = runner(conn_data, query, concurrency, max_connections)
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    if switches is not None:
+        switches = _context_switches() - switches
+    latencies = sorted(run.latencies) or [0.0]
+    return {
+        "wall": wall, "qps": len(run.latencies) / wall if wall else 0.0, "cpu": cpu,
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "threads": run.peak_threads, "switches": switches, "errors": len(run.errors),
+        "first_error": run.errors[0] if run.errors else None,
+    }
+
+
+def benchmark_async_engine(args):
+    conn_data = {"id": None, "host": args.host, "port": args.port, "database": args.database,
+                 "user": args.user, "password": args.password}
+    runners = (("threads", run_threads), ("async", run_async_engine))
+    header = (f"{'concurrency':>11} {'engine':>8} {'wall s':>8} {'q/s':>8} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'cpu s':>7} {'threads':>7} {'ctx sw':>8} {'errors':>6}")
+    print(header)
+    print("-" * len(header))
+    for concurrency in args.concurrency:
+        for name, runner in runners:
+            stats = _measure(runner, conn_data, args.query, concurrency, args.max_connections)
+            switches = "n/a" if stats["switches"] is None else f"{stats['switches']:,}"
+            print(f"{concurrency:>11} {name:>8} {stats['wall']:>8.2f} {stats['qps']:>8.1f} "
+                  f"{stats['p50'] * 1000:>8.1f} {stats['p95'] * 1000:>8.1f} {stats['cpu']:>7.2f} "
+                  f"{stats['threads']:>7} {switches:>8} {stats['errors']:>6}")
+            if stats["first_error"]:
+                print(f"{'':>11} first error: {stats['first_error']}")
+
+
+def _largest_table_scan(db_path):
+    conn = open_connection({"db_path": db_path})
+    try:
+        sizes = []
+        for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            quoted = '"{}"'.format(name.replace('"', '""'))
+            try:
+                sizes.append((conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {quoted}").fetchone()[0], quoted))
+            except Exception:
+                pass  # WITHOUT ROWID
+    finally:
+        conn.close()
+    if not sizes:
+        raise SystemExit("No tables found; pass --query.")
+    return f"SELECT * FROM {max(sizes)[1]}"
+
+
+def benchmark_sqlite_profile(args):
+    """Full fetch of a query with default settings vs the browsing profile."""
+    query = args.query or _largest_table_scan(args.path)
+    print(f"Query: {query}")
+    for name, profile in (("default", None), ("browsing", BROWSING_PROFILE)):
+        conn = open_connection({"db_path": args.path, "sqlite_profile": profile})
+        timings = []
+        rows = 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            cursor = conn.execute(query)
+            rows = 0
+            batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+            while batch:
+                rows += len(batch)
+                batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+            timings.append(time.perf_counter() - start)
+        try:
+            conn.execute("CREATE TABLE sqlclient_profile_write_check (x)")
+            conn.rollback()
+            conn.execute("DROP TABLE IF EXISTS sqlclient_profile_write_check")
+            writes = "allowed"
+        except Exception:
+            writes = "refused"
+        conn.close()
+        print(f"{name:>9}: {rows:,} rows | first {timings[0]:.3f} s | "
+              f"median {statistics.median(timings):.3f} s | writes {writes} | {describe(profile)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQL client execution benchmarks")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    engine = subcommands.add_parser(
+        "async-engine", help="Thread-per-query vs the single-thread async engine (PostgreSQL)")
+    engine.add_argument("--host", default="localhost")
+    engine.add_argument("--port", type=int, default=5432)
+    engine.add_argument("--database", default="postgres")
+    engine.add_argument("--user", default=os.environ.get("PGUSER", "postgres"))
+    engine.add_argument("--password", default=os.environ.get("PGPASSWORD", ""))
+    engine.add_argument("--query", default=DEFAULT_QUERY)
+    engine.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    # Both engines open at most this many connections at once; keep it under max_connections
+    engine.add_argument("--max-connections", type=int, default=90)
+    engine.set_defaults(handler=benchmark_async_engine)
+
+    sqlite_profile = subcommands.add_parser(
+        "sqlite-profile", help="Default SQLite settings vs the read-only browsing profile")
+    sqlite_profile.add_argument("path")
+    sqlite_profile.add_argument("--query", help="defaults to SELECT * from the largest table")
+    sqlite_profile.add_argument("--runs", type=int, default=5)
+    sqlite_profile.set_defaults(handler=benchmark_sqlite_profile)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# cell_viewer.py
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QLabel, QApplication
+from PyQt6.QtGui import QFont
+
+from result_decoder import LargeValue
+
+# Hex dumps are capped so a huge blob cannot freeze the viewer
+MAX_HEX_DUMP_BYTES = 4 * 1024 * 1024
+
+
+def hex_dump(data, limit=MAX_HEX_DUMP_BYTES):
+    lines = []
+    view = memoryview(data)[:limit]
+    for offset in range(0, len(view), 16):
+        chunk = view[offset:offset + 16].tobytes()
+        hex_part = " ".join(f"{b:02x}" for b in chunk)
+        text_part = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
+        lines.append(f"{offset:08x}  {hex_part:<47}  {text_part}")
+    if len(data) > limit:
+        lines.append(f"... {len(data) - limit:,} more bytes not shown")
+    return "\n".join(lines)
+
+
+class CellViewerDialog(QDialog):
+    """Shows the full value of a single result cell; decoding happens only here."""
+
+    def __init__(self, parent=None, column_name="", value=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Value of {column_name}")
+        self.resize(720, 480)
+        if isinstance(value, LargeValue):
+            value = value.value
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        self.value = value
+
+        if isinstance(value, (bytes, bytearray)):
+            summary = f"{len(value):,} bytes"
+            text = hex_dump(value)
+        elif value is None:
+            summary = "NULL"
+            text = ""
+        else:
+            text = str(value)
+            summary = f"{len(text):,} characters"
+
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+        self.text_view.setFont(QFont("Consolas", 10))
+        self.text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_view.setPlainText(text)
+
+        copy_btn = QPushButton("Copy")
+        copy_btn.clicked.connect(lambda: QApplication.clipboard().setText(text))
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(QLabel(summary))
+        button_layout.addStretch()
+        button_layout.addWidget(copy_btn)
+        button_layout.addWidget(close_btn)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.text_view)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
@@ -0,0 +1,518 @@
+# change_set.py
+# Edits, inserts and deletes made in the result grid, kept client-side and written
+# back to a single-table query's source table in one transaction.
+import datetime
+import re
+import sqlite3 as sqlite
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+from session import STATE_FAILED, STATE_IDLE
+from table_browser import quote_ident
+from table_copy import describe_table
+
+# Rows per multi-row statement on PostgreSQL; SQLite caps bound variables instead
+PG_ROWS_PER_STATEMENT = 1000
+SQLITE_MAX_VARIABLES = 999
+PREVIEW_ROWS = 20
+
+_IDENT = r'"(?:[^"]|"")+"|[A-Za-z_][\w$]*'
+_SINGLE_TABLE = re.compile(
+    rf"^\s*select\s+(?P<items>.+?)\s+from\s+(?P<table>(?:{_IDENT})(?:\s*\.\s*(?:{_IDENT}))?)"
+    rf"(?:\s+(?:as\s+)?(?!where\b|order\b|limit\b|offset\b|fetch\b|for\b)(?:{_IDENT}))?"
+    r"\s*(?:(?:where|order|limit|offset|fetch|for)\b.*)?;?\s*$",
+    re.IGNORECASE | re.DOTALL)
+# Anything that makes result rows stop mapping one-to-one onto table rows
+_NOT_SINGLE_TABLE = re.compile(
+    r"\b(join|group\s+by|having|union|intersect|except|distinct|window|over)\b", re.IGNORECASE)
+
+Statement = namedtuple("Statement", "sql params expected many")
+
+
+def _unquote(name, kind):
+    name = name.strip()
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    # PostgreSQL folds unquoted names to lower case; SQLite matches them case-insensitively
+    return name.lower() if kind == "postgres" else name
+
+
+def _split_top_level(text):
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+def detect_table(query, kind):
+    """(schema or None, table, plain column names or None for *) for a single-table SELECT, else None."""
+    match = _SINGLE_TABLE.match(query)
+    if not match or _NOT_SINGLE_TABLE.search(query) or "(" in match.group("table"):
+        return None
+    parts = re.findall(_IDENT, match.group("table"))
+    schema = _unquote(parts[0], kind) if len(parts) == 2 else None
+    table = _unquote(parts[-1], kind)
+    plain = set()
+    for item in _split_top_level(match.group("items")):
+        if re.fullmatch(rf"(?:(?:{_IDENT})\s*\.\s*)?\*", item):
+            return schema, table, None
+        names = re.fullmatch(rf"(?:(?:{_IDENT})\s*\.\s*)?({_IDENT})", item)
+        if names:
+            plain.add(_unquote(names.group(1), kind))
+    return schema, table, plain
+
+
+class EditTarget:
+    """Where a result's rows came from: table, column types and which result columns map to it."""
+
+    def __init__(self, kind, schema, table, columns, types, key_positions, editable):
+        self.kind = kind
+        self.schema = schema
+        self.table = table
+        self.columns = columns              # result position -> table column name (None if not editable)
+        self.types = types                  # table column name -> declared type
+        self.key_positions = key_positions  # result positions of the primary key, in key order
+        self.editable = editable            # set of editable result positions
+
+    @property
+    def qualified(self):
+        if self.kind == "postgres":
+            return f"{quote_ident(self.schema)}.{quote_ident(self.table)}"
+        return quote_ident(self.table)
+
+
+def resolve_target(conn, kind, query, result_columns):
+    """The EditTarget for a query's result; raises ValueError when it can't be edited."""
+    detected = detect_table(query, kind)
+    if detected is None:
+        raise ValueError("Only results of a SELECT from a single table (no joins, grouping "
+                         "or DISTINCT) can be edited.")
+    schema, table, plain = detected
+    cursor = conn.cursor()
+    if kind == "postgres":
+        name = f"{quote_ident(schema)}.{quote_ident(table)}" if schema else quote_ident(table)
+        cursor.execute("""
+            SELECT n.nspname, c.relname, c.relkind
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.oid = to_regclass(%s)
+        """, (name,))
+        found = cursor.fetchone()
+        if found is None or found[2] not in ("r", "p"):
+            raise ValueError(f"{name} is not a table.")
+        schema, table = found[0], found[1]
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE",
+                       (table,))
+        found = cursor.fetchone()
+        if found is None:
+            raise ValueError(f"{table} is not a table.")
+        table = found[0]
+    table_columns, primary_key = describe_table(conn, kind, schema, table)
+    if not primary_key:
+        raise ValueError(f"{table} has no primary key, so edited rows can't be identified.")
+
+    def fold(name):
+        return name.lower() if kind == "sqlite" else name
+
+    declared = {fold(name): (name, col_type) for name, col_type, _ in table_columns}
+    allowed = None if plain is None else {fold(name) for name in plain}
+    counts = {}
+    for name in result_columns:
+        counts[fold(name)] = counts.get(fold(name), 0) + 1
+    columns = []
+    for name in result_columns:
+        key = fold(name)
+        # Expressions and duplicated names can't be traced back to one table column
+        mapped = key in declared and counts[key] == 1 and (allowed is None or key in allowed)
+        columns.append(declared[key][0] if mapped else None)
+    key_positions = []
+    for key_column in primary_key:
+        if key_column not in columns:
+            raise ValueError(f"The result must include the primary key column {key_column}.")
+        key_positions.append(columns.index(key_column))
+    editable = {position for position, name in enumerate(columns) if name is not None}
+    types = {name: col_type for name, col_type in declared.values()}
+    return EditTarget(kind, schema, table, columns, types, key_positions, editable)
+
+
+def coerce(text, original):
+    """Types text typed into a cell like the value it replaces; NULL clears the cell."""
+    if text.strip().upper() == "NULL":
+        return None
+    stripped = text.strip()
+    try:
+        if isinstance(original, bool):
+            if stripped.lower() in ("t", "true", "1", "yes", "on"):
+                return True
+            if stripped.lower() in ("f", "false", "0", "no", "off"):
+                return False
+        elif isinstance(original, int):
+            return int(stripped)
+        elif isinstance(original, float):
+            return float(stripped)
+        elif isinstance(original, Decimal):
+            return Decimal(stripped)
+    except (ValueError, InvalidOperation):
+        pass
+    # Anything else goes as text and the server casts it to the column type
+    return text
+
+
+class ChangeSet:
+    """Pending changes to an EditTarget's rows, keyed by source row number."""
+
+    def __init__(self, target):
+        self.target = target
+        self.updates = {}     # source row -> {result position: new value}
+        self.deleted = set()  # source rows
+        self.inserted = []    # [{result position: value}, ...]
+
+    def is_empty(self):
+        return not (self.updates or self.deleted or self.inserted)
+
+    def clear(self):
+        self.updates.clear()
+        self.deleted.clear()
+        self.inserted.clear()
+
+    def set_value(self, source_row, position, value, original):
+        edits = self.updates.setdefault(source_row, {})
+        if value == original and type(value) is type(original):
+            edits.pop(position, None)  # Edited back to what the database has
+            if not edits:
+                del self.updates[source_row]
+        else:
+            edits[position] = value
+
+    def summary(self):
+        parts = []
+        if self.updates:
+            parts.append(f"{len(self.updates):,} updated")
+        if self.inserted:
+            parts.append(f"{len(self.inserted):,} inserted")
+        if self.deleted:
+            parts.append(f"{len(self.deleted):,} deleted")
+        return ", ".join(parts) or "no changes"
+
+    # --- Statements ---
+    def statements(self, original_value, limit=None):
+        """The DML for every change, as few statements as possible; limit caps rows per group (preview)."""
+        target = self.target
+        builders = _SqliteBuilder(target) if target.kind == "sqlite" else _PostgresBuilder(target)
+
+        def key_of(source_row):
+            return tuple(original_value(source_row, p) for p in target.key_positions)
+
+        statements = []
+        deleted = sorted(self.deleted)[:limit]
+        if deleted:
+            statements.extend(builders.delete([key_of(row) for row in deleted]))
+        # Rows are grouped by the set of columns they change, one statement (or batch) per group
+        groups = {}
+        for source_row in sorted(self.updates):
+            if source_row in self.deleted:
+                continue
+            edits = self.updates[source_row]
+            groups.setdefault(tuple(sorted(edits)), []).append(
+                (key_of(source_row), tuple(edits[p] for p in sorted(edits))))
+        for positions, rows in groups.items():
+            statements.extend(builders.update(positions, rows[:limit]))
+        groups = {}
+        for values in self.inserted:
+            positions = tuple(sorted(p for p in values if p in target.editable))
+            groups.setdefault(positions, []).append(tuple(values[p] for p in positions))
+        for positions, rows in groups.items():
+            statements.extend(builders.insert(positions, rows[:limit]))
+        return statements
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), max(1, size)):
+        yield rows[start:start + size]
+
+
+class _SqliteBuilder:
+    """SQLite runs in-process, so executemany costs no round trips; deletes use one IN list per chunk."""
+
+    def __init__(self, target):
+        self.target = target
+        self.keys = [quote_ident(target.columns[p]) for p in target.key_positions]
+
+    def _key_match(self, count):
+        if len(self.keys) == 1:
+            return f"{self.keys[0]} IN ({', '.join('?' * count)})"
+        row = f"({', '.join('?' * len(self.keys))})"
+        return f"({', '.join(self.keys)}) IN (VALUES {', '.join([row] * count)})"
+
+    def delete(self, keys):
+        for chunk in _chunks(keys, SQLITE_MAX_VARIABLES // len(self.keys)):
+            sql = f"DELETE FROM {self.target.qualified} WHERE {self._key_match(len(chunk))}"
+            yield Statement(sql, [v for key in chunk for v in key], len(chunk), False)
+
+    def update(self, positions, rows):
+        assignments = ", ".join(f"{quote_ident(self.target.columns[p])} = ?" for p in positions)
+        where = " AND ".join(f"{key} = ?" for key in self.keys)
+        sql = f"UPDATE {self.target.qualified} SET {assignments} WHERE {where}"
+        yield Statement(sql, [values + key for key, values in rows], len(rows), True)
+
+    def insert(self, positions, rows):
+        if not positions:
+            sql = f"INSERT INTO {self.target.qualified} DEFAULT VALUES"
+            yield from (Statement(sql, [], 1, False) for _ in rows)
+            return
+        column_list = ", ".join(quote_ident(self.target.columns[p]) for p in positions)
+        sql = (f"INSERT INTO {self.target.qualified} ({column_list}) "
+               f"VALUES ({', '.join('?' * len(positions))})")
+        yield Statement(sql, list(rows), len(rows), True)
+
+
+class _PostgresBuilder:
+    """psycopg2's executemany is a round trip per row, so rows go in multi-row statements instead."""
+
+    def __init__(self, target):
+        self.target = target
+        self.keys = [target.columns[p] for p in target.key_positions]
+
+    def _ident(self, name):
+        return quote_ident(name).replace("%", "%%")  # % is psycopg2's placeholder character
+
+    def _cast(self, name):
+        return self.target.types.get(name, "text").replace("%", "%%")
+
+    def _values(self, width, count):
+        row = f"({', '.join(['%s'] * width)})"
+        return ", ".join([row] * count)
+
+    def delete(self, keys):
+        key_list = ", ".join(self._ident(k) for k in self.keys)
+        for chunk in _chunks(keys, PG_ROWS_PER_STATEMENT):
+            sql = (f"DELETE FROM {self.target.qualified.replace('%', '%%')} "
+                   f"WHERE ({key_list}) IN ({self._values(len(self.keys), len(chunk))})")
+            yield Statement(sql, [v for key in chunk for v in key], len(chunk), False)
+
+    def update(self, positions, rows):
+        # UPDATE ... FROM (VALUES ...): literals are untyped, so each column is cast to its own type
+        names = [self.target.columns[p] for p in positions]
+        aliases = [f"c{i}" for i in range(len(names))] + [f"k{i}" for i in range(len(self.keys))]
+        assignments = ", ".join(f"{self._ident(n)} = v.c{i}::{self._cast(n)}" for i, n in enumerate(names))
+        where = " AND ".join(f"t.{self._ident(k)} = v.k{i}::{self._cast(k)}" for i, k in enumerate(self.keys))
+        for chunk in _chunks(rows, PG_ROWS_PER_STATEMENT):
+            sql = (f"UPDATE {self.target.qualified.replace('%', '%%')} AS t SET {assignments} "
+                   f"FROM (VALUES {self._values(len(aliases), len(chunk))}) AS v ({', '.join(aliases)}) "
+                   f"WHERE {where}")
+            yield Statement(sql, [v for key, values in chunk for v in values + key], len(chunk), False)
+
+    def insert(self, positions, rows):
+        table = self.target.qualified.replace('%', '%%')
+        if not positions:
+            yield from (Statement(f"INSERT INTO {table} DEFAULT VALUES", [], 1, False) for _ in rows)
+            return
+        column_list = ", ".join(self._ident(self.target.columns[p]) for p in positions)
+        for chunk in _chunks(rows, PG_ROWS_PER_STATEMENT):
+            sql = f"INSERT INTO {table} ({column_list}) VALUES {self._values(len(positions), len(chunk))}"
+            yield Statement(sql, [v for row in chunk for v in row], len(chunk), False)
+
+
+# --- Preview ---
+def _literal(value, kind):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return ("1" if value else "0") if kind == "sqlite" else ("TRUE" if value else "FALSE")
+    if isinstance(value, (int, float, Decimal)):
+        return repr(value) if isinstance(value, float) else str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        hex_value = bytes(value).hex()
+        return f"X'{hex_value}'" if kind == "sqlite" else f"'\\x{hex_value}'::bytea"
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(sep=" ")
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render(statement, kind):
+    """A statement with its parameters inlined as literals, one line per executemany row."""
+    token = re.compile(r'"(?:[^"]|"")*"|\?|%s|%%')
+
+    def fill(params):
+        values = iter(params)
+
+        def replace(match):
+            text = match.group(0)
+            if text.startswith('"'):
+                return text if kind == "sqlite" else text.replace("%%", "%")
+            if text == "%%":
+                return "%"
+            return _literal(next(values), kind)
+        return token.sub(replace, statement.sql) + ";"
+
+    if statement.many:
+        return "\n".join(fill(row) for row in statement.params)
+    return fill(statement.params)
+
+
+def preview(change_set, original_value):
+    """Readable DML for the preview dialog; long batches show their first PREVIEW_ROWS rows."""
+    kind = change_set.target.kind
+    shown = change_set.statements(original_value, limit=PREVIEW_ROWS)
+    full = change_set.statements(original_value)
+    lines = [f"-- {change_set.summary()} row(s) in {change_set.target.qualified}, "
+             f"{len(full):,} statement(s) in one transaction", ""]
+    lines.extend(render(statement, kind) for statement in shown)
+    total_rows = sum(s.expected for s in full)
+    if total_rows > sum(s.expected for s in shown):
+        lines.append(f"\n-- ... {total_rows - sum(s.expected for s in shown):,} more row(s) not shown")
+    return "\n".join(lines)
+
+
+# --- Write-back ---
+def apply_statements(conn, kind, statements, begin=False):
+    """Runs the statements; any row count mismatch raises so the caller rolls back."""
+    cursor = conn.cursor()
+    if begin:
+        cursor.execute("BEGIN")
+    total = 0
+    for statement in statements:
+        if statement.many:
+            cursor.executemany(statement.sql, statement.params)
+        else:
+            cursor.execute(statement.sql, statement.params)
+        if cursor.rowcount != -1 and cursor.rowcount != statement.expected:
+            # Rows changed or vanished since the result was fetched
+            raise ValueError(f"Expected {statement.expected} row(s) to change but {cursor.rowcount} did; "
+                             f"nothing was saved.\n\n{statement.sql}")
+        total += statement.expected
+    return total
+
+
+# --- Signals class for edit target lookups and write-backs ---
+class EditSignals(QObject):
+    resolved = pyqtSignal(object)      # EditTarget
+    applied = pyqtSignal(int, bool)    # rows changed, committed (False: left in the session's transaction)
+    error = pyqtSignal(str)
+
+
+class _Connection:
+    """The tab session's connection if it has one, else a pooled (or new) one."""
+
+    def __init__(self, conn_data, pool=None, session=None):
+        self.conn_data = conn_data
+        self.pool = pool
+        self.session = session
+        self.conn = None
+
+    def __enter__(self):
+        if self.session:
+            self.session.lock.acquire()
+            self.session.busy = True
+            self.conn = self.session.connect()
+        elif self.pool:
+            self.conn = self.pool.acquire(self.conn_data)
+        else:
+            self.conn = open_connection(self.conn_data)
+        return self.conn
+
+    def __exit__(self, *exc_info):
+        if self.session:
+            self.session.busy = False
+            self.session.touch()
+            self.session.lock.release()
+        elif self.pool:
+            self.pool.release(self.conn_data, self.conn)
+        else:
+            self.conn.close()
+
+
+def _kind(conn_data):
+    return "sqlite" if conn_data.get("db_path") else "postgres"
+
+
+class RunnableResolveEditTarget(QRunnable):
+    def __init__(self, conn_data, query, columns, signals, pool=None, session=None):
+        super().__init__()
+        self.conn_data = conn_data
+        self.query = query
+        self.columns = columns
+        self.signals = signals
+        self.pool = pool
+        self.session = session
+
+    def run(self):
+        try:
+            with _Connection(self.conn_data, self.pool, self.session) as conn:
+                target = resolve_target(conn, _kind(self.conn_data), self.query, self.columns)
+            self.signals.resolved.emit(target)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+
+class RunnableApplyChanges(QRunnable):
+    """Writes a change set in one transaction. On a session already inside a
+    transaction, the changes join it and are left for the user to commit."""
+
+    def __init__(self, conn_data, statements, signals, pool=None, session=None):
+        super().__init__()
+        self.conn_data = conn_data
+        self.statements = statements
+        self.signals = signals
+        self.pool = pool
+        self.session = session
+
+    def run(self):
+        kind = _kind(self.conn_data)
+        try:
+            with _Connection(self.conn_data, self.pool, self.session) as conn:
+                if self.session:
+                    state = self.session.state
+                    if state == STATE_FAILED:
+                        raise ValueError("The session's transaction has failed; roll it back first.")
+                    own_transaction = state == STATE_IDLE
+                    savepoint = not own_transaction
+                else:
+                    own_transaction, savepoint = True, False
+                cursor = conn.cursor()
+                if savepoint:
+                    # A failed write-back mustn't abort the user's transaction
+                    cursor.execute("SAVEPOINT sqlclient_changes")
+                try:
+                    # Sessions run in autocommit, so their transaction is begun explicitly
+                    changed = apply_statements(conn, kind, self.statements,
+                                               begin=bool(self.session) and own_transaction)
+                    if savepoint:
+                        cursor.execute("RELEASE SAVEPOINT sqlclient_changes")
+                    elif self.session:
+                        cursor.execute("COMMIT")
+                    else:
+                        conn.commit()
+                except Exception:
+                    self._rollback(conn, cursor, savepoint)
+                    raise
+            self.signals.applied.emit(changed, own_transaction)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+    def _rollback(self, conn, cursor, savepoint):
+        try:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT sqlclient_changes")
+                cursor.execute("RELEASE SAVEPOINT sqlclient_changes")
+            elif self.session:
+                if not isinstance(conn, sqlite.Connection) or conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+            else:
+                conn.rollback()
+        except Exception:
+            pass
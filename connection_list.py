@@ -0,0 +1,81 @@
+# connection_list.py
+from PyQt6.QtCore import Qt, QSortFilterProxyModel
+from PyQt6.QtGui import QStandardItemModel, QStandardItem
+
+USAGE_ROLE = Qt.ItemDataRole.UserRole + 2
+# (category, group) names, so a rename only has to replace the last part of the label
+GROUP_ROLE = Qt.ItemDataRole.UserRole + 3
+
+
+class ConnectionListModel(QStandardItemModel):
+    """One flat 'category -> group -> connection' list shared by every worksheet combo box.
+
+    Each row holds the connection dict under Qt.UserRole, which is what
+    QComboBox.currentData()/itemData() return, and its usage count under USAGE_ROLE.
+    """
+
+    def load(self, joined_items):
+        self.clear()
+        for cat_name, subcat_name, item_name, conn_data in joined_items:
+            self.appendRow(self._make_row(cat_name, subcat_name, conn_data))
+
+    def _make_row(self, cat_name, subcat_name, conn_data):
+        item = QStandardItem(f"{cat_name} -> {subcat_name} -> {conn_data['name']}")
+        item.setData(conn_data, Qt.ItemDataRole.UserRole)
+        item.setData(conn_data.get("usage_count") or 0, USAGE_ROLE)
+        item.setData((cat_name, subcat_name), GROUP_ROLE)
+        return item
+
+    def find_row(self, conn_id):
+        for row in range(self.rowCount()):
+            data = self.item(row).data(Qt.ItemDataRole.UserRole)
+            if data and data.get("id") == conn_id:
+                return row
+        return -1
+
+    def add_connection(self, cat_name, subcat_name, conn_data):
+        self.appendRow(self._make_row(cat_name, subcat_name, conn_data))
+
+    def update_connection(self, conn_data):
+        row = self.find_row(conn_data["id"])
+        if row < 0:
+            return
+        item = self.item(row)
+        cat_name, subcat_name = item.data(GROUP_ROLE)
+        item.setText(f"{cat_name} -> {subcat_name} -> {conn_data['name']}")
+        item.setData(conn_data, Qt.ItemDataRole.UserRole)
+
+    def remove_connection(self, conn_id):
+        row = self.find_row(conn_id)
+        if row >= 0:
+            self.removeRow(row)
+
+    def record_usage(self, conn_id):
+        """Bumps the in-memory usage count; the sorted proxy moves the row up."""
+        row = self.find_row(conn_id)
+        if row < 0:
+            return
+        item = self.item(row)
+        usage = (item.data(USAGE_ROLE) or 0) + 1
+        conn_data = dict(item.data(Qt.ItemDataRole.UserRole))
+        conn_data["usage_count"] = usage
+        item.setData(conn_data, Qt.ItemDataRole.UserRole)
+        item.setData(usage, USAGE_ROLE)
+
+
+class ConnectionSortProxy(QSortFilterProxyModel):
+    """Most used first, then by label, matching get_all_joined_connections' ORDER BY."""
+
+    def __init__(self, source_model, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source_model)
+        self.setSortRole(USAGE_ROLE)
+        self.setDynamicSortFilter(True)
+        self.sort(0, Qt.SortOrder.AscendingOrder)
+
+    def lessThan(self, left, right):
+        left_usage = left.data(USAGE_ROLE) or 0
+        right_usage = right.data(USAGE_ROLE) or 0
+        if left_usage != right_usage:
+            return left_usage > right_usage
+        return (left.data(Qt.ItemDataRole.DisplayRole) or "") < (right.data(Qt.ItemDataRole.DisplayRole) or "")
@@ -0,0 +1,252 @@
+# connection_pool.py
+# Warm, health-checked connections reused across query runs.
+import itertools
+import threading
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+
+MAX_IDLE_PER_CONNECTION = 2
+# Idle connections unused for this long are closed by the health check
+IDLE_TIMEOUT_SEC = 600
+# Connections idle for longer than this are pinged before being handed out
+VALIDATE_AFTER_SEC = 30
+HEALTH_CHECK_INTERVAL_MS = 60000
+# Server-side prepared statements kept per PostgreSQL connection before DEALLOCATE ALL
+MAX_PREPARED_PER_CONNECTION = 100
+# What DISCARD ALL does, minus DEALLOCATE ALL so the pool's prepared statements stay valid.
+# Run when a PostgreSQL connection goes back to the pool, so one run's SET search_path,
+# SET ROLE, temp tables or advisory locks don't carry over to the next borrower.
+RESET_SESSION_SQL = ("CLOSE ALL; RESET ALL; UNLISTEN *; DISCARD TEMP; DISCARD SEQUENCES; "
+                     "SELECT pg_advisory_unlock_all()")
+
+
+def is_poolable(conn_data):
+    # SQLite connections are pooled too, so their statement cache survives between runs
+    return bool(conn_data)
+
+
+def is_closed(conn):
+    closed = getattr(conn, "closed", None)
+    if closed is not None:
+        return bool(closed)
+    try:
+        conn.total_changes  # sqlite3 raises ProgrammingError once closed
+        return False
+    except Exception:
+        return True
+
+
+def _pool_key(conn_data):
+    # Editing a connection changes its key, so stale connections are never reused
+    return (conn_data.get("id"), conn_data.get("host"), conn_data.get("port"),
+            conn_data.get("database"), conn_data.get("user"), conn_data.get("password"),
+            conn_data.get("db_path"), repr(sorted((conn_data.get("sqlite_profile") or {}).items())))
+
+
+def reset_session(conn):
+    """Clears a PostgreSQL connection's session state in one round trip."""
+    autocommit = conn.autocommit
+    conn.autocommit = True  # A multi-statement string then runs as one implicit transaction
+    try:
+        conn.cursor().execute(RESET_SESSION_SQL)
+    finally:
+        conn.autocommit = autocommit
+
+
+def _ping(conn):
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchone()
+    conn.rollback()
+    return (time.perf_counter() - start) * 1000
+
+
+class ConnectionPool:
+    """Idle connections per saved connection, plus their last health check."""
+
+    def __init__(self):
+        self._idle = {}      # pool key -> [(connection, last_used), ...]
+        self._lock = threading.Lock()
+        self.health = {}     # connection id -> {"ok", "rtt_ms", "checked_at", "error"}
+        self._prepared = {}  # id(connection) -> {statement text: prepared name}
+        self._statement_ids = itertools.count(1)
+
+    def acquire(self, conn_data):
+        if not is_poolable(conn_data):
+            return open_connection(conn_data)
+        key = _pool_key(conn_data)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                conn, last_used = idle.pop()
+            if is_closed(conn):
+                self.forget_prepared(conn)
+                continue
+            if time.time() - last_used > VALIDATE_AFTER_SEC:
+                try:
+                    self._record(conn_data["id"], rtt_ms=_ping(conn))
+                except Exception as e:
+                    self._record(conn_data["id"], error=str(e))
+                    self._close(conn)
+                    continue
+            return conn
+        return open_connection(conn_data, thread_shared=True)
+
+    def release(self, conn_data, conn):
+        """Returns a connection for reuse; closed or surplus connections are dropped."""
+        if not is_poolable(conn_data):
+            conn.close()
+            return
+        if is_closed(conn):
+            self.forget_prepared(conn)
+            return
+        try:
+            # Ends any open transaction and closes named cursors
+            conn.rollback()
+            if not conn_data.get("db_path"):
+                reset_session(conn)
+        except Exception:
+            self._close(conn)
+            return
+        key = _pool_key(conn_data)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < MAX_IDLE_PER_CONNECTION:
+                idle.append((conn, time.time()))
+                return
+        self._close(conn)
+
+    def warm(self, conn_data):
+        """Opens one idle connection ahead of the first query, if none is waiting."""
+        if not is_poolable(conn_data):
+            return
+        key = _pool_key(conn_data)
+        with self._lock:
+            if self._idle.get(key):
+                return
+        start = time.perf_counter()
+        try:
+            conn = open_connection(conn_data, thread_shared=True)
+        except Exception as e:
+            self._record(conn_data["id"], error=str(e))
+            return
+        self._record(conn_data["id"], rtt_ms=(time.perf_counter() - start) * 1000)
+        self.release(conn_data, conn)
+
+    def check_health(self):
+        """Pings one idle connection per key and closes expired ones. Returns the health map."""
+        now = time.time()
+        with self._lock:
+            snapshot = {key: list(conns) for key, conns in self._idle.items()}
+        for key, conns in snapshot.items():
+            conn_id = key[0]
+            pinged = False
+            for conn, last_used in conns:
+                if is_closed(conn) or now - last_used > IDLE_TIMEOUT_SEC:
+                    self._take(key, conn)
+                    self._close(conn)
+                    continue
+                if pinged or not self._take(key, conn):
+                    continue
+                pinged = True
+                try:
+                    self._record(conn_id, rtt_ms=_ping(conn))
+                except Exception as e:
+                    self._record(conn_id, error=str(e))
+                    self._close(conn)
+                    continue
+                with self._lock:
+                    self._idle.setdefault(key, []).append((conn, last_used))
+        return dict(self.health)
+
+    def discard(self, conn_id):
+        """Closes every idle connection of a saved connection (after edit or delete)."""
+        with self._lock:
+            keys = [key for key in self._idle if key[0] == conn_id]
+            conns = [conn for key in keys for conn, _ in self._idle.pop(key)]
+        for conn in conns:
+            self._close(conn)
+        self.health.pop(conn_id, None)
+
+    def close_all(self):
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for conn, _ in idle]
+            self._idle.clear()
+        for conn in conns:
+            self._close(conn)
+
+    def prepared_statement(self, conn, statement):
+        """Returns (name, already_prepared) for a statement on a borrowed PostgreSQL connection."""
+        with self._lock:
+            statements = self._prepared.setdefault(id(conn), {})
+            if statement in statements:
+                return statements[statement], True
+            full = len(statements) >= MAX_PREPARED_PER_CONNECTION
+            if full:
+                statements.clear()
+        if full:
+            cursor = conn.cursor()
+            cursor.execute("DEALLOCATE ALL")
+        return f"sqlclient_stmt_{next(self._statement_ids)}", False
+
+    def mark_prepared(self, conn, statement, name):
+        with self._lock:
+            self._prepared.setdefault(id(conn), {})[statement] = name
+
+    def forget_prepared(self, conn):
+        with self._lock:
+            self._prepared.pop(id(conn), None)
+
+    def _take(self, key, conn):
+        # Removes conn from the idle list unless a query already acquired it
+        with self._lock:
+            idle = self._idle.get(key, [])
+            for i, (candidate, _) in enumerate(idle):
+                if candidate is conn:
+                    del idle[i]
+                    return True
+        return False
+
+    def _record(self, conn_id, rtt_ms=None, error=None):
+        self.health[conn_id] = {"ok": error is None, "rtt_ms": rtt_ms,
+                                "checked_at": time.time(), "error": error}
+
+    def _close(self, conn):
+        self.forget_prepared(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# --- Signals class for pool warm-up and health checks ---
+class PoolSignals(QObject):
+    # connection id -> health dict; int keys, so not a QVariantMap
+    health = pyqtSignal(object)
+
+
+class RunnableWarmUp(QRunnable):
+    def __init__(self, pool, conn_data, signals):
+        super().__init__()
+        self.pool = pool
+        self.conn_data = conn_data
+        self.signals = signals
+
+    def run(self):
+        self.pool.warm(self.conn_data)
+        self.signals.health.emit(dict(self.pool.health))
+
+
+class RunnableHealthCheck(QRunnable):
+    def __init__(self, pool, signals):
+        super().__init__()
+        self.pool = pool
+        self.signals = signals
+
+    def run(self):
+        self.signals.health.emit(self.pool.check_health())
@@ -1,46 +1,101 @@
 # database_manager.py
 import sqlite3 as sqlite
 import datetime
+import json
 import os
 
-class DatabaseManager:
-    def __init__(self, db_file='hierarchy.db'):
-        self.db_file = db_file
-        self._initialize_db()
+from query_analyzer import DEFAULT_THRESHOLDS, REBASELINE_AFTER_REGRESSIONS, fingerprint, evaluate_run, update_baseline
+from sqlite_profile import to_json as profile_to_json
 
-    def _initialize_db(self):
-        conn = sqlite.connect(self.db_file)
-        c = conn.cursor()
+def _add_column_if_missing(c, table, column, ddl):
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in [col[1] for col in c.fetchall()]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
 
-        # Schema Setup and Migration
-        c.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
-        c.execute("CREATE TABLE IF NOT EXISTS subcategories (id INTEGER PRIMARY KEY, name TEXT, category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories (id))")
-        c.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT, subcategory_id INTEGER, host TEXT, \"database\" TEXT, \"user\" TEXT, password TEXT, port INTEGER, db_path TEXT, FOREIGN KEY (subcategory_id) REFERENCES subcategories (id))")
 
-        c.execute("SELECT COUNT(*) FROM categories")
-        if c.fetchone()[0] == 0:
-            c.execute("INSERT INTO categories (name) VALUES ('PostgreSQL Connections'), ('SQLite Connections')")
+def _migrate_baseline(c):
+    # Databases created before user_version tracking may already hold part of
+    # this schema, so the baseline has to be idempotent.
+    c.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    c.execute("CREATE TABLE IF NOT EXISTS subcategories (id INTEGER PRIMARY KEY, name TEXT, category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories (id))")
+    c.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT, subcategory_id INTEGER, host TEXT, \"database\" TEXT, \"user\" TEXT, password TEXT, port INTEGER, db_path TEXT, FOREIGN KEY (subcategory_id) REFERENCES subcategories (id))")
 
-        c.execute("PRAGMA table_info(items)")
-        if 'usage_count' not in [col[1] for col in c.fetchall()]:
-            c.execute("ALTER TABLE items ADD COLUMN usage_count INTEGER NOT NULL DEFAULT 0")
+    c.execute("SELECT COUNT(*) FROM categories")
+    if c.fetchone()[0] == 0:
+        c.execute("INSERT INTO categories (name) VALUES ('PostgreSQL Connections'), ('SQLite Connections')")
 
-        c.execute("CREATE TABLE IF NOT EXISTS query_history (id INTEGER PRIMARY KEY, query_text TEXT, timestamp TEXT)")
+    _add_column_if_missing(c, "items", "usage_count", "usage_count INTEGER NOT NULL DEFAULT 0")
 
-        # Add missing columns to query_history for backward compatibility
-        c.execute("PRAGMA table_info(query_history)")
-        history_columns = [col[1] for col in c.fetchall()]
-        if 'connection_item_id' not in history_columns:
-            c.execute("ALTER TABLE query_history ADD COLUMN connection_item_id INTEGER NOT NULL DEFAULT -1")
-        if 'status' not in history_columns:
-            c.execute("ALTER TABLE query_history ADD COLUMN status TEXT NOT NULL DEFAULT 'Unknown'")
-        if 'rows_affected' not in history_columns:
-            c.execute("ALTER TABLE query_history ADD COLUMN rows_affected INTEGER")
-        if 'execution_time_sec' not in history_columns:
-            c.execute("ALTER TABLE query_history ADD COLUMN execution_time_sec REAL")
+    c.execute("CREATE TABLE IF NOT EXISTS query_history (id INTEGER PRIMARY KEY, query_text TEXT, timestamp TEXT)")
+    _add_column_if_missing(c, "query_history", "connection_item_id", "connection_item_id INTEGER NOT NULL DEFAULT -1")
+    _add_column_if_missing(c, "query_history", "status", "status TEXT NOT NULL DEFAULT 'Unknown'")
+    _add_column_if_missing(c, "query_history", "rows_affected", "rows_affected INTEGER")
+    _add_column_if_missing(c, "query_history", "execution_time_sec", "execution_time_sec REAL")
 
-        conn.commit()
-        conn.close()
+
+# Ordered schema migrations. After applying MIGRATIONS[i] the database is at
+# user_version i + 1. Each entry is (description, step) where step is either a
+# list of SQL statements or a callable taking a cursor. Never edit or reorder
+# an entry that has shipped; append a new one instead.
+MIGRATIONS = [
+    ("baseline schema", _migrate_baseline),
+    ("lookup indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_subcategories_category ON subcategories (category_id)",
+        "CREATE INDEX IF NOT EXISTS idx_items_subcategory ON items (subcategory_id)",
+        "CREATE INDEX IF NOT EXISTS idx_query_history_conn_ts ON query_history (connection_item_id, timestamp)",
+    ]),
+    ("explain plans stored with history", [
+        "ALTER TABLE query_history ADD COLUMN plan_json TEXT",
+    ]),
+    ("slow query analysis", [
+        "CREATE TABLE query_fingerprint_stats (connection_item_id INTEGER NOT NULL, fingerprint TEXT NOT NULL, runs INTEGER NOT NULL, mean_sec REAL NOT NULL, m2 REAL NOT NULL, max_sec REAL NOT NULL, PRIMARY KEY (connection_item_id, fingerprint))",
+        "CREATE TABLE slow_query_log (id INTEGER PRIMARY KEY, history_id INTEGER NOT NULL, connection_item_id INTEGER NOT NULL, fingerprint TEXT NOT NULL, query_text TEXT, duration_sec REAL NOT NULL, baseline_sec REAL, reason TEXT NOT NULL, timestamp TEXT)",
+        "CREATE INDEX idx_slow_query_log_conn ON slow_query_log (connection_item_id, id)",
+        "CREATE TABLE slow_query_settings (connection_item_id INTEGER PRIMARY KEY, min_duration_sec REAL NOT NULL, regression_factor REAL NOT NULL, min_samples INTEGER NOT NULL)",
+        "CREATE TABLE analyzer_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    ]),
+    ("sqlite performance profiles", [
+        "ALTER TABLE items ADD COLUMN sqlite_profile TEXT",
+    ]),
+    ("regression streaks per fingerprint", [
+        "ALTER TABLE query_fingerprint_stats ADD COLUMN regression_streak INTEGER NOT NULL DEFAULT 0",
+    ]),
+]
+
+
+class DatabaseManager:
+    def __init__(self, db_file='hierarchy.db'):
+        self.db_file = db_file
+        self._initialize_db()
+
+    def _initialize_db(self):
+        # Autocommit mode so the migration transaction is controlled explicitly
+        conn = sqlite.connect(self.db_file, isolation_level=None)
+        try:
+            c = conn.cursor()
+            target_version = len(MIGRATIONS)
+            # Up-to-date databases stop after this single pragma read
+            if c.execute("PRAGMA user_version").fetchone()[0] >= target_version:
+                return
+
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-read under the write lock in case another instance migrated meanwhile
+                version = c.execute("PRAGMA user_version").fetchone()[0]
+                for description, step in MIGRATIONS[version:]:
+                    if callable(step):
+                        step(c)
+                    else:
+                        for statement in step:
+                            c.execute(statement)
+                if version < target_version:
+                    c.execute(f"PRAGMA user_version = {target_version}")
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
 
     def get_all_connections_hierarchy(self):
         conn = sqlite.connect(self.db_file)
@@ -59,15 +114,16 @@ class DatabaseManager:
             for subcat_id, subcat_name in subcats:
                 subcat_item_data = {"id": subcat_id, "name": subcat_name, "items": []}
                 
-                c.execute("SELECT id, name, host, \"database\", \"user\", password, port, db_path, usage_count FROM items WHERE subcategory_id=?", (subcat_id,))
+                c.execute("SELECT id, name, host, \"database\", \"user\", password, port, db_path, usage_count, sqlite_profile FROM items WHERE subcategory_id=?", (subcat_id,))
                 items = c.fetchall()
                 
                 for item_row in items:
-                    item_id, name, host, db, user, pwd, port, db_path, usage_count = item_row
+                    item_id, name, host, db, user, pwd, port, db_path, usage_count, profile = item_row
                     conn_data = {
                         "id": item_id, "name": name, "host": host, "database": db,
                         "user": user, "password": pwd, "port": port, "db_path": db_path,
-                        "usage_count": usage_count
+                        "usage_count": usage_count,
+                        "sqlite_profile": json.loads(profile) if profile else None
                     }
                     subcat_item_data["items"].append(conn_data)
                 cat_item_data["subcategories"].append(subcat_item_data)
@@ -80,7 +136,7 @@ class DatabaseManager:
         conn = sqlite.connect(self.db_file)
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT c.name, sc.name, i.name, i.host, i.database, i.user, i.password, i.port, i.db_path, i.id, i.usage_count 
+            SELECT c.name, sc.name, i.name, i.host, i.database, i.user, i.password, i.port, i.db_path, i.id, i.usage_count, i.sqlite_profile
             FROM categories c 
             JOIN subcategories sc ON sc.category_id = c.id 
             JOIN items i ON i.subcategory_id = sc.id 
@@ -91,11 +147,12 @@ class DatabaseManager:
         
         formatted_items = []
         for row in all_items:
-            cat_name, subcat_name, item_name, host, db, user, pwd, port, db_path, item_id, usage_count = row
+            cat_name, subcat_name, item_name, host, db, user, pwd, port, db_path, item_id, usage_count, profile = row
             conn_data = {
                 "id": item_id, "name": item_name, "host": host, "database": db,
                 "user": user, "password": pwd, "port": port, "db_path": db_path,
-                "usage_count": usage_count
+                "usage_count": usage_count,
+                "sqlite_profile": json.loads(profile) if profile else None
             }
             formatted_items.append((cat_name, subcat_name, item_name, conn_data))
         return formatted_items
@@ -106,25 +163,27 @@ class DatabaseManager:
         c.execute("INSERT INTO subcategories (name, category_id) VALUES (?, ?)", (name, category_id))
         conn.commit()
         conn.close()
+        return c.lastrowid
 
     def add_connection(self, subcategory_id, data):
         conn = sqlite.connect(self.db_file)
         c = conn.cursor()
         if "db_path" in data: # SQLite
-            c.execute("INSERT INTO items (name, subcategory_id, db_path) VALUES (?, ?, ?)",
-                      (data["name"], subcategory_id, data["db_path"]))
+            c.execute("INSERT INTO items (name, subcategory_id, db_path, sqlite_profile) VALUES (?, ?, ?, ?)",
+                      (data["name"], subcategory_id, data["db_path"], profile_to_json(data.get("sqlite_profile"))))
         else: # PostgreSQL
             c.execute("INSERT INTO items (name, subcategory_id, host, \"database\", \"user\", password, port) VALUES (?, ?, ?, ?, ?, ?, ?)",
                       (data["name"], subcategory_id, data["host"], data["database"], data["user"], data["password"], data["port"]))
         conn.commit()
         conn.close()
+        return c.lastrowid
 
     def update_connection(self, item_id, data):
         conn = sqlite.connect(self.db_file)
         c = conn.cursor()
         if "db_path" in data: # SQLite
-            c.execute("UPDATE items SET name = ?, db_path = ? WHERE id = ?",
-                      (data["name"], data["db_path"], item_id))
+            c.execute("UPDATE items SET name = ?, db_path = ?, sqlite_profile = ? WHERE id = ?",
+                      (data["name"], data["db_path"], profile_to_json(data.get("sqlite_profile")), item_id))
         else: # PostgreSQL
             c.execute("UPDATE items SET name = ?, host = ?, database = ?, user = ?, password = ?, port = ? WHERE id = ?",
                       (data["name"], data["host"], data["database"], data["user"], data["password"], data["port"], item_id))
@@ -143,29 +202,35 @@ class DatabaseManager:
         c = conn.cursor()
         c.execute("DELETE FROM items WHERE id = ?", (item_id,))
         c.execute("DELETE FROM query_history WHERE connection_item_id = ?", (item_id,))
+        c.execute("DELETE FROM query_fingerprint_stats WHERE connection_item_id = ?", (item_id,))
+        c.execute("DELETE FROM slow_query_log WHERE connection_item_id = ?", (item_id,))
+        c.execute("DELETE FROM slow_query_settings WHERE connection_item_id = ?", (item_id,))
         conn.commit()
         conn.close()
 
-    def save_query_to_history(self, conn_id, query, status, rows, duration):
+    def save_query_to_history(self, conn_id, query, status, rows, duration, plan=None):
         if not conn_id: return
         conn = sqlite.connect(self.db_file)
         c = conn.cursor()
-        c.execute("INSERT INTO query_history (connection_item_id, query_text, status, rows_affected, execution_time_sec, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-                  (conn_id, query, status, rows, duration, datetime.datetime.now().isoformat()))
+        c.execute("INSERT INTO query_history (connection_item_id, query_text, status, rows_affected, execution_time_sec, timestamp, plan_json) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                  (conn_id, query, status, rows, duration, datetime.datetime.now().isoformat(),
+                   json.dumps(plan) if plan is not None else None))
+        history_id = c.lastrowid
         conn.commit()
         conn.close()
+        return history_id
 
     def get_connection_history(self, conn_id):
         if not conn_id: return []
         conn = sqlite.connect(self.db_file)
         c = conn.cursor()
-        c.execute("SELECT id, query_text, timestamp, status, rows_affected, execution_time_sec FROM query_history WHERE connection_item_id = ? ORDER BY timestamp DESC", (conn_id,))
+        c.execute("SELECT id, query_text, timestamp, status, rows_affected, execution_time_sec, plan_json IS NOT NULL FROM query_history WHERE connection_item_id = ? ORDER BY timestamp DESC", (conn_id,))
         history = c.fetchall()
         conn.close()
         
         formatted_history = []
         for row in history:
-            history_id, query, ts, status, rows, duration = row
+            history_id, query, ts, status, rows, duration, has_plan = row
             dt = datetime.datetime.fromisoformat(ts)
             formatted_history.append({
                 "id": history_id,
@@ -173,10 +238,42 @@ class DatabaseManager:
                 "timestamp": dt.strftime('%Y-%m-%d %H:%M:%S'),
                 "status": status,
                 "rows": rows,
-                "duration": duration
+                "duration": duration,
+                "has_plan": bool(has_plan)
             })
         return formatted_history
 
+    def get_history_for_replay(self, conn_id, since=None, until=None):
+        """Successful statements of a connection in a timestamp window, oldest first."""
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("SELECT id, query_text, timestamp, execution_time_sec FROM query_history "
+                  "WHERE connection_item_id = ? AND status = 'Success' AND timestamp >= ? AND timestamp <= ? "
+                  "ORDER BY timestamp",
+                  (conn_id, since.isoformat() if since else "", until.isoformat() if until else "9999"))
+        rows = c.fetchall()
+        conn.close()
+        return [{"id": history_id, "query": query, "timestamp": ts, "duration": duration}
+                for history_id, query, ts, duration in rows]
+
+    def get_history_plan(self, history_id):
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("SELECT plan_json FROM query_history WHERE id = ?", (history_id,))
+        row = c.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def get_previous_plan(self, conn_id, query, before_id=None):
+        """Most recent stored plan for the same query text on a connection."""
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("SELECT plan_json FROM query_history WHERE connection_item_id = ? AND query_text = ? AND plan_json IS NOT NULL AND id < ? ORDER BY id DESC LIMIT 1",
+                  (conn_id, query, before_id if before_id is not None else 2 ** 62))
+        row = c.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+
     def remove_history_item(self, history_id):
         conn = sqlite.connect(self.db_file)
         c = conn.cursor()
@@ -189,4 +286,97 @@ class DatabaseManager:
         c = conn.cursor()
         c.execute("DELETE FROM query_history WHERE connection_item_id = ?", (conn_id,))
         conn.commit()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+    # --- Slow query analysis ---
+    def get_slow_query_thresholds(self, conn_id):
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("SELECT min_duration_sec, regression_factor, min_samples FROM slow_query_settings WHERE connection_item_id = ?", (conn_id,))
+        row = c.fetchone()
+        conn.close()
+        if not row:
+            return dict(DEFAULT_THRESHOLDS)
+        return {"min_duration_sec": row[0], "regression_factor": row[1], "min_samples": row[2]}
+
+    def set_slow_query_thresholds(self, conn_id, thresholds):
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("INSERT OR REPLACE INTO slow_query_settings (connection_item_id, min_duration_sec, regression_factor, min_samples) VALUES (?, ?, ?, ?)",
+                  (conn_id, thresholds["min_duration_sec"], thresholds["regression_factor"], thresholds["min_samples"]))
+        conn.commit()
+        conn.close()
+
+    def analyze_history_batch(self, batch_size=5000):
+        """Folds history rows added since the last call into per-fingerprint baselines.
+
+        Only rows above the stored high-water mark are read, so each call costs
+        O(new rows) regardless of how large query_history has grown. Returns the
+        runs written to slow_query_log.
+        """
+        conn = sqlite.connect(self.db_file, isolation_level=None)
+        c = conn.cursor()
+        flagged = []
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            row = c.execute("SELECT value FROM analyzer_state WHERE key = 'last_history_id'").fetchone()
+            last_id = row[0] if row else 0
+            c.execute("SELECT id, connection_item_id, query_text, execution_time_sec, timestamp, status FROM query_history WHERE id > ? ORDER BY id LIMIT ?",
+                      (last_id, batch_size))
+            new_rows = c.fetchall()
+            if not new_rows:
+                c.execute("COMMIT")
+                return flagged
+
+            c.execute("SELECT connection_item_id, min_duration_sec, regression_factor, min_samples FROM slow_query_settings")
+            settings = {r[0]: {"min_duration_sec": r[1], "regression_factor": r[2], "min_samples": r[3]} for r in c.fetchall()}
+
+            baselines = {}
+            for history_id, conn_id, query, duration, ts, status in new_rows:
+                last_id = history_id
+                # Failed, cancelled and EXPLAIN runs say nothing about normal latency
+                if status != "Success" or duration is None or conn_id is None or conn_id < 0:
+                    continue
+                key = (conn_id, fingerprint(query))
+                if key not in baselines:
+                    found = c.execute("SELECT runs, mean_sec, m2, max_sec, regression_streak FROM query_fingerprint_stats WHERE connection_item_id = ? AND fingerprint = ?", key).fetchone()
+                    baselines[key] = list(found) if found else [0, 0.0, 0.0, 0.0, 0]
+                runs, mean, m2, max_sec, streak = baselines[key]
+                reason = evaluate_run(duration, runs, mean, settings.get(conn_id, DEFAULT_THRESHOLDS))
+                if reason:
+                    entry = {"history_id": history_id, "conn_id": conn_id, "fingerprint": key[1], "query": query,
+                             "duration": duration, "baseline": mean if runs else None, "reason": reason, "timestamp": ts}
+                    c.execute("INSERT INTO slow_query_log (history_id, connection_item_id, fingerprint, query_text, duration_sec, baseline_sec, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (history_id, conn_id, key[1], query, duration, entry["baseline"], reason, ts))
+                    flagged.append(entry)
+                # Regressions are kept out of the baseline so one bad run does not mask the next,
+                # until enough of them in a row show the latency has changed for good
+                if reason != "regression":
+                    runs, mean, m2 = update_baseline(runs, mean, m2, duration)
+                    streak = 0
+                elif streak + 1 >= REBASELINE_AFTER_REGRESSIONS:
+                    runs, mean, m2 = update_baseline(0, 0.0, 0.0, duration)
+                    streak = 0
+                else:
+                    streak += 1
+                baselines[key] = [runs, mean, m2, max(max_sec, duration), streak]
+
+            c.executemany("INSERT OR REPLACE INTO query_fingerprint_stats (connection_item_id, fingerprint, runs, mean_sec, m2, max_sec, regression_streak) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          [(k[0], k[1], *v) for k, v in baselines.items()])
+            c.execute("INSERT OR REPLACE INTO analyzer_state (key, value) VALUES ('last_history_id', ?)", (last_id,))
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return flagged
+
+    def get_slow_query_log(self, conn_id, limit=500):
+        conn = sqlite.connect(self.db_file)
+        c = conn.cursor()
+        c.execute("SELECT timestamp, reason, duration_sec, baseline_sec, query_text FROM slow_query_log WHERE connection_item_id = ? ORDER BY id DESC LIMIT ?",
+                  (conn_id, limit))
+        rows = c.fetchall()
+        conn.close()
+        return rows
@@ -0,0 +1,159 @@
+# explain_plan.py
+import json
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+
+# Nodes whose self time is at least this share of the total are highlighted
+HOTSPOT_MIN_SHARE = 0.10
+HOTSPOT_MAX_NODES = 3
+
+
+def is_sqlite(conn_data):
+    return bool(conn_data.get("db_path"))
+
+
+def explain_statement(conn_data, query):
+    if is_sqlite(conn_data):
+        return f"EXPLAIN QUERY PLAN {query}"
+    return f"EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS) {query}"
+
+
+def _make_node(label, est_rows=None, actual_rows=None, loops=None, total_ms=None, detail=None):
+    return {"label": label, "est_rows": est_rows, "actual_rows": actual_rows, "loops": loops,
+            "total_ms": total_ms, "self_ms": None, "detail": detail or {}, "children": []}
+
+
+def _normalize_pg_node(plan):
+    label = plan.get("Node Type", "?")
+    if plan.get("Relation Name"):
+        label += f" on {plan['Relation Name']}"
+    if plan.get("Index Name"):
+        label += f" using {plan['Index Name']}"
+    loops = plan.get("Actual Loops")
+    total_ms = None
+    if plan.get("Actual Total Time") is not None:
+        # Actual times are per loop
+        total_ms = plan["Actual Total Time"] * (loops or 1)
+    # Row counts are per loop too; compare totals
+    est_rows, actual_rows = plan.get("Plan Rows"), plan.get("Actual Rows")
+    if loops:
+        est_rows = est_rows * loops if est_rows is not None else None
+        actual_rows = actual_rows * loops if actual_rows is not None else None
+    detail = {key: value for key, value in plan.items() if key != "Plans"}
+    node = _make_node(label, est_rows, actual_rows, loops, total_ms, detail)
+    node["children"] = [_normalize_pg_node(child) for child in plan.get("Plans", [])]
+    return node
+
+
+def normalize_pg_plan(plan_doc):
+    """Converts EXPLAIN (FORMAT JSON) output into the viewer's node tree."""
+    if isinstance(plan_doc, str):
+        plan_doc = json.loads(plan_doc)
+    top = plan_doc[0]
+    root = _normalize_pg_node(top["Plan"])
+    _compute_self_times(root)
+    return {"db_type": "postgres", "planning_ms": top.get("Planning Time"),
+            "execution_ms": top.get("Execution Time"), "root": root}
+
+
+def normalize_sqlite_plan(rows):
+    """Builds a node tree from EXPLAIN QUERY PLAN rows (id, parent, notused, detail)."""
+    root = _make_node("QUERY PLAN")
+    nodes = {0: root}
+    for node_id, parent_id, _, detail in rows:
+        node = _make_node(detail)
+        nodes[node_id] = node
+        nodes.get(parent_id, root)["children"].append(node)
+    return {"db_type": "sqlite", "planning_ms": None, "execution_ms": None, "root": root}
+
+
+def _compute_self_times(node):
+    for child in node["children"]:
+        _compute_self_times(child)
+    if node["total_ms"] is not None:
+        children_ms = sum(child["total_ms"] or 0 for child in node["children"])
+        node["self_ms"] = max(0.0, node["total_ms"] - children_ms)
+
+
+def iter_nodes(node):
+    yield node
+    for child in node["children"]:
+        yield from iter_nodes(child)
+
+
+def find_hotspots(plan):
+    """Returns the ids of the most expensive nodes by self time."""
+    root = plan["root"]
+    total = plan.get("execution_ms") or root.get("total_ms")
+    if not total:
+        return set()
+    timed = [node for node in iter_nodes(root) if node["self_ms"]]
+    timed.sort(key=lambda node: node["self_ms"], reverse=True)
+    return {id(node) for node in timed[:HOTSPOT_MAX_NODES]
+            if node["self_ms"] >= total * HOTSPOT_MIN_SHARE}
+
+
+def compare_plans(current, previous):
+    """One-paragraph comparison of two stored plans of the same query."""
+    lines = []
+    now_ms, before_ms = current.get("execution_ms"), previous.get("execution_ms")
+    if now_ms is not None and before_ms:
+        change = (now_ms - before_ms) / before_ms * 100
+        lines.append(f"Execution time: {now_ms:.2f} ms (previous run {before_ms:.2f} ms, {change:+.0f}%)")
+    now_shape = [node["label"] for node in iter_nodes(current["root"])]
+    before_shape = [node["label"] for node in iter_nodes(previous["root"])]
+    if now_shape != before_shape:
+        lines.append("Plan shape changed since the previous run:")
+        lines.extend(f"  - {label}" for label in before_shape if label not in now_shape)
+        lines.extend(f"  + {label}" for label in now_shape if label not in before_shape)
+    else:
+        lines.append("Plan shape unchanged since the previous run.")
+    return "\n".join(lines)
+
+
+# --- Signals class for EXPLAIN runs ---
+class ExplainSignals(QObject):
+    finished = pyqtSignal(dict, str, object, float)
+    error = pyqtSignal(str)
+
+
+class RunnableExplain(QRunnable):
+    def __init__(self, conn_data, query, signals):
+        super().__init__()
+        self.conn_data = conn_data
+        self.query = query
+        self.signals = signals
+        self._is_cancelled = False
+        self.conn = None
+
+    def cancel(self):
+        self._is_cancelled = True
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception as e:
+                print(f"Error closing connection during cancel: {e}")
+
+    def run(self):
+        try:
+            start_time = time.time()
+            self.conn = conn = open_connection(self.conn_data)
+            cursor = conn.cursor()
+            cursor.execute(explain_statement(self.conn_data, self.query))
+            rows = cursor.fetchall()
+            # EXPLAIN ANALYZE really executes the statement; never keep its writes
+            conn.rollback()
+            if is_sqlite(self.conn_data):
+                plan = normalize_sqlite_plan(rows)
+            else:
+                plan = normalize_pg_plan(rows[0][0])
+            if not self._is_cancelled:
+                self.signals.finished.emit(self.conn_data, self.query, plan, time.time() - start_time)
+        except Exception as e:
+            if not self._is_cancelled:
+                self.signals.error.emit(str(e))
+        finally:
+            if self.conn:
+                self.conn.close()
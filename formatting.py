@@ -0,0 +1,21 @@
+# formatting.py
+# Human-readable formatting for counts and sizes shown in trees and status bars.
+
+def format_count(value, approximate=False):
+    if value is None or value < 0:
+        return "?"
+    prefix = "~" if approximate else ""
+    for threshold, suffix in ((1_000_000_000, "G"), (1_000_000, "M"), (1_000, "k")):
+        if value >= threshold:
+            return f"{prefix}{value / threshold:.1f}{suffix}"
+    return f"{prefix}{int(value)}"
+
+
+def format_size(num_bytes):
+    if num_bytes is None or num_bytes < 0:
+        return "?"
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
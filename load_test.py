@@ -0,0 +1,267 @@
+# load_test.py
+# Replays query history against a connection with N concurrent workers at a set rate,
+# and reports latency percentiles, throughput and errors per query fingerprint.
+import threading
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_analyzer import fingerprint
+from query_worker import open_connection
+from result_store import FETCH_BATCH_ROWS
+from sql_params import find_placeholders
+
+# Statements that can't change data, for the "read-only statements only" filter
+READ_ONLY_VERBS = ("select", "with", "values", "show", "explain", "table")
+PROGRESS_INTERVAL_SEC = 0.5
+
+
+def is_read_only(query):
+    words = query.lstrip("( \t\r\n").split(None, 1)
+    return bool(words) and words[0].lower() in READ_ONLY_VERBS
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class _RateLimiter:
+    """Hands out evenly spaced start times shared by all workers; rate 0 means no limit."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(self._next, time.perf_counter())
+            self._next = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class WorkloadReplay:
+    """Runs history entries ({"query", "duration"} dicts) `loops` times over `workers` connections.
+
+    With rollback, every statement runs in a transaction that is rolled back, so
+    replaying writes leaves the data as it was (locks are still taken).
+    """
+
+    def __init__(self, conn_data, entries, workers=4, rate=0.0, loops=1, read_only=True,
+                 rollback=True, is_cancelled=None, progress=None):
+        self.conn_data = conn_data
+        self.workers = max(1, workers)
+        self.rate = rate
+        self.rollback = rollback
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.progress = progress or (lambda text: None)
+        self.entries = []
+        self.skipped = 0
+        recorded = {}  # fingerprint -> durations from history, to compare against
+        for entry in entries:
+            query = entry["query"]
+            # Placeholders have no recorded values, so those statements can't be replayed
+            if find_placeholders(query) or (read_only and not is_read_only(query)):
+                self.skipped += 1
+                continue
+            self.entries.append(entry)
+            if entry.get("duration") is not None:
+                recorded.setdefault(fingerprint(query), []).append(entry["duration"])
+        self._recorded_means = {key: sum(values) / len(values) for key, values in recorded.items()}
+        self.jobs = self.entries * max(1, loops)
+        self._next_job = 0
+        self._lock = threading.Lock()
+        self._results = {}  # fingerprint -> {"latencies": [...], "errors": n, ...}
+        self._done = 0
+        self._errors = 0
+
+    def run(self):
+        if not self.jobs:
+            raise ValueError(f"Nothing to replay ({self.skipped} statements skipped).")
+        limiter = _RateLimiter(self.rate)
+        threads = [threading.Thread(target=self._worker, args=(limiter,), daemon=True)
+                   for _ in range(min(self.workers, len(self.jobs)))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        running = threads
+        while running:
+            running[0].join(PROGRESS_INTERVAL_SEC)
+            running = [thread for thread in running if thread.is_alive()]
+            elapsed = time.perf_counter() - start
+            self.progress(f"Replayed {self._done:,} of {len(self.jobs):,} statements "
+                          f"({self._done / elapsed:,.1f}/s), {self._errors:,} errors")
+        if self.is_cancelled():
+            return None
+        return self._report(time.perf_counter() - start)
+
+    def _take(self):
+        with self._lock:
+            if self._next_job >= len(self.jobs) or self.is_cancelled():
+                return None
+            entry = self.jobs[self._next_job]
+            self._next_job += 1
+            return entry
+
+    def _worker(self, limiter):
+        conn = None
+        try:
+            while True:
+                entry = self._take()
+                if entry is None:
+                    return
+                limiter.wait()
+                error = None
+                started = time.perf_counter()
+                try:
+                    if conn is None:
+                        conn = open_connection(self.conn_data)
+                    cursor = conn.cursor()
+                    cursor.execute(entry["query"])
+                    # Fetch everything so the timing includes transferring the result
+                    if cursor.description:
+                        while cursor.fetchmany(FETCH_BATCH_ROWS):
+                            pass
+                    if self.rollback:
+                        conn.rollback()
+                    else:
+                        conn.commit()
+                except Exception as e:
+                    error = str(e).strip()
+                    conn = self._recover(conn)
+                self._record(entry, time.perf_counter() - started, error)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _recover(self, conn):
+        """Rolls back after an error; returns None if the connection has to be reopened."""
+        if conn is None:
+            return None
+        try:
+            conn.rollback()
+            return conn
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return None
+
+    def _record(self, entry, latency, error):
+        key = fingerprint(entry["query"])
+        with self._lock:
+            stats = self._results.get(key)
+            if stats is None:
+                stats = self._results[key] = {"query": entry["query"], "latencies": [], "errors": 0,
+                                              "first_error": None}
+            if error is None:
+                stats["latencies"].append(latency)
+            else:
+                stats["errors"] += 1
+                stats["first_error"] = stats["first_error"] or error
+                self._errors += 1
+            self._done += 1
+
+    def _report(self, elapsed):
+        fingerprints = []
+        all_latencies = []
+        for key, stats in self._results.items():
+            latencies = sorted(stats["latencies"])
+            all_latencies.extend(latencies)
+            fingerprints.append({
+                "fingerprint": key, "query": stats["query"],
+                "runs": len(latencies) + stats["errors"], "errors": stats["errors"],
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+                "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99), "max": latencies[-1] if latencies else None,
+                "recorded_mean": self._recorded_means.get(key),
+                "first_error": stats["first_error"],
+            })
+        fingerprints.sort(key=lambda f: -(f["mean"] or 0) * f["runs"])
+        all_latencies.sort()
+        return {
+            "statements": self._done, "errors": self._errors, "skipped": self.skipped,
+            "elapsed": elapsed, "throughput": self._done / elapsed if elapsed else 0.0,
+            "workers": self.workers, "rate": self.rate, "rollback": self.rollback,
+            "p50": percentile(all_latencies, 0.50), "p95": percentile(all_latencies, 0.95),
+            "p99": percentile(all_latencies, 0.99), "fingerprints": fingerprints,
+        }
+
+
+REPORT_COLUMNS = ["Fingerprint", "Runs", "Errors", "Mean ms", "p50 ms", "p95 ms", "p99 ms",
+                  "Max ms", "Recorded mean ms", "Change %", "First error"]
+
+
+def report_rows(report):
+    """Rows for the Output grid, one per fingerprint, slowest total time first."""
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    rows = []
+    for f in report["fingerprints"]:
+        change = None
+        if f["mean"] is not None and f["recorded_mean"]:
+            change = round((f["mean"] / f["recorded_mean"] - 1) * 100, 1)
+        rows.append((f["fingerprint"], f["runs"], f["errors"], ms(f["mean"]), ms(f["p50"]),
+                     ms(f["p95"]), ms(f["p99"]), ms(f["max"]), ms(f["recorded_mean"]), change,
+                     f["first_error"]))
+    return rows
+
+
+def format_summary(report):
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    rate = f"{report['rate']:g}/s" if report["rate"] else "unlimited"
+    lines = [
+        f"Workload replay | {report['workers']} workers | rate {rate} | "
+        f"{'rolled back' if report['rollback'] else 'committed'}",
+        "",
+        f"Statements: {report['statements']:,} in {report['elapsed']:.2f} sec "
+        f"({report['throughput']:,.1f}/s)",
+        f"Errors: {report['errors']:,}",
+        f"Latency: p50 {ms(report['p50'])}, p95 {ms(report['p95'])}, p99 {ms(report['p99'])}",
+        f"Fingerprints: {len(report['fingerprints']):,}",
+    ]
+    if report["skipped"]:
+        lines.append(f"Skipped: {report['skipped']:,} (writes with read-only on, or bind placeholders)")
+    return "\n".join(lines)
+
+
+# --- Signals class for workload replays ---
+class ReplaySignals(QObject):
+    finished = pyqtSignal(object)
+    progress = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+
+class RunnableWorkloadReplay(QRunnable):
+    def __init__(self, conn_data, entries, options, signals):
+        super().__init__()
+        self.conn_data = conn_data
+        self.entries = entries
+        self.options = options  # workers, rate, loops, read_only, rollback
+        self.signals = signals
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            report = WorkloadReplay(self.conn_data, self.entries, **self.options,
+                                    is_cancelled=lambda: self._is_cancelled,
+                                    progress=self.signals.progress.emit).run()
+            if report is not None and not self._is_cancelled:
+                self.signals.finished.emit(report)
+        except Exception as e:
+            if not self._is_cancelled:
+                self.signals.error.emit(str(e))
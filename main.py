@@ -2,33 +2,397 @@
 import sys
 import os
 import time
+# Captured before the Qt imports so the startup trace includes them
+_PROCESS_START = time.perf_counter()
 from functools import partial
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QTreeView, QTabWidget,
     QSplitter, QLineEdit, QTextEdit, QComboBox, QTableView, QVBoxLayout, QWidget, QStatusBar, QToolBar, QFileDialog,
     QSizePolicy, QPushButton, QInputDialog, QMessageBox, QMenu, QAbstractItemView, QDialog, QFormLayout, QHBoxLayout,
-    QStackedWidget, QLabel, QGroupBox
+    QStackedWidget, QLabel, QGroupBox, QListView, QDoubleSpinBox, QSpinBox, QDialogButtonBox,
+    QTableWidget, QTableWidgetItem, QCheckBox, QDateTimeEdit
 )
-from PyQt6.QtGui import QAction, QIcon, QStandardItemModel, QStandardItem, QFont, QMovie
-from PyQt6.QtCore import Qt, QDir, QModelIndex, QSize, QObject, pyqtSignal, QRunnable, QThreadPool, QTimer
+from PyQt6.QtGui import QAction, QKeySequence, QIcon, QStandardItemModel, QStandardItem, QFont, QMovie, QColor
+from PyQt6.QtCore import Qt, QDir, QModelIndex, QSize, QObject, pyqtSignal, QRunnable, QThreadPool, QTimer, QDateTime
 
 # Import refactored modules
-from query_worker import QuerySignals, RunnableQuery
-from db_manager import DatabaseManager
+from query_worker import QuerySignals, RunnableQuery, AnalyzerSignals, RunnableHistoryAnalysis
+from result_model import ResultTableModel
+from table_browser import TableBrowser, BrowseSignals, RunnableBrowsePage, ValueSignals, RunnableFetchValue
+from cell_viewer import CellViewerDialog
+from result_decoder import LargeValue
+from explain_plan import ExplainSignals, RunnableExplain, find_hotspots, compare_plans
+from notification_log import NotificationLogModel
+from notification_listener import NotificationListener, ListenerSignals
+from connection_list import ConnectionListModel, ConnectionSortProxy
+from connection_pool import (ConnectionPool, PoolSignals, RunnableWarmUp, RunnableHealthCheck,
+                             is_poolable, HEALTH_CHECK_INTERVAL_MS)
+from result_diff import DiffSignals, RunnableResultDiff, format_summary
+from load_test import REPORT_COLUMNS, ReplaySignals, RunnableWorkloadReplay, report_rows, format_summary as format_replay_summary
+from change_set import EditSignals, RunnableApplyChanges, RunnableResolveEditTarget, preview as preview_changes
+from schema_diff import (COLUMNS as SCHEMA_DIFF_COLUMNS, SchemaDiffSignals, RunnableSchemaDiff,
+                         format_summary as format_schema_diff_summary)
+from table_copy import IF_EXISTS_MODES, CopySignals, RunnableTableCopy, format_summary as format_copy_summary
+from sql_params import find_placeholders, parse_value, strip_literals
+from sql_editor import SqlEditor
+from session import (WorksheetSession, SessionSignals, RunnableSessionCommand,
+                     IDLE_IN_TRANSACTION_WARN_SEC, STATE_IDLE)
+from result_store import GLOBAL_BUDGET, DEFAULT_TAB_BUDGET_BYTES
+from async_engine import AsyncQueryEngine
+from query_progress import (PROBE_AFTER_SEC, PROBE_INTERVAL_SEC, ProgressSignals,
+                            RunnableProgressProbe, format_progress)
+from formatting import format_size
+from startup import StartupTrace, StartupSignals, RunnableStartupLoad
 from sqlite_connector import SQLiteConnector
 from postgres_connector import PostgresConnector
 # from oracle_connector import OracleConnector # Future Oracle connector
 
 
+class SlowQueryThresholdDialog(QDialog):
+    def __init__(self, parent=None, conn_name="", thresholds=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Slow Query Thresholds - {conn_name}")
+        thresholds = thresholds or {}
+
+        self.min_duration_input = QDoubleSpinBox()
+        self.min_duration_input.setRange(0.0, 3600.0)
+        self.min_duration_input.setDecimals(3)
+        self.min_duration_input.setSuffix(" sec")
+        self.min_duration_input.setValue(thresholds.get("min_duration_sec", 1.0))
+        self.factor_input = QDoubleSpinBox()
+        self.factor_input.setRange(1.0, 1000.0)
+        self.factor_input.setSuffix(" x baseline")
+        self.factor_input.setValue(thresholds.get("regression_factor", 3.0))
+        self.samples_input = QSpinBox()
+        self.samples_input.setRange(1, 10000)
+        self.samples_input.setValue(thresholds.get("min_samples", 5))
+
+        form = QFormLayout()
+        form.addRow("Log runs slower than:", self.min_duration_input)
+        form.addRow("Regression when slower than:", self.factor_input)
+        form.addRow("Baseline runs required:", self.samples_input)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def get_data(self):
+        return {
+            "min_duration_sec": self.min_duration_input.value(),
+            "regression_factor": self.factor_input.value(),
+            "min_samples": self.samples_input.value()
+        }
+
+
+class ResultMemoryBudgetDialog(QDialog):
+    def __init__(self, parent=None, tab_budget_mb=256, global_budget_mb=1024):
+        super().__init__(parent)
+        self.setWindowTitle("Result Memory Budget")
+
+        self.tab_budget_input = QSpinBox()
+        self.tab_budget_input.setRange(16, 65536)
+        self.tab_budget_input.setSuffix(" MB")
+        self.tab_budget_input.setValue(tab_budget_mb)
+        self.global_budget_input = QSpinBox()
+        self.global_budget_input.setRange(16, 262144)
+        self.global_budget_input.setSuffix(" MB")
+        self.global_budget_input.setValue(global_budget_mb)
+
+        form = QFormLayout()
+        form.addRow("Per tab:", self.tab_budget_input)
+        form.addRow("All tabs:", self.global_budget_input)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Results over budget are spilled to a temporary file on disk."))
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def get_data(self):
+        return {
+            "tab_budget_mb": self.tab_budget_input.value(),
+            "global_budget_mb": self.global_budget_input.value()
+        }
+
+
+class ResultDiffDialog(QDialog):
+    """Picks the two (connection, query) sides and optional key columns for a result diff."""
+
+    def __init__(self, parent, connection_model, left=None, right=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare Results")
+        self.resize(700, 500)
+
+        self.left_combo = QComboBox()
+        self.right_combo = QComboBox()
+        self.left_combo.setModel(connection_model)
+        self.right_combo.setModel(connection_model)
+        self.left_query = QTextEdit()
+        self.right_query = QTextEdit()
+        for combo, editor, side in ((self.left_combo, self.left_query, left),
+                                    (self.right_combo, self.right_query, right)):
+            conn_data, query = side or (None, "")
+            editor.setPlainText(query)
+            if conn_data:
+                for i in range(combo.count()):
+                    if combo.itemData(i) and combo.itemData(i).get("id") == conn_data.get("id"):
+                        combo.setCurrentIndex(i)
+                        break
+        self.key_input = QLineEdit()
+        self.key_input.setPlaceholderText("e.g. id  (leave empty to compare by row hash)")
+
+        form = QFormLayout()
+        form.addRow("Before connection:", self.left_combo)
+        form.addRow("Before query:", self.left_query)
+        form.addRow("After connection:", self.right_combo)
+        form.addRow("After query:", self.right_query)
+        form.addRow("Key columns:", self.key_input)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def get_data(self):
+        return {
+            "left": (self.left_combo.currentData(), self.left_query.toPlainText().strip()),
+            "right": (self.right_combo.currentData(), self.right_query.toPlainText().strip()),
+            "key_columns": [c for c in self.key_input.text().split(",") if c.strip()]
+        }
+
+
+class SchemaDiffDialog(QDialog):
+    """Picks the source (desired) and target (to migrate) connections for a schema diff."""
+
+    def __init__(self, parent, connection_model, conn_data=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare Schemas")
+
+        self.source_combo = QComboBox()
+        self.target_combo = QComboBox()
+        self.source_combo.setModel(connection_model)
+        self.target_combo.setModel(connection_model)
+        if conn_data:
+            for i in range(self.source_combo.count()):
+                if self.source_combo.itemData(i) and self.source_combo.itemData(i).get("id") == conn_data.get("id"):
+                    self.source_combo.setCurrentIndex(i)
+                    break
+        self.schemas_input = QLineEdit()
+        self.schemas_input.setPlaceholderText(
+            "e.g. public, billing  (empty: all non-system schemas; public against SQLite)")
+
+        form = QFormLayout()
+        form.addRow("Source (e.g. staging):", self.source_combo)
+        form.addRow("Target (e.g. production):", self.target_combo)
+        form.addRow("Schemas:", self.schemas_input)
+        form.addRow("", QLabel("The migration script makes the target match the source."))
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def get_data(self):
+        return {
+            "source": self.source_combo.currentData(),
+            "target": self.target_combo.currentData(),
+            "schemas": [s.strip() for s in self.schemas_input.text().split(",") if s.strip()]
+        }
+
+
+class TableCopyDialog(QDialog):
+    """Picks the target connection, schema and table name for 'Copy table to...'."""
+
+    def __init__(self, parent, connection_model, source_label, table_name):
+        super().__init__(parent)
+        self.setWindowTitle("Copy Table")
+
+        self.target_combo = QComboBox()
+        self.target_combo.setModel(connection_model)
+        self.schema_input = QLineEdit("public")
+        self.table_input = QLineEdit(table_name)
+        self.if_exists_combo = QComboBox()
+        self.if_exists_combo.addItems(IF_EXISTS_MODES)
+        self.if_exists_combo.setToolTip(
+            "fail: stop if the table exists; append: insert into it; replace: drop and recreate it")
+        self.target_combo.currentIndexChanged.connect(self._target_changed)
+        self._target_changed()
+
+        form = QFormLayout()
+        form.addRow("Source:", QLabel(source_label))
+        form.addRow("Target connection:", self.target_combo)
+        form.addRow("Target schema:", self.schema_input)
+        form.addRow("Target table:", self.table_input)
+        form.addRow("If table exists:", self.if_exists_combo)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def _target_changed(self):
+        conn_data = self.target_combo.currentData()
+        # SQLite has no schemas
+        self.schema_input.setEnabled(bool(conn_data) and not conn_data.get("db_path"))
+
+    def get_data(self):
+        return {
+            "target": (self.target_combo.currentData(), self.schema_input.text().strip() or "public",
+                       self.table_input.text().strip()),
+            "if_exists": self.if_exists_combo.currentText()
+        }
+
+
+class LoadTestDialog(QDialog):
+    """Replay settings: target connection, which history entries, concurrency and rate."""
+
+    def __init__(self, parent, connection_model, conn_data, selected_count=0):
+        super().__init__(parent)
+        self.setWindowTitle("Replay Workload")
+
+        self.target_combo = QComboBox()
+        self.target_combo.setModel(connection_model)
+        for i in range(self.target_combo.count()):
+            if self.target_combo.itemData(i) and self.target_combo.itemData(i).get("id") == conn_data.get("id"):
+                self.target_combo.setCurrentIndex(i)
+                break
+        self.selected_check = QCheckBox(f"Only the {selected_count} selected history entries")
+        self.selected_check.setChecked(selected_count > 0)
+        self.selected_check.setEnabled(selected_count > 0)
+        now = QDateTime.currentDateTime()
+        self.since_input = QDateTimeEdit(now.addDays(-1))
+        self.until_input = QDateTimeEdit(now)
+        for edit in (self.since_input, self.until_input):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        self.selected_check.toggled.connect(lambda checked: self.since_input.setDisabled(checked))
+        self.selected_check.toggled.connect(lambda checked: self.until_input.setDisabled(checked))
+        self.since_input.setDisabled(selected_count > 0)
+        self.until_input.setDisabled(selected_count > 0)
+
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 256)
+        self.workers_input.setValue(4)
+        self.rate_input = QDoubleSpinBox()
+        self.rate_input.setRange(0, 100000)
+        self.rate_input.setSuffix(" statements/s")
+        self.rate_input.setSpecialValueText("Unlimited")
+        self.loops_input = QSpinBox()
+        self.loops_input.setRange(1, 1000)
+        self.read_only_check = QCheckBox("Read-only statements only")
+        self.read_only_check.setChecked(True)
+        self.rollback_check = QCheckBox("Roll back every statement")
+        self.rollback_check.setChecked(True)
+
+        form = QFormLayout()
+        form.addRow("Recorded on:", QLabel(conn_data.get("name", "")))
+        form.addRow("Replay against:", self.target_combo)
+        form.addRow("", self.selected_check)
+        form.addRow("From:", self.since_input)
+        form.addRow("To:", self.until_input)
+        form.addRow("Concurrent workers:", self.workers_input)
+        form.addRow("Rate:", self.rate_input)
+        form.addRow("Passes:", self.loops_input)
+        form.addRow("", self.read_only_check)
+        form.addRow("", self.rollback_check)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def get_data(self):
+        return {
+            "target": self.target_combo.currentData(),
+            "use_selected": self.selected_check.isChecked(),
+            "since": self.since_input.dateTime().toPyDateTime(),
+            "until": self.until_input.dateTime().toPyDateTime(),
+            "options": {
+                "workers": self.workers_input.value(),
+                "rate": self.rate_input.value(),
+                "loops": self.loops_input.value(),
+                "read_only": self.read_only_check.isChecked(),
+                "rollback": self.rollback_check.isChecked(),
+            }
+        }
+
+
+class ChangePreviewDialog(QDialog):
+    """Shows the DML a result grid's pending changes will run, before it is committed."""
+
+    def __init__(self, parent, sql):
+        super().__init__(parent)
+        self.setWindowTitle("Save Changes")
+        self.resize(720, 420)
+
+        sql_view = QTextEdit()
+        sql_view.setReadOnly(True)
+        sql_view.setFont(QFont("Courier New", 10))
+        sql_view.setPlainText(sql)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.button(QDialogButtonBox.StandardButton.Ok).setText("Commit")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(sql_view)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+
 class MainWindow(QMainWindow):
     QUERY_TIMEOUT = 60000
+    # results_stacked_widget pages behind the Output/Message/Notification/Plan buttons
+    RESULT_PAGES = [0, 1, 2, 4]
+    SPINNER_PAGE = 3
+    PLAN_PAGE = 4
+    HISTORY_ANALYSIS_INTERVAL = 10000
+    # Startup milestones we hold ourselves to, in ms since process start
+    STARTUP_BUDGET_MS = {"first_paint": 800, "interactive": 1500}
 
     def __init__(self):
         super().__init__()
+        self.startup_trace = StartupTrace(
+            origin=_PROCESS_START, budget_ms=self.STARTUP_BUDGET_MS)
         self.setWindowTitle("SQL Client")
         self.setGeometry(100, 100, 1200, 800)
 
-        self.db_manager = DatabaseManager()
+        # hierarchy.db is opened (and migrated) in the background after the first paint
+        self.db_manager = None
+        self._first_paint_done = False
         self.sqlite_connector = SQLiteConnector()
         self.postgres_connector = PostgresConnector()
         # self.oracle_connector = OracleConnector() # Initialize if implemented
@@ -36,6 +400,24 @@ class MainWindow(QMainWindow):
         self.thread_pool = QThreadPool.globalInstance()
         self.tab_timers = {}
         self.running_queries = {}
+        # Keyset pagination state for tabs opened in table browser mode
+        self.table_browsers = {}
+        # One connection list, most used first, behind every worksheet's combo box
+        self.connection_list = ConnectionListModel(self)
+        self.connection_proxy = ConnectionSortProxy(self.connection_list, self)
+        # Warm PostgreSQL connections shared by query runs, pinged in the background
+        self.connection_pool = ConnectionPool()
+        # Persistent per-worksheet sessions (tab -> WorksheetSession)
+        self.sessions = {}
+        # Signals of running result-edit lookups and saves (tab -> EditSignals)
+        self.edit_signals = {}
+        # LISTEN subscriptions, one listener connection per saved connection (id -> NotificationListener)
+        self.listeners = {}
+        # PostgreSQL queries multiplexed on one I/O thread, when enabled in the Actions menu
+        self.async_engine = AsyncQueryEngine()
+        self.pool_signals = PoolSignals()
+        self.pool_signals.health.connect(self.update_connection_health)
+        self.tab_result_budget = DEFAULT_TAB_BUDGET_BYTES
         # To hold the currently active connector for schema Browse
         self.active_schema_connector = None
 
@@ -50,6 +432,8 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status)
         self.status_message_label = QLabel("Ready")
         self.status.addWidget(self.status_message_label)
+        self.result_memory_label = QLabel()
+        self.status.addPermanentWidget(self.result_memory_label)
 
         left_panel = QWidget()
         left_layout = QVBoxLayout(left_panel)
@@ -99,29 +483,133 @@ class MainWindow(QMainWindow):
             self.update_thread_pool_status)
         self.thread_monitor_timer.start(1000)
 
-        self.load_object_explorer_data()
+        # Incremental slow-query analysis of query_history
+        self._history_analysis_running = False
+        self.history_analysis_timer = QTimer()
+        self.history_analysis_timer.timeout.connect(self.run_history_analysis)
+        self.history_analysis_timer.start(self.HISTORY_ANALYSIS_INTERVAL)
+
+        self.health_check_timer = QTimer()
+        self.health_check_timer.timeout.connect(self.run_connection_health_check)
+        self.health_check_timer.start(HEALTH_CHECK_INTERVAL_MS)
+
+        self.session_monitor_timer = QTimer()
+        self.session_monitor_timer.timeout.connect(self.monitor_sessions)
+        self.session_monitor_timer.start(5000)
+
         self.add_tab()
         main_splitter.setSizes([280, 920])
         self._apply_styles()
+        self.startup_trace.mark("window_constructed")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            self.startup_trace.mark("first_paint")
+            QTimer.singleShot(0, self._start_deferred_init)
+
+    def _start_deferred_init(self):
+        self.status_message_label.setText("Loading connections...")
+        self._startup_signals = StartupSignals()
+        self._startup_signals.loaded.connect(self._on_startup_loaded)
+        self._startup_signals.error.connect(self._on_startup_error)
+        self.thread_pool.start(RunnableStartupLoad(self._startup_signals))
+
+    def _on_startup_loaded(self, db_manager, hierarchy, joined_items):
+        self.db_manager = db_manager
+        self.load_object_explorer_data(hierarchy)
+        self.connection_list.load(joined_items)
+        self.status_message_label.setText("Ready")
+        self._finish_startup_trace()
+
+    def _on_startup_error(self, error_message):
+        self.status_message_label.setText("Error occurred")
+        self._finish_startup_trace()
+        QMessageBox.critical(
+            self, "Error", f"Failed to open the connection store:\n{error_message}")
+
+    def _finish_startup_trace(self):
+        self.startup_trace.mark("interactive")
+        report = self.startup_trace.report()
+        print(report)
+        over = self.startup_trace.over_budget()
+        if over:
+            details = ", ".join(
+                f"{name} {ms:.0f}/{budget} ms" for name, ms, budget in over)
+            print(f"Startup budget exceeded: {details}")
+            self.status.showMessage(f"Startup budget exceeded: {details}", 5000)
+        else:
+            self.status.showMessage(report, 5000)
 
     def _create_actions(self):
         self.exit_action = QAction(QIcon("assets/exit_icon.png"), "Exit", self)
         self.exit_action.triggered.connect(self.close)
         self.execute_action = QAction(
             QIcon("assets/execute_icon.png"), "Execute", self)
-        self.execute_action.triggered.connect(self.execute_query)
+        self.execute_action.triggered.connect(lambda: self.execute_query())
+        self.execute_statement_action = QAction("Execute Statement", self)
+        self.execute_statement_action.setShortcut(QKeySequence("Ctrl+Return"))
+        self.execute_statement_action.setToolTip(
+            "Execute the selection, or the statement under the cursor")
+        self.execute_statement_action.triggered.connect(self.execute_statement)
+        self.open_sql_file_action = QAction("Open SQL File...", self)
+        self.open_sql_file_action.setShortcut(QKeySequence.StandardKey.Open)
+        self.open_sql_file_action.triggered.connect(self.open_sql_file)
+        self.explain_action = QAction(
+            QIcon("assets/explain_icon.png"), "Explain", self)
+        self.explain_action.triggered.connect(self.explain_query)
         self.cancel_action = QAction(
             QIcon("assets/cancel_icon.png"), "Cancel", self)
         self.cancel_action.triggered.connect(self.cancel_current_query)
         self.cancel_action.setEnabled(False)
+        self.decode_in_pool_action = QAction(
+            "Decode Large Results in Process Pool", self)
+        self.decode_in_pool_action.setCheckable(True)
+        self.async_engine_action = QAction(
+            "Run PostgreSQL Queries on Async Engine", self)
+        self.async_engine_action.setCheckable(True)
+        self.defer_large_columns_action = QAction(
+            "Defer Large Columns When Browsing", self)
+        self.defer_large_columns_action.setCheckable(True)
+        self.begin_action = QAction("Begin", self)
+        self.begin_action.triggered.connect(lambda: self.run_session_command("BEGIN"))
+        self.commit_action = QAction("Commit", self)
+        self.commit_action.triggered.connect(lambda: self.run_session_command("COMMIT"))
+        self.rollback_action = QAction("Rollback", self)
+        self.rollback_action.triggered.connect(lambda: self.run_session_command("ROLLBACK"))
+        self.compare_results_action = QAction("Compare Results...", self)
+        self.compare_results_action.triggered.connect(lambda: self.compare_results())
+        self.compare_schemas_action = QAction("Compare Schemas...", self)
+        self.compare_schemas_action.triggered.connect(self.compare_schemas)
+        self.replay_workload_action = QAction("Replay Workload...", self)
+        self.replay_workload_action.triggered.connect(lambda: self.replay_workload())
+        self.result_budget_action = QAction("Result Memory Budget...", self)
+        self.result_budget_action.triggered.connect(self.edit_result_memory_budget)
 
     def _create_menu(self):
         menubar = self.menuBar()
         file_menu = menubar.addMenu("&File")
+        file_menu.addAction(self.open_sql_file_action)
+        file_menu.addSeparator()
         file_menu.addAction(self.exit_action)
         actions_menu = menubar.addMenu("&Actions")
         actions_menu.addAction(self.execute_action)
+        actions_menu.addAction(self.execute_statement_action)
+        actions_menu.addAction(self.explain_action)
         actions_menu.addAction(self.cancel_action)
+        actions_menu.addAction(self.compare_results_action)
+        actions_menu.addAction(self.compare_schemas_action)
+        actions_menu.addAction(self.replay_workload_action)
+        actions_menu.addSeparator()
+        actions_menu.addAction(self.decode_in_pool_action)
+        actions_menu.addAction(self.async_engine_action)
+        actions_menu.addAction(self.defer_large_columns_action)
+        actions_menu.addAction(self.result_budget_action)
+        session_menu = menubar.addMenu("&Session")
+        session_menu.addAction(self.begin_action)
+        session_menu.addAction(self.commit_action)
+        session_menu.addAction(self.rollback_action)
 
     def _create_centered_toolbar(self):
         toolbar = QToolBar("Main Toolbar")
@@ -135,15 +623,46 @@ class MainWindow(QMainWindow):
         toolbar.addWidget(left_spacer)
         toolbar.addAction(self.exit_action)
         toolbar.addAction(self.execute_action)
+        toolbar.addAction(self.explain_action)
         toolbar.addAction(self.cancel_action)
+        toolbar.addSeparator()
+        toolbar.addAction(self.begin_action)
+        toolbar.addAction(self.commit_action)
+        toolbar.addAction(self.rollback_action)
         toolbar.addWidget(right_spacer)
         self.addToolBar(toolbar)
 
     def update_thread_pool_status(self):
         active = self.thread_pool.activeThreadCount()
         max_threads = self.thread_pool.maxThreadCount()
-        self.status.showMessage(
-            f"ThreadPool: {active} active of {max_threads}", 3000)
+        message = f"ThreadPool: {active} active of {max_threads}"
+        if self.async_engine.active_count:
+            message += f" | Async engine: {self.async_engine.active_count} in flight"
+        self.status.showMessage(message, 3000)
+        self.update_result_memory_status()
+
+    def update_result_memory_status(self):
+        resident = 0
+        spilled = 0
+        for i in range(self.tab_widget.count()):
+            table_view = self.tab_widget.widget(i).findChild(QTableView, "result_table")
+            model = table_view.model() if table_view else None
+            if isinstance(model, ResultTableModel):
+                resident += model.resident_bytes()
+                spilled += model.is_spilled()
+        text = f"Results in memory: {format_size(resident)}"
+        if spilled:
+            text += f" ({spilled} spilled to disk)"
+        self.result_memory_label.setText(text)
+
+    def edit_result_memory_budget(self):
+        dialog = ResultMemoryBudgetDialog(
+            self, self.tab_result_budget // (1024 * 1024), GLOBAL_BUDGET.limit_bytes // (1024 * 1024))
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            data = dialog.get_data()
+            # Applies to queries started from now on
+            self.tab_result_budget = data["tab_budget_mb"] * 1024 * 1024
+            GLOBAL_BUDGET.limit_bytes = data["global_budget_mb"] * 1024 * 1024
 
     def _apply_styles(self):
         style_sheet = """
@@ -208,10 +727,28 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
+        connection_bar = QWidget()
+        connection_bar_layout = QHBoxLayout(connection_bar)
+        connection_bar_layout.setContentsMargins(0, 0, 5, 0)
         db_combo_box = QComboBox()
         db_combo_box.setObjectName("db_combo_box")
-        layout.addWidget(db_combo_box)
-        self.load_joined_items(db_combo_box)
+        db_combo_box.setModel(self.connection_proxy)
+        db_combo_box.currentIndexChanged.connect(
+            lambda: self.warm_connection(db_combo_box.currentData()))
+        db_combo_box.currentIndexChanged.connect(
+            lambda: self._session_connection_changed(tab_content))
+        session_checkbox = QCheckBox("Persistent session")
+        session_checkbox.setObjectName("session_checkbox")
+        session_checkbox.setToolTip(
+            "Keep one connection open for this worksheet: transactions, temp tables and SET values persist")
+        session_checkbox.toggled.connect(
+            lambda checked: self.toggle_session(tab_content, checked))
+        session_state_label = QLabel()
+        session_state_label.setObjectName("session_state_label")
+        connection_bar_layout.addWidget(db_combo_box, 1)
+        connection_bar_layout.addWidget(session_checkbox)
+        connection_bar_layout.addWidget(session_state_label)
+        layout.addWidget(connection_bar)
 
         main_vertical_splitter = QSplitter(Qt.Orientation.Vertical)
         layout.addWidget(main_vertical_splitter)
@@ -242,16 +779,44 @@ class MainWindow(QMainWindow):
         editor_stack.setObjectName("editor_stack")
 
         # Page 0: Query Editor
-        text_edit = QTextEdit()
+        text_edit = SqlEditor()
         text_edit.setPlaceholderText("Write your SQL query here...")
         text_edit.setObjectName("query_editor")
-        editor_stack.addWidget(text_edit)
+
+        # Bind values for :name / %(name)s placeholders, shown only when the query has any
+        param_table = QTableWidget(0, 2)
+        param_table.setObjectName("param_table")
+        param_table.setHorizontalHeaderLabels(["Parameter", "Value (NULL, number or text)"])
+        param_table.horizontalHeader().setStretchLastSection(True)
+        param_table.verticalHeader().setVisible(False)
+        param_table.setMaximumHeight(120)
+        param_table.hide()
+
+        query_page = QWidget()
+        query_page_layout = QVBoxLayout(query_page)
+        query_page_layout.setContentsMargins(0, 0, 0, 0)
+        query_page_layout.setSpacing(2)
+        query_page_layout.addWidget(text_edit)
+        query_page_layout.addWidget(param_table)
+        editor_stack.addWidget(query_page)
+
+        param_timer = QTimer(tab_content)
+        param_timer.setSingleShot(True)
+        param_timer.setInterval(300)
+        param_timer.timeout.connect(lambda: self.refresh_param_panel(tab_content))
+        text_edit.textChanged.connect(param_timer.start)
+        # Large scripts show the placeholders of the statement under the cursor
+        text_edit.cursorPositionChanged.connect(
+            lambda: text_edit.is_large() and param_timer.start())
+        text_edit.highlighter.lexed.connect(lambda first: first < 0 and param_timer.start())
 
         # Page 1: History View
         history_widget = QSplitter(Qt.Orientation.Horizontal)
         history_list_view = QTreeView()
         history_list_view.setObjectName("history_list_view")
         history_list_view.setHeaderHidden(True)
+        # Several entries can be selected for a workload replay
+        history_list_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         history_list_view.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers)
 
@@ -267,12 +832,18 @@ class MainWindow(QMainWindow):
         copy_to_edit_btn = QPushButton("Copy to Edit Query")
         remove_history_btn = QPushButton("Remove")
         remove_all_history_btn = QPushButton("Remove All")
+        show_plan_btn = QPushButton("Show Plan")
+        compare_history_btn = QPushButton("Compare Results...")
+        replay_history_btn = QPushButton("Replay...")
 
         history_button_layout.addStretch()
         history_button_layout.addWidget(copy_history_btn)
         history_button_layout.addWidget(copy_to_edit_btn)
         history_button_layout.addWidget(remove_history_btn)
         history_button_layout.addWidget(remove_all_history_btn)
+        history_button_layout.addWidget(show_plan_btn)
+        history_button_layout.addWidget(compare_history_btn)
+        history_button_layout.addWidget(replay_history_btn)
         history_details_layout.addLayout(history_button_layout)
 
         history_widget.addWidget(history_list_view)
@@ -307,6 +878,12 @@ class MainWindow(QMainWindow):
             lambda: self.remove_selected_history(tab_content))
         remove_all_history_btn.clicked.connect(
             lambda: self.remove_all_history_for_connection(tab_content))
+        show_plan_btn.clicked.connect(
+            lambda: self.show_history_plan(tab_content))
+        compare_history_btn.clicked.connect(
+            lambda: self.compare_history_results(tab_content))
+        replay_history_btn.clicked.connect(
+            lambda: self.replay_workload(tab_content))
 
         # --- Bottom Part: Results ---
         results_container = QWidget()
@@ -323,17 +900,46 @@ class MainWindow(QMainWindow):
         output_btn = QPushButton("Output")
         message_btn = QPushButton("Message")
         notification_btn = QPushButton("Notification")
+        plan_btn = QPushButton("Plan")
 
         output_btn.setCheckable(True)
         message_btn.setCheckable(True)
         notification_btn.setCheckable(True)
+        plan_btn.setCheckable(True)
         output_btn.setChecked(True)
 
         header_layout.addWidget(output_btn)
         header_layout.addWidget(message_btn)
         header_layout.addWidget(notification_btn)
+        header_layout.addWidget(plan_btn)
         header_layout.addStretch()
 
+        # In-place editing of single-table results, see change_set.py
+        edit_btn = QPushButton("Edit")
+        edit_btn.setObjectName("edit_rows_btn")
+        edit_btn.setCheckable(True)
+        edit_btn.setToolTip("Edit, add and delete rows of a single-table query result")
+        edit_btn.toggled.connect(lambda checked: self.toggle_result_editing(tab_content, checked))
+        header_layout.addWidget(edit_btn)
+        for name, text, handler in (("add_row_btn", "Add Row", self.add_result_row),
+                                    ("delete_rows_btn", "Delete Rows", self.delete_result_rows),
+                                    ("save_changes_btn", "Save Changes...", self.save_result_changes),
+                                    ("discard_changes_btn", "Discard", self.discard_result_changes)):
+            button = QPushButton(text)
+            button.setObjectName(name)
+            button.setEnabled(False)
+            button.clicked.connect(partial(handler, tab_content))
+            header_layout.addWidget(button)
+
+        result_filter_edit = QLineEdit()
+        result_filter_edit.setObjectName("result_filter")
+        result_filter_edit.setClearButtonEnabled(True)
+        result_filter_edit.setPlaceholderText("Filter rows: text, or column > value and ...")
+        result_filter_edit.setMaximumWidth(320)
+        result_filter_edit.returnPressed.connect(
+            lambda: self.apply_result_filter(tab_content))
+        header_layout.addWidget(result_filter_edit)
+
         results_layout.addWidget(results_header)
 
         results_stack = QStackedWidget()
@@ -342,6 +948,11 @@ class MainWindow(QMainWindow):
         table_view = QTableView()
         table_view.setObjectName("result_table")
         table_view.setAlternatingRowColors(True)
+        # Header clicks sort the fetched rows in memory (ResultTableModel.sort)
+        table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table_view.setSortingEnabled(True)
+        table_view.doubleClicked.connect(
+            lambda index: self.open_cell_viewer(tab_content, index))
         results_stack.addWidget(table_view)
 
         message_view = QTextEdit()
@@ -349,24 +960,47 @@ class MainWindow(QMainWindow):
         message_view.setReadOnly(True)
         results_stack.addWidget(message_view)
 
-        notification_view = QLabel("Notifications will appear here.")
-        notification_view.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        results_stack.addWidget(notification_view)
+        # --- Notification View (Page 2): app messages plus LISTEN subscriptions ---
+        notification_page = QWidget()
+        notification_layout = QVBoxLayout(notification_page)
+        notification_layout.setContentsMargins(0, 0, 0, 0)
+        notification_layout.setSpacing(2)
+        listen_bar = QHBoxLayout()
+        listen_bar.setContentsMargins(5, 2, 5, 0)
+        channel_input = QLineEdit()
+        channel_input.setObjectName("listen_channel")
+        channel_input.setPlaceholderText("Channel")
+        channel_input.setMaximumWidth(200)
+        channel_input.returnPressed.connect(lambda: self.listen_channel(tab_content))
+        listen_btn = QPushButton("Listen")
+        listen_btn.clicked.connect(lambda: self.listen_channel(tab_content))
+        unlisten_btn = QPushButton("Unlisten")
+        unlisten_btn.clicked.connect(lambda: self.unlisten_channel(tab_content))
+        listen_stats_label = QLabel("Not listening")
+        listen_stats_label.setObjectName("listen_stats_label")
+        listen_bar.addWidget(channel_input)
+        listen_bar.addWidget(listen_btn)
+        listen_bar.addWidget(unlisten_btn)
+        listen_bar.addWidget(listen_stats_label, 1)
+        notification_layout.addLayout(listen_bar)
+
+        notification_view = QListView()
+        notification_view.setObjectName("notification_list")
+        # Uniform sizes keep the view virtualized: only visible rows are ever laid out
+        notification_view.setUniformItemSizes(True)
+        notification_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        notification_view.setModel(NotificationLogModel(parent=notification_view))
+        notification_layout.addWidget(notification_view)
+        results_stack.addWidget(notification_page)
 
         # --- Spinner View (Page 3) ---
         spinner_overlay_widget = QWidget()
         spinner_layout = QHBoxLayout(spinner_overlay_widget)
         spinner_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        spinner_movie = QMovie("assets/spinner.gif")
+        # The spinner GIF is loaded on first use, see _ensure_spinner_movie
         spinner_label = QLabel()
         spinner_label.setObjectName("spinner_label")
 
-        if not spinner_movie.isValid():
-            spinner_label.setText("Loading...")  # Fallback text
-        else:
-            spinner_label.setMovie(spinner_movie)
-            spinner_movie.setScaledSize(QSize(32, 32))
-
         loading_text_label = QLabel("Waiting for query to complete...")
         font = QFont()
         font.setPointSize(10)
@@ -376,23 +1010,27 @@ class MainWindow(QMainWindow):
         spinner_layout.addWidget(loading_text_label)
         results_stack.addWidget(spinner_overlay_widget)
 
+        # --- Plan View (Page 4) ---
+        plan_tree = QTreeView()
+        plan_tree.setObjectName("plan_tree")
+        plan_tree.setAlternatingRowColors(True)
+        plan_tree.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        results_stack.addWidget(plan_tree)
+
         results_layout.addWidget(results_stack)
 
         tab_status_label = QLabel("Ready")
         tab_status_label.setObjectName("tab_status_label")
         results_layout.addWidget(tab_status_label)
 
-        button_group = [output_btn, message_btn, notification_btn]
-
         def switch_results_view(index):
-            if results_stack.currentIndex() != 3:
-                results_stack.setCurrentIndex(index)
-                for i, btn in enumerate(button_group):
-                    btn.setChecked(i == index)
+            if results_stack.currentIndex() != self.SPINNER_PAGE:
+                self._show_results_page(tab_content, index)
 
         output_btn.clicked.connect(lambda: switch_results_view(0))
         message_btn.clicked.connect(lambda: switch_results_view(1))
         notification_btn.clicked.connect(lambda: switch_results_view(2))
+        plan_btn.clicked.connect(lambda: switch_results_view(self.PLAN_PAGE))
 
         main_vertical_splitter.addWidget(results_container)
         main_vertical_splitter.setSizes([300, 300])
@@ -416,7 +1054,12 @@ class MainWindow(QMainWindow):
             if "timeout_timer" in self.tab_timers[tab]:
                 self.tab_timers[tab]["timeout_timer"].stop()
             del self.tab_timers[tab]
+        self.table_browsers.pop(tab, None)
         if self.tab_widget.count() > 1:
+            self.close_session(tab)
+            table_view = tab.findChild(QTableView, "result_table")
+            if table_view and isinstance(table_view.model(), ResultTableModel):
+                table_view.model().release()
             self.tab_widget.removeTab(index)
             self.renumber_tabs()
         else:
@@ -426,10 +1069,11 @@ class MainWindow(QMainWindow):
         for i in range(self.tab_widget.count()):
             self.tab_widget.setTabText(i, f"Worksheet {i + 1}")
 
-    def load_object_explorer_data(self):
+    def load_object_explorer_data(self, categories_data=None):
         self.model.clear()
         self.model.setHorizontalHeaderLabels(["Object Explorer"])
-        categories_data = self.db_manager.get_all_connections_hierarchy()
+        if categories_data is None:
+            categories_data = self.db_manager.get_all_connections_hierarchy()
 
         for cat_data in categories_data:
             cat_item = QStandardItem(cat_data["name"])
@@ -437,19 +1081,35 @@ class MainWindow(QMainWindow):
             cat_item.setData(cat_data["id"], Qt.ItemDataRole.UserRole + 1)
 
             for subcat_data in cat_data["subcategories"]:
-                subcat_item = QStandardItem(subcat_data["name"])
-                # Store subcategory ID
-                subcat_item.setData(
-                    subcat_data["id"], Qt.ItemDataRole.UserRole + 1)
-
+                subcat_item = self._make_group_item(subcat_data["id"], subcat_data["name"])
                 for item_data in subcat_data["items"]:
-                    item_item = QStandardItem(item_data["name"])
-                    # Store full connection data
-                    item_item.setData(item_data, Qt.ItemDataRole.UserRole)
-                    subcat_item.appendRow(item_item)
+                    subcat_item.appendRow(self._make_connection_item(item_data))
                 cat_item.appendRow(subcat_item)
             self.model.appendRow(cat_item)
 
+    # --- Incremental Object Explorer updates (keep expansion state, no reload) ---
+    def _make_group_item(self, subcat_id, name):
+        subcat_item = QStandardItem(name)
+        # Store subcategory ID
+        subcat_item.setData(subcat_id, Qt.ItemDataRole.UserRole + 1)
+        return subcat_item
+
+    def _make_connection_item(self, conn_data):
+        item_item = QStandardItem(conn_data["name"])
+        # Store full connection data
+        item_item.setData(conn_data, Qt.ItemDataRole.UserRole)
+        return item_item
+
+    def _connection_data(self, item_id, data, usage_count=0):
+        """Builds the same dict get_all_connections_hierarchy returns for a dialog's data."""
+        conn_data = {"id": item_id, "name": data["name"], "host": None, "database": None,
+                     "user": None, "password": None, "port": None, "db_path": None,
+                     "sqlite_profile": None}
+        conn_data.update(data)
+        # Dialog data may carry "id": None for a new connection
+        conn_data.update(id=item_id, usage_count=usage_count)
+        return conn_data
+
     def item_clicked(self, index):
         item = self.model.itemFromIndex(index)
         depth = self.get_item_depth(item)
@@ -466,6 +1126,7 @@ class MainWindow(QMainWindow):
         if depth == 3:  # Connection item clicked
             conn_data = item.data(Qt.ItemDataRole.UserRole)
             if conn_data:
+                self.warm_connection(conn_data)
                 self.status.showMessage(
                     f"Loading schema for {conn_data.get('name')}...", 3000)
 
@@ -484,6 +1145,7 @@ class MainWindow(QMainWindow):
                     )
         # Reconnect the main schema expansion handler
         self.schema_tree.expanded.connect(self._handle_schema_tree_expansion)
+        self.schema_tree.setColumnWidth(0, 180)
 
     def _handle_schema_tree_expansion(self, index: QModelIndex):
         """Generic handler for schema tree expansion, delegates to active connector."""
@@ -491,6 +1153,40 @@ class MainWindow(QMainWindow):
             self.active_schema_connector.load_tables_on_expand(
                 index, self.schema_model, self.status.showMessage)
 
+    # --- Connection warm-up and health ---
+    def warm_connection(self, conn_data):
+        if is_poolable(conn_data):
+            self.thread_pool.start(RunnableWarmUp(
+                self.connection_pool, conn_data, self.pool_signals))
+
+    def run_connection_health_check(self):
+        self.thread_pool.start(RunnableHealthCheck(self.connection_pool, self.pool_signals))
+
+    def _find_explorer_item(self, conn_id):
+        for cat_row in range(self.model.rowCount()):
+            cat_item = self.model.item(cat_row)
+            for subcat_row in range(cat_item.rowCount()):
+                subcat_item = cat_item.child(subcat_row)
+                for row in range(subcat_item.rowCount()):
+                    item = subcat_item.child(row)
+                    conn_data = item.data(Qt.ItemDataRole.UserRole)
+                    if conn_data and conn_data.get("id") == conn_id:
+                        return item
+        return None
+
+    def update_connection_health(self, health):
+        for conn_id, state in health.items():
+            item = self._find_explorer_item(conn_id)
+            if not item:
+                continue
+            checked = time.strftime("%H:%M:%S", time.localtime(state["checked_at"]))
+            if state["ok"]:
+                item.setData(QColor("#3c9d48"), Qt.ItemDataRole.DecorationRole)
+                item.setToolTip(f"Healthy | round trip {state['rtt_ms']:.1f} ms | checked {checked}")
+            else:
+                item.setData(QColor("#c94c3c"), Qt.ItemDataRole.DecorationRole)
+                item.setToolTip(f"Unreachable | {state['error']} | checked {checked}")
+
     def get_item_depth(self, item):
         depth = 0
         parent = item.parent()
@@ -537,6 +1233,15 @@ class MainWindow(QMainWindow):
                 delete_action.triggered.connect(
                     lambda: self.delete_connection_item(item))
                 menu.addAction(delete_action)
+                menu.addSeparator()
+                thresholds_action = QAction("Slow Query Thresholds...", self)
+                thresholds_action.triggered.connect(
+                    lambda: self.edit_slow_query_thresholds(conn_data))
+                menu.addAction(thresholds_action)
+                slow_log_action = QAction("View Slow Query Log", self)
+                slow_log_action.triggered.connect(
+                    lambda: self.show_slow_query_log(conn_data))
+                menu.addAction(slow_log_action)
         menu.exec(self.tree.viewport().mapToGlobal(pos))
 
     def add_subcategory(self, parent_item):
@@ -544,9 +1249,9 @@ class MainWindow(QMainWindow):
         if ok and name:
             try:
                 category_id = parent_item.data(Qt.ItemDataRole.UserRole+1)
-                self.db_manager.add_subcategory(category_id, name)
-                self.load_object_explorer_data()
-                self.refresh_all_comboboxes()
+                subcat_id = self.db_manager.add_subcategory(category_id, name)
+                parent_item.appendRow(self._make_group_item(subcat_id, name))
+                self.tree.expand(parent_item.index())
             except Exception as e:
                 QMessageBox.critical(
                     self, "Error", f"Failed to add group:\n{e}")
@@ -557,9 +1262,12 @@ class MainWindow(QMainWindow):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             try:
-                self.db_manager.add_connection(subcat_id, data)
-                self.load_object_explorer_data()
-                self.refresh_all_comboboxes()
+                item_id = self.db_manager.add_connection(subcat_id, data)
+                conn_data = self._connection_data(item_id, data)
+                parent_item.appendRow(self._make_connection_item(conn_data))
+                self.tree.expand(parent_item.index())
+                self.connection_list.add_connection(
+                    parent_item.parent().text(), parent_item.text(), conn_data)
             except Exception as e:
                 QMessageBox.critical(
                     self, "Error", f"Failed to save connection:\n{e}")
@@ -580,8 +1288,12 @@ class MainWindow(QMainWindow):
             new_data = dialog.get_data()
             try:
                 self.db_manager.update_connection(conn_data["id"], new_data)
-                self.load_object_explorer_data()
-                self.refresh_all_comboboxes()
+                self._drop_connection_state(conn_data["id"])
+                updated = self._connection_data(
+                    conn_data["id"], new_data, conn_data.get("usage_count") or 0)
+                item.setText(updated["name"])
+                item.setData(updated, Qt.ItemDataRole.UserRole)
+                self.connection_list.update_connection(updated)
             except Exception as e:
                 QMessageBox.critical(
                     self, "Error", f"Failed to update connection:\n{e}")
@@ -594,36 +1306,27 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 self.db_manager.delete_connection(item_id)
-                self.load_object_explorer_data()
-                self.refresh_all_comboboxes()
+                self._drop_connection_state(item_id)
+                item.parent().removeRow(item.row())
+                self.connection_list.remove_connection(item_id)
             except Exception as e:
                 QMessageBox.critical(
                     self, "Error", f"Failed to delete item:\n{e}")
 
-    def refresh_all_comboboxes(self):
-        for i in range(self.tab_widget.count()):
-            tab = self.tab_widget.widget(i)
-            combo_box = tab.findChild(QComboBox, "db_combo_box")
-            if combo_box:
-                self.load_joined_items(combo_box)
-
-    def load_joined_items(self, combo_box):
-        try:
-            current_data_id = combo_box.currentData().get(
-                'id') if combo_box.currentData() else None
-            combo_box.clear()
-            all_items = self.db_manager.get_all_joined_connections()
-            for cat_name, subcat_name, item_name, conn_data in all_items:
-                visible_text = f"{cat_name} -> {subcat_name} -> {item_name}"
-                combo_box.addItem(visible_text, conn_data)
-
-            if current_data_id is not None:
-                for i in range(combo_box.count()):
-                    if combo_box.itemData(i) and combo_box.itemData(i)['id'] == current_data_id:
-                        combo_box.setCurrentIndex(i)
-                        break
-        except Exception as e:
-            self.status.showMessage(f"Error loading connections: {e}", 4000)
+    def _drop_connection_state(self, conn_id):
+        """Closes everything still open with a connection's old settings: pooled
+        connections, its notification listener and worksheet sessions."""
+        self.connection_pool.discard(conn_id)
+        listener = self.listeners.pop(conn_id, None)
+        if listener is not None:
+            listener.stop()
+            self._update_listen_stats(conn_id, {})
+        for target_tab, session in list(self.sessions.items()):
+            if session.conn_data.get("id") == conn_id:
+                if session.state != STATE_IDLE:
+                    self.status.showMessage(
+                        "Connection changed: the previous session's open transaction was rolled back", 5000)
+                self.close_session(target_tab)
 
     # def execute_query(self):
     #     current_tab = self.tab_widget.currentWidget()
@@ -674,7 +1377,8 @@ class MainWindow(QMainWindow):
     #     timeout_timer.start(self.QUERY_TIMEOUT)
     #     self.status_message_label.setText("Executing query...")
 
-    def execute_query(self):
+    def execute_query(self, statement=None):
+        """Runs the whole editor text, or `statement` (part of it) if given."""
         current_tab = self.tab_widget.currentWidget()
         if not current_tab:
             return
@@ -696,12 +1400,20 @@ class MainWindow(QMainWindow):
                                 "A query is already running in this tab.")
             return
 
-        query_editor = current_tab.findChild(QTextEdit, "query_editor")
+        result_model = self._result_model(current_tab)
+        if result_model and result_model.has_pending_changes():
+            reply = QMessageBox.question(
+                self, "Unsaved Changes",
+                f"The result has unsaved changes ({result_model.change_set.summary()}). Discard them?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        query_editor = current_tab.findChild(SqlEditor, "query_editor")
         db_combo_box = current_tab.findChild(QComboBox, "db_combo_box")
 
         index = db_combo_box.currentIndex()
         conn_data = db_combo_box.itemData(index)
-        query = query_editor.toPlainText().strip()
+        query = statement if statement is not None else query_editor.toPlainText().strip()
 
         # --- NEW: Semicolon Check ---
         if not query.endswith(';'):
@@ -716,10 +1428,218 @@ class MainWindow(QMainWindow):
             self.status.showMessage("Connection or query is empty", 3000)
             return
 
+        # Most used connections sort first in every worksheet's list
+        self.db_manager.increment_usage_count(conn_data.get("id"))
+        self.connection_list.record_usage(conn_data.get("id"))
+
+        params = self.collect_query_params(current_tab, query)
+        session = self._session_for(current_tab, conn_data)
+
+        timeout_timer = self._start_progress(current_tab)
+        signals = QuerySignals()
+        signals.finished.connect(
+            partial(self.handle_query_result, current_tab))
+        signals.error.connect(partial(self.handle_query_error, current_tab))
+        signals.progress.connect(partial(self.handle_query_progress, current_tab))
+        self.tab_timers[current_tab]["conn_data"] = conn_data
+        if self.async_engine_action.isChecked() and not session and not conn_data.get("db_path"):
+            # Same signals and cancel() as RunnableQuery, without tying up a pool thread
+            runnable = self.async_engine.submit(
+                conn_data, query, signals, params=params,
+                memory_budget_bytes=self.tab_result_budget)
+        else:
+            runnable = RunnableQuery(
+                conn_data, query, signals, params=params,
+                decode_in_pool=self.decode_in_pool_action.isChecked(),
+                memory_budget_bytes=self.tab_result_budget,
+                pool=None if session else self.connection_pool, session=session)
+            self.thread_pool.start(runnable)
+        timeout_timer.timeout.connect(
+            partial(self.handle_query_timeout, current_tab, runnable))
+        self.running_queries[current_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        timeout_timer.start(self.QUERY_TIMEOUT)
+        self.status_message_label.setText("Executing query...")
+
+    def execute_statement(self):
+        current_tab = self.tab_widget.currentWidget()
+        if not current_tab:
+            return
+
+        def run(statement):
+            if not statement:
+                self.status.showMessage("No statement under the cursor", 3000)
+            elif self.tab_widget.currentWidget() is current_tab:
+                self.execute_query(statement)
+            else:
+                self.status.showMessage("Statement not run: its worksheet is no longer the current tab", 5000)
+
+        if not current_tab.findChild(SqlEditor, "query_editor").request_statement(run):
+            # Lexing a large script continues in the background; the statement runs when it's reached
+            self.status.showMessage("Finding the statement's boundaries in the script; it runs when done...")
+
+    def open_sql_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Open SQL File", "", "SQL Files (*.sql);;All Files (*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not open {file_path}:\n{e}")
+            return
+        new_tab = self.add_tab()
+        self.tab_widget.setTabToolTip(self.tab_widget.indexOf(new_tab), file_path)
+        query_editor = new_tab.findChild(SqlEditor, "query_editor")
+        query_editor.load_text(text)
+        self.status.showMessage(
+            f"Opened {os.path.basename(file_path)} ({format_size(len(text))}, "
+            f"{query_editor.blockCount():,} lines)", 5000)
+
+    # --- Query Parameters ---
+    def refresh_param_panel(self, target_tab):
+        param_table = target_tab.findChild(QTableWidget, "param_table")
+        query_editor = target_tab.findChild(SqlEditor, "query_editor")
+        text = query_editor.statement_at_cursor() if query_editor.is_large() else query_editor.toPlainText()
+        if text is None:
+            return  # Not lexed yet; refreshed again once background lexing catches up
+        names = find_placeholders(text)
+        current = self._param_panel_values(param_table)
+        if names == list(current):
+            return
+        param_table.setRowCount(len(names))
+        for row, name in enumerate(names):
+            name_item = QTableWidgetItem(name)
+            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            param_table.setItem(row, 0, name_item)
+            # Keep values already typed for names that are still in the query
+            param_table.setItem(row, 1, QTableWidgetItem(current.get(name, "")))
+        param_table.setVisible(bool(names))
+
+    def _param_panel_values(self, param_table):
+        values = {}
+        for row in range(param_table.rowCount()):
+            name_item, value_item = param_table.item(row, 0), param_table.item(row, 1)
+            if name_item:
+                values[name_item.text()] = value_item.text() if value_item else ""
+        return values
+
+    def collect_query_params(self, target_tab, query):
+        """{name: typed value} for the query's placeholders, or None if it has none."""
+        names = find_placeholders(query)
+        if not names:
+            return None
+        self.refresh_param_panel(target_tab)
+        values = self._param_panel_values(target_tab.findChild(QTableWidget, "param_table"))
+        return {name: parse_value(values.get(name, "")) for name in names}
+
+    # --- Persistent Sessions ---
+    def _session_for(self, target_tab, conn_data):
+        """The tab's session if 'Persistent session' is on, created on first use."""
+        if not target_tab.findChild(QCheckBox, "session_checkbox").isChecked():
+            return None
+        session = self.sessions.get(target_tab)
+        if session is None:
+            session = self.sessions[target_tab] = WorksheetSession(conn_data)
+        return session
+
+    def toggle_session(self, target_tab, checked):
+        if not checked:
+            session = self.sessions.get(target_tab)
+            if session and session.state != STATE_IDLE:
+                reply = QMessageBox.question(
+                    self, "Open Transaction",
+                    "This worksheet has an open transaction. Close the session and roll it back?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+                if reply != QMessageBox.StandardButton.Yes:
+                    checkbox = target_tab.findChild(QCheckBox, "session_checkbox")
+                    checkbox.blockSignals(True)
+                    checkbox.setChecked(True)
+                    checkbox.blockSignals(False)
+                    return
+            self.close_session(target_tab)
+        self.update_session_label(target_tab)
+
+    def close_session(self, target_tab):
+        session = self.sessions.pop(target_tab, None)
+        if session:
+            if target_tab in self.running_queries:
+                session.cancel()
+            session.close()
+        self.update_session_label(target_tab)
+
+    def _session_connection_changed(self, target_tab):
+        session = self.sessions.get(target_tab)
+        conn_data = target_tab.findChild(QComboBox, "db_combo_box").currentData()
+        if session and (not conn_data or conn_data.get("id") != session.conn_data.get("id")):
+            if session.state != STATE_IDLE:
+                self.status.showMessage(
+                    "Connection changed: the previous session's open transaction was rolled back", 5000)
+            self.close_session(target_tab)
+
+    def run_session_command(self, command):
+        current_tab = self.tab_widget.currentWidget()
+        if not current_tab:
+            return
+        conn_data = current_tab.findChild(QComboBox, "db_combo_box").currentData()
+        if not conn_data:
+            self.status.showMessage("No connection selected", 3000)
+            return
+        checkbox = current_tab.findChild(QCheckBox, "session_checkbox")
+        if not checkbox.isChecked():
+            if command != "BEGIN":
+                self.status.showMessage("This worksheet has no persistent session", 3000)
+                return
+            # Begin implies a session: the transaction must outlive this statement
+            checkbox.setChecked(True)
+        session = self._session_for(current_tab, conn_data)
+        signals = SessionSignals()
+        signals.done.connect(lambda cmd, state: self._session_command_done(current_tab, cmd))
+        signals.error.connect(
+            lambda error: self.status.showMessage(f"{command} failed: {error}", 5000))
+        signals.error.connect(lambda error: self.update_session_label(current_tab))
+        session.signals = signals  # Keep alive until the command finishes
+        self.thread_pool.start(RunnableSessionCommand(session, command, signals))
+
+    def _session_command_done(self, target_tab, command):
+        self.status.showMessage(f"{command.capitalize()} done", 3000)
+        self.update_session_label(target_tab)
+
+    def update_session_label(self, target_tab):
+        label = target_tab.findChild(QLabel, "session_state_label")
+        if not label:
+            return
+        session = self.sessions.get(target_tab)
+        if not session:
+            label.setText("")
+            label.setStyleSheet("")
+            return
+        state = session.state
+        text = f"Session: {state}"
+        if state != STATE_IDLE and session.transaction_started:
+            text += f" ({int(time.time() - session.transaction_started)}s)"
+        label.setText(text)
+        label.setStyleSheet("" if state == STATE_IDLE else "color: #b35900; font-weight: bold;")
+
+    def monitor_sessions(self):
+        for target_tab, session in list(self.sessions.items()):
+            self.update_session_label(target_tab)
+            idle_for = session.idle_in_transaction_for()
+            if idle_for >= IDLE_IN_TRANSACTION_WARN_SEC and not session.warned:
+                session.warned = True
+                text = (f"Idle in transaction for {int(idle_for)}s on "
+                        f"{session.conn_data.get('name')}: locks are held until you Commit or Rollback.")
+                target_tab.findChild(QListView, "notification_list").model().add(text)
+                self.status.showMessage(text, 10000)
+
+    def _start_progress(self, current_tab):
+        """Shows the spinner and starts the elapsed/timeout timers; returns the timeout timer."""
         results_stack = current_tab.findChild(
             QStackedWidget, "results_stacked_widget")
         spinner_label = results_stack.findChild(QLabel, "spinner_label")
-        results_stack.setCurrentIndex(3)
+        results_stack.setCurrentIndex(self.SPINNER_PAGE)
+        self._ensure_spinner_movie(spinner_label)
         if spinner_label and spinner_label.movie():
             spinner_label.movie().start()
 
@@ -733,24 +1653,52 @@ class MainWindow(QMainWindow):
         progress_timer.timeout.connect(
             partial(self.update_timer_label, tab_status_label, current_tab))
         progress_timer.start(100)
-        signals = QuerySignals()
-        runnable = RunnableQuery(conn_data, query, signals)
-        signals.finished.connect(
-            partial(self.handle_query_result, current_tab))
-        signals.error.connect(partial(self.handle_query_error, current_tab))
-        timeout_timer.timeout.connect(
-            partial(self.handle_query_timeout, current_tab, runnable))
-        self.running_queries[current_tab] = runnable
-        self.cancel_action.setEnabled(True)
-        self.thread_pool.start(runnable)
-        timeout_timer.start(self.QUERY_TIMEOUT)
-        self.status_message_label.setText("Executing query...")
+        return timeout_timer
+
+    def _ensure_spinner_movie(self, spinner_label):
+        if not spinner_label or spinner_label.movie() or spinner_label.text():
+            return
+        spinner_movie = QMovie("assets/spinner.gif", parent=spinner_label)
+        if not spinner_movie.isValid():
+            spinner_label.setText("Loading...")  # Fallback text
+        else:
+            spinner_label.setMovie(spinner_movie)
+            spinner_movie.setScaledSize(QSize(32, 32))
 
     def update_timer_label(self, label, tab):
         if not label or tab not in self.tab_timers:
             return
-        elapsed = time.time() - self.tab_timers[tab]["start_time"]
-        label.setText(f"Running... {elapsed:.1f} sec")
+        entry = self.tab_timers[tab]
+        elapsed = time.time() - entry["start_time"]
+        if elapsed >= PROBE_AFTER_SEC:
+            self._probe_query_progress(tab, entry)
+        label.setText(format_progress(
+            elapsed, entry.get("rows"), entry.get("rate"), entry.get("probe")))
+
+    def handle_query_progress(self, target_tab, rows, rate):
+        if target_tab in self.tab_timers:
+            self.tab_timers[target_tab].update(rows=rows, rate=rate)
+
+    def _probe_query_progress(self, tab, entry):
+        """Starts a pg_stat_activity/pg_stat_progress probe, one at a time per tab."""
+        pid = getattr(self.running_queries.get(tab), "backend_pid", None)
+        conn_data = entry.get("conn_data")
+        if (not pid or not conn_data or conn_data.get("db_path") or entry.get("probing")
+                or time.time() - entry.get("probed_at", 0) < PROBE_INTERVAL_SEC):
+            return
+        entry["probing"] = True
+        signals = ProgressSignals()
+        signals.probed.connect(partial(self.handle_progress_probe, tab, entry))
+        signals.error.connect(partial(self.handle_progress_probe, tab, entry, None))
+        entry["probe_signals"] = signals  # Keep alive until the probe reports
+        self.thread_pool.start(RunnableProgressProbe(
+            self.connection_pool, conn_data, pid, signals))
+
+    def handle_progress_probe(self, tab, entry, probe, error=None):
+        # entry is only current while it is still the tab's timer entry
+        entry.update(probing=False, probed_at=time.time())
+        if self.tab_timers.get(tab) is entry and probe is not None:
+            entry["probe"] = probe
 
     def handle_query_result(self, target_tab, conn_data, query, results, columns, row_count, elapsed_time, is_select_query):
         if target_tab in self.tab_timers:
@@ -763,27 +1711,361 @@ class MainWindow(QMainWindow):
         message_view = target_tab.findChild(QTextEdit, "message_view")
         tab_status_label = target_tab.findChild(QLabel, "tab_status_label")
         if is_select_query:
-            model = QStandardItemModel()
-            model.setHorizontalHeaderLabels(columns)
-            for row in results:
-                model.appendRow([QStandardItem(str(cell)) for cell in row])
-            table_view.setModel(model)
+            model = ResultTableModel(columns, results)
+            model.origin = (conn_data, query)
+            self._set_result_model(table_view, model)
             msg = f"Query executed successfully.\n\nTotal rows: {row_count}\nTime: {elapsed_time:.2f} sec"
             status = f"Query executed successfully | Total rows: {row_count} | Time: {elapsed_time:.2f} sec"
+            if model.is_spilled():
+                msg += "\n\nResult exceeded the memory budget and was spilled to a temporary file on disk."
+                status += " | Spilled to disk"
+            column_stats = model.column_stats()
+            if column_stats:
+                self._apply_column_widths(table_view, column_stats)
+                msg += "\n\n" + self._format_column_stats(columns, column_stats)
         else:
             # Clear table view for non-select
-            table_view.setModel(QStandardItemModel())
+            self._set_result_model(table_view, QStandardItemModel())
             msg = f"Command executed successfully.\n\nRows affected: {row_count}\nTime: {elapsed_time:.2f} sec"
             status = f"Command executed successfully | Rows affected: {row_count} | Time: {elapsed_time:.2f} sec"
         message_view.setText(msg)
         tab_status_label.setText(status)
         self.status_message_label.setText("Ready")
+        self.update_session_label(target_tab)
         self.stop_spinner(target_tab, success=True)
         if target_tab in self.running_queries:
             del self.running_queries[target_tab]
         if not self.running_queries:
             self.cancel_action.setEnabled(False)
 
+    def _set_result_model(self, table_view, model):
+        old_model = table_view.model()
+        table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table_view.setModel(model)
+        results_container = table_view.parentWidget().parentWidget()
+        filter_edit = results_container.findChild(QLineEdit, "result_filter")
+        if filter_edit:
+            filter_edit.clear()
+        edit_btn = results_container.findChild(QPushButton, "edit_rows_btn")
+        if edit_btn:
+            # A new result always starts read-only
+            edit_btn.blockSignals(True)
+            edit_btn.setChecked(False)
+            edit_btn.blockSignals(False)
+            self._set_edit_buttons(results_container, False)
+        if isinstance(old_model, ResultTableModel):
+            old_model.release()
+
+    def apply_result_filter(self, target_tab):
+        table_view = target_tab.findChild(QTableView, "result_table")
+        model = table_view.model()
+        if not isinstance(model, ResultTableModel):
+            return
+        text = target_tab.findChild(QLineEdit, "result_filter").text()
+        start = time.perf_counter()
+        try:
+            model.set_filter(text)
+        except ValueError as e:
+            self.status.showMessage(f"Invalid filter: {e}", 5000)
+            return
+        elapsed = time.perf_counter() - start
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Showing {model.rowCount()} of {model.source_row_count()} rows | Filter time: {elapsed:.2f} sec")
+        self._show_results_page(target_tab, 0)
+
+    # --- Result Editing ---
+    def _result_model(self, target_tab):
+        model = target_tab.findChild(QTableView, "result_table").model()
+        return model if isinstance(model, ResultTableModel) else None
+
+    def _set_edit_buttons(self, container, enabled):
+        for name in ("add_row_btn", "delete_rows_btn", "save_changes_btn", "discard_changes_btn"):
+            container.findChild(QPushButton, name).setEnabled(enabled)
+
+    def _set_edit_checked(self, target_tab, checked):
+        edit_btn = target_tab.findChild(QPushButton, "edit_rows_btn")
+        edit_btn.blockSignals(True)
+        edit_btn.setChecked(checked)
+        edit_btn.blockSignals(False)
+
+    def _edit_session(self, target_tab, conn_data):
+        """The tab's session, if the result came from its connection (temp tables only exist there)."""
+        session = self.sessions.get(target_tab)
+        if session and session.conn_data.get("id") == conn_data.get("id"):
+            return session
+        return None
+
+    def toggle_result_editing(self, target_tab, checked):
+        model = self._result_model(target_tab)
+        if not checked:
+            if model and model.has_pending_changes():
+                reply = QMessageBox.question(
+                    self, "Discard Changes",
+                    f"Discard the pending changes ({model.change_set.summary()})?")
+                if reply != QMessageBox.StandardButton.Yes:
+                    self._set_edit_checked(target_tab, True)
+                    return
+            if model and model.change_set is not None:
+                model.stop_editing()
+            self._set_edit_buttons(target_tab, False)
+            return
+        if model is None or model.origin is None:
+            self.status.showMessage("Only query results can be edited", 3000)
+            self._set_edit_checked(target_tab, False)
+            return
+        if target_tab in self.running_queries:
+            self.status.showMessage("Wait for the running query to finish", 3000)
+            self._set_edit_checked(target_tab, False)
+            return
+        conn_data, query = model.origin
+        columns = [model.headerData(col, Qt.Orientation.Horizontal) for col in range(model.columnCount())]
+        session = self._edit_session(target_tab, conn_data)
+        signals = EditSignals()
+        signals.resolved.connect(partial(self.handle_edit_target, target_tab, model))
+        signals.error.connect(partial(self.handle_edit_error, target_tab))
+        self.edit_signals[target_tab] = signals  # Keep alive until the lookup finishes
+        self.status_message_label.setText("Looking up the result's table...")
+        self.thread_pool.start(RunnableResolveEditTarget(
+            conn_data, query, columns, signals,
+            pool=None if session else self.connection_pool, session=session))
+
+    def handle_edit_target(self, target_tab, model, target):
+        self.edit_signals.pop(target_tab, None)
+        self.status_message_label.setText("Ready")
+        edit_btn = target_tab.findChild(QPushButton, "edit_rows_btn")
+        if self._result_model(target_tab) is not model or not edit_btn.isChecked():
+            return  # Replaced by a new result, or switched off, while looking up
+        model.start_editing(target)
+        self._set_edit_buttons(target_tab, True)
+        status = (f"Editing {target.qualified} | Double-click a cell to change it (NULL for null); "
+                  f"changes are written together by Save Changes")
+        read_only = [model.headerData(col, Qt.Orientation.Horizontal)
+                     for col in range(model.columnCount()) if col not in target.editable]
+        if read_only:
+            status += f" | Read-only: {', '.join(read_only)}"
+        target_tab.findChild(QLabel, "tab_status_label").setText(status)
+
+    def handle_edit_error(self, target_tab, error_message):
+        self.edit_signals.pop(target_tab, None)
+        self.status_message_label.setText("Ready")
+        self._set_edit_checked(target_tab, False)
+        QMessageBox.warning(self, "Cannot Edit Result", error_message)
+
+    def _show_pending_changes(self, target_tab, model):
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Editing {model.change_set.target.qualified} | Pending: {model.change_set.summary()}")
+
+    def add_result_row(self, target_tab):
+        model = self._result_model(target_tab)
+        if model is None or model.change_set is None:
+            return
+        table_view = target_tab.findChild(QTableView, "result_table")
+        row = model.insert_row()
+        index = model.index(row, min(model.change_set.target.editable))
+        table_view.scrollTo(index)
+        table_view.setCurrentIndex(index)
+        table_view.edit(index)
+        self._show_pending_changes(target_tab, model)
+
+    def delete_result_rows(self, target_tab):
+        model = self._result_model(target_tab)
+        if model is None or model.change_set is None:
+            return
+        table_view = target_tab.findChild(QTableView, "result_table")
+        rows = {index.row() for index in table_view.selectionModel().selectedIndexes()}
+        if not rows:
+            self.status.showMessage("Select the rows to delete first", 3000)
+            return
+        model.delete_rows(rows)
+        self._show_pending_changes(target_tab, model)
+
+    def discard_result_changes(self, target_tab):
+        model = self._result_model(target_tab)
+        if model is None or model.change_set is None:
+            return
+        model.start_editing(model.change_set.target)
+        self._show_pending_changes(target_tab, model)
+
+    def save_result_changes(self, target_tab):
+        model = self._result_model(target_tab)
+        if model is None or not model.has_pending_changes():
+            self.status.showMessage("No changes to save", 3000)
+            return
+        change_set = model.change_set
+        if ChangePreviewDialog(self, preview_changes(change_set, model.original_value)).exec() != QDialog.DialogCode.Accepted:
+            return
+        conn_data, _ = model.origin
+        session = self._edit_session(target_tab, conn_data)
+        signals = EditSignals()
+        signals.applied.connect(partial(self.handle_changes_applied, target_tab, model))
+        signals.error.connect(partial(self.handle_changes_error, target_tab, model))
+        self.edit_signals[target_tab] = signals
+        self._set_edit_buttons(target_tab, False)
+        self.status_message_label.setText(f"Saving changes to {change_set.target.qualified}...")
+        self.thread_pool.start(RunnableApplyChanges(
+            conn_data, change_set.statements(model.original_value), signals,
+            pool=None if session else self.connection_pool, session=session))
+
+    def handle_changes_applied(self, target_tab, model, changed, committed):
+        self.edit_signals.pop(target_tab, None)
+        self.status_message_label.setText("Ready")
+        self.update_session_label(target_tab)
+        conn_data, query = model.origin
+        message = f"Saved {changed:,} row change(s) to {model.change_set.target.qualified}"
+        if not committed:
+            message += " inside the session's open transaction; Commit to keep them"
+        self.status.showMessage(message, 8000)
+        if self._result_model(target_tab) is not model:
+            return
+        model.stop_editing()
+        self._set_edit_checked(target_tab, False)
+        query_editor = target_tab.findChild(SqlEditor, "query_editor")
+        if target_tab is self.tab_widget.currentWidget() and query in (
+                query_editor.toPlainText().strip(), query_editor.statement_at_cursor()):
+            self.execute_query(query)  # Shows the rows as they are now stored
+        else:
+            target_tab.findChild(QLabel, "tab_status_label").setText(
+                message + " | Re-run the query to see the stored rows")
+
+    def handle_changes_error(self, target_tab, model, error_message):
+        self.edit_signals.pop(target_tab, None)
+        self.status_message_label.setText("Ready")
+        self.update_session_label(target_tab)
+        if self._result_model(target_tab) is model and model.change_set is not None:
+            self._set_edit_buttons(target_tab, True)
+        QMessageBox.critical(self, "Save Failed",
+                             f"{error_message}\n\nThe transaction was rolled back; your changes are still pending.")
+
+    # --- Result Diff Methods ---
+    def compare_results(self, left=None, right=None):
+        current_tab = self.tab_widget.currentWidget()
+        if not current_tab or self.db_manager is None:
+            return
+        if current_tab in self.running_queries:
+            QMessageBox.warning(self, "Query in Progress",
+                                "A query is already running in this tab.")
+            return
+        if left is None:
+            conn_data = current_tab.findChild(QComboBox, "db_combo_box").currentData()
+            query = current_tab.findChild(SqlEditor, "query_editor").toPlainText().strip()
+            left = right = (conn_data, query)
+        dialog = ResultDiffDialog(self, self.connection_proxy, left, right)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        data = dialog.get_data()
+        if not all(conn and query for conn, query in (data["left"], data["right"])):
+            self.status.showMessage("Both sides need a connection and a query", 3000)
+            return
+
+        timeout_timer = self._start_progress(current_tab)
+        signals = DiffSignals()
+        runnable = RunnableResultDiff(data["left"], data["right"], data["key_columns"], signals)
+        signals.finished.connect(partial(self.handle_diff_result, current_tab))
+        signals.error.connect(partial(self.handle_diff_error, current_tab))
+        signals.progress.connect(self.status_message_label.setText)
+        timeout_timer.timeout.connect(
+            partial(self.handle_query_timeout, current_tab, runnable))
+        self.running_queries[current_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        self.thread_pool.start(runnable)
+        timeout_timer.start(self.QUERY_TIMEOUT)
+        self.status_message_label.setText("Comparing results...")
+
+    def _finish_diff(self, target_tab):
+        if target_tab in self.tab_timers:
+            self.tab_timers[target_tab]["timer"].stop()
+            self.tab_timers[target_tab]["timeout_timer"].stop()
+            del self.tab_timers[target_tab]
+        self.running_queries.pop(target_tab, None)
+        if not self.running_queries:
+            self.cancel_action.setEnabled(False)
+        self.status_message_label.setText("Ready")
+
+    def handle_diff_result(self, target_tab, diff, elapsed_time):
+        self._finish_diff(target_tab)
+        table_view = target_tab.findChild(QTableView, "result_table")
+        rows = [(change, *values) for change, values in diff["rows"]]
+        self._set_result_model(table_view, ResultTableModel(["Change"] + diff["columns"], rows))
+        summary = format_summary(diff, elapsed_time)
+        target_tab.findChild(QTextEdit, "message_view").setText(summary)
+        counts = ", ".join(f"{count:,} {name}" for name, count in diff["counts"].items())
+        target_tab.findChild(QLabel, "tab_status_label").setText(f"Result diff | {counts}")
+        self.stop_spinner(target_tab, success=True)
+
+    def handle_diff_error(self, target_tab, error_message):
+        self._finish_diff(target_tab)
+        target_tab.findChild(QTextEdit, "message_view").setText(f"Error:\n\n{error_message}")
+        target_tab.findChild(QLabel, "tab_status_label").setText(f"Error: {error_message}")
+        self.stop_spinner(target_tab, success=False)
+
+    # --- Schema Diff ---
+    def compare_schemas(self):
+        current_tab = self.tab_widget.currentWidget()
+        conn_data = current_tab.findChild(QComboBox, "db_combo_box").currentData() if current_tab else None
+        dialog = SchemaDiffDialog(self, self.connection_proxy, conn_data)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        data = dialog.get_data()
+        if not data["source"] or not data["target"]:
+            self.status.showMessage("Choose a source and a target connection", 3000)
+            return
+
+        new_tab = self.add_tab()
+        self.tab_widget.setCurrentWidget(new_tab)
+        new_tab.findChild(SqlEditor, "query_editor").setPlainText(
+            f"-- Comparing schemas: {data['source'].get('name')} -> {data['target'].get('name')}")
+        self._start_progress(new_tab)
+        signals = SchemaDiffSignals()
+        runnable = RunnableSchemaDiff(data["source"], data["target"], data["schemas"], signals)
+        signals.finished.connect(partial(self.handle_schema_diff_result, new_tab))
+        signals.error.connect(partial(self.handle_diff_error, new_tab))
+        signals.progress.connect(self.status_message_label.setText)
+        self.running_queries[new_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        self.thread_pool.start(runnable)
+        self.status_message_label.setText("Comparing schemas...")
+
+    def handle_schema_diff_result(self, target_tab, diff, elapsed_time):
+        self._finish_diff(target_tab)
+        table_view = target_tab.findChild(QTableView, "result_table")
+        self._set_result_model(table_view, ResultTableModel(SCHEMA_DIFF_COLUMNS, diff["rows"]))
+        # The script is left in the editor to review, and run against the target when ready
+        target_tab.findChild(SqlEditor, "query_editor").setPlainText(diff["script"])
+        combo = target_tab.findChild(QComboBox, "db_combo_box")
+        for i in range(combo.count()):
+            if combo.itemData(i) and combo.itemData(i).get("id") == diff["target_id"]:
+                combo.setCurrentIndex(i)
+                break
+        target_tab.findChild(QTextEdit, "message_view").setText(
+            format_schema_diff_summary(diff, elapsed_time))
+        counts = ", ".join(f"{count:,} {change}" for change, count in sorted(diff["counts"].items()))
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Schema diff | {counts or 'no differences'} | Time: {elapsed_time:.2f} sec")
+        self.stop_spinner(target_tab, success=True)
+
+    def _apply_column_widths(self, table_view, column_stats):
+        # Size columns from the decoder's width stats instead of measuring every cell
+        char_width = table_view.fontMetrics().averageCharWidth()
+        for col, stats in enumerate(column_stats):
+            width = min(max(stats["max_width"], 4) * char_width + 16, 400)
+            table_view.setColumnWidth(col, width)
+
+    def _format_column_stats(self, columns, column_stats):
+        lines = ["-- Column statistics --"]
+        for name, stats in zip(columns, column_stats):
+            line = f"{name}: nulls={stats['nulls']}"
+            if stats["min"] is not None:
+                line += f", min={stats['min']:g}, max={stats['max']:g}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def _running_query_text(self, tab):
+        """The text the tab's running query was started with, which may be one statement of the editor."""
+        query = getattr(self.running_queries.get(tab), "query", None)
+        if query is None:
+            query = tab.findChild(SqlEditor, "query_editor").toPlainText().strip()
+        return query
+
     def handle_query_error(self, target_tab, error_message):
         if target_tab in self.tab_timers:
             self.tab_timers[target_tab]["timer"].stop()
@@ -797,17 +2079,136 @@ class MainWindow(QMainWindow):
         self.db_manager.save_query_to_history(
             target_tab.findChild(
                 QComboBox, "db_combo_box").currentData().get("id"),
-            target_tab.findChild(
-                QTextEdit, "query_editor").toPlainText().strip(),
+            self._running_query_text(target_tab),
             "Failed", 0, 0
         )
         self.status_message_label.setText("Error occurred")
+        self.update_session_label(target_tab)
         self.stop_spinner(target_tab, success=False)
         if target_tab in self.running_queries:
             del self.running_queries[target_tab]
         if not self.running_queries:
             self.cancel_action.setEnabled(False)
 
+    # --- Explain Plan Methods ---
+    def explain_query(self):
+        current_tab = self.tab_widget.currentWidget()
+        if not current_tab:
+            return
+        editor_stack = current_tab.findChild(QStackedWidget, "editor_stack")
+        if editor_stack.currentIndex() == 1:
+            QMessageBox.information(
+                self, "Info", "Cannot explain from History view. Switch to the Query view.")
+            return
+
+        def run(statement):
+            if self.tab_widget.currentWidget() is current_tab:
+                self._explain_statement(current_tab, statement)
+            else:
+                self.status.showMessage("Statement not explained: its worksheet is no longer the current tab", 5000)
+
+        # Like Execute Statement: the selection, or else the statement under the cursor
+        if not current_tab.findChild(SqlEditor, "query_editor").request_statement(run):
+            self.status.showMessage("Finding the statement's boundaries in the script; it is explained when done...")
+
+    def _explain_statement(self, current_tab, query):
+        if current_tab in self.running_queries:
+            QMessageBox.warning(self, "Query in Progress",
+                                "A query is already running in this tab.")
+            return
+
+        conn_data = current_tab.findChild(QComboBox, "db_combo_box").currentData()
+        if not conn_data or not query:
+            self.status.showMessage("Connection or query is empty", 3000)
+            return
+        if ";" in strip_literals(query).strip().rstrip(";"):
+            QMessageBox.information(
+                self, "Info", "EXPLAIN takes a single statement. Select one, or put the cursor in it.")
+            return
+
+        timeout_timer = self._start_progress(current_tab)
+        signals = ExplainSignals()
+        runnable = RunnableExplain(conn_data, query, signals)
+        signals.finished.connect(partial(self.handle_explain_result, current_tab))
+        signals.error.connect(partial(self.handle_query_error, current_tab))
+        timeout_timer.timeout.connect(
+            partial(self.handle_query_timeout, current_tab, runnable))
+        self.running_queries[current_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        self.thread_pool.start(runnable)
+        timeout_timer.start(self.QUERY_TIMEOUT)
+        self.status_message_label.setText("Explaining query...")
+
+    def handle_explain_result(self, target_tab, conn_data, query, plan, elapsed_time):
+        if target_tab in self.tab_timers:
+            self.tab_timers[target_tab]["timer"].stop()
+            self.tab_timers[target_tab]["timeout_timer"].stop()
+            del self.tab_timers[target_tab]
+        root_rows = plan["root"].get("actual_rows")
+        history_id = self.db_manager.save_query_to_history(
+            conn_data.get("id"), query, "Explained", root_rows or 0, elapsed_time, plan=plan)
+        self.populate_plan_tree(target_tab, plan)
+
+        lines = ["Plan captured."]
+        if plan.get("planning_ms") is not None:
+            lines.append(f"Planning time: {plan['planning_ms']:.2f} ms")
+        if plan.get("execution_ms") is not None:
+            lines.append(f"Execution time: {plan['execution_ms']:.2f} ms")
+        previous = self.db_manager.get_previous_plan(conn_data.get("id"), query, before_id=history_id)
+        if previous:
+            lines.append("")
+            lines.append(compare_plans(plan, previous))
+        target_tab.findChild(QTextEdit, "message_view").setText("\n".join(lines))
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Plan captured | Time: {elapsed_time:.2f} sec")
+
+        self.stop_spinner(target_tab, success=True)
+        self._show_results_page(target_tab, self.PLAN_PAGE)
+        self.status_message_label.setText("Ready")
+        if target_tab in self.running_queries:
+            del self.running_queries[target_tab]
+        if not self.running_queries:
+            self.cancel_action.setEnabled(False)
+
+    def populate_plan_tree(self, target_tab, plan):
+        plan_tree = target_tab.findChild(QTreeView, "plan_tree")
+        model = QStandardItemModel()
+        model.setHorizontalHeaderLabels(
+            ["Node", "Est. Rows", "Actual Rows", "Est. Error", "Loops", "Total ms", "Self ms", "% of Total"])
+        hotspots = find_hotspots(plan)
+        total_ms = plan.get("execution_ms") or plan["root"].get("total_ms")
+
+        def fmt(value, spec=""):
+            return "" if value is None else format(value, spec)
+
+        def add_node(parent_item, node):
+            est, actual = node["est_rows"], node["actual_rows"]
+            error = ""
+            if est is not None and actual is not None and est > 0 and actual > 0:
+                ratio = actual / est
+                error = f"x{ratio:.1f} under" if ratio >= 1 else f"x{1 / ratio:.1f} over"
+            share = ""
+            if total_ms and node["self_ms"] is not None:
+                share = f"{node['self_ms'] / total_ms * 100:.1f}%"
+            row = [QStandardItem(node["label"]), QStandardItem(fmt(est, ",.0f")),
+                   QStandardItem(fmt(actual, ",.0f")), QStandardItem(error),
+                   QStandardItem(fmt(node["loops"])), QStandardItem(fmt(node["total_ms"], ".3f")),
+                   QStandardItem(fmt(node["self_ms"], ".3f")), QStandardItem(share)]
+            tooltip = "\n".join(f"{key}: {value}" for key, value in node["detail"].items())
+            for cell in row:
+                if tooltip:
+                    cell.setToolTip(tooltip)
+                if id(node) in hotspots:
+                    cell.setBackground(QColor("#f8c9c4"))
+            parent_item.appendRow(row)
+            for child in node["children"]:
+                add_node(row[0], child)
+
+        add_node(model.invisibleRootItem(), plan["root"])
+        plan_tree.setModel(model)
+        plan_tree.expandAll()
+        plan_tree.setColumnWidth(0, 320)
+
     def stop_spinner(self, target_tab, success=True):
         if not target_tab:
             return
@@ -817,20 +2218,17 @@ class MainWindow(QMainWindow):
             spinner_label = stacked_widget.findChild(QLabel, "spinner_label")
             if spinner_label and spinner_label.movie():
                 spinner_label.movie().stop()
-            header = target_tab.findChild(QWidget, "resultsHeader")
-            buttons = header.findChildren(QPushButton)
-            if success:
-                stacked_widget.setCurrentIndex(0)  # Show results table
-                if buttons:
-                    buttons[0].setChecked(True)
-                    buttons[1].setChecked(False)
-                    buttons[2].setChecked(False)
-            else:
-                stacked_widget.setCurrentIndex(1)  # Show message view
-                if buttons:
-                    buttons[0].setChecked(False)
-                    buttons[1].setChecked(True)
-                    buttons[2].setChecked(False)
+            # Show results table on success, message view on failure
+            self._show_results_page(target_tab, 0 if success else 1)
+
+    def _show_results_page(self, target_tab, page):
+        stacked_widget = target_tab.findChild(
+            QStackedWidget, "results_stacked_widget")
+        stacked_widget.setCurrentIndex(page)
+        header = target_tab.findChild(QWidget, "resultsHeader")
+        buttons = header.findChildren(QPushButton)
+        for btn, btn_page in zip(buttons, self.RESULT_PAGES):
+            btn.setChecked(btn_page == page)
 
     def handle_query_timeout(self, tab, runnable):
         if self.running_queries.get(tab) is runnable:
@@ -841,7 +2239,7 @@ class MainWindow(QMainWindow):
             self.db_manager.save_query_to_history(
                 tab.findChild(
                     QComboBox, "db_combo_box").currentData().get("id"),
-                tab.findChild(QTextEdit, "query_editor").toPlainText().strip(),
+                self._running_query_text(tab),
                 "Timed Out", 0, self.QUERY_TIMEOUT / 1000
             )
             self.stop_spinner(tab, success=False)
@@ -873,8 +2271,7 @@ class MainWindow(QMainWindow):
             self.db_manager.save_query_to_history(
                 current_tab.findChild(
                     QComboBox, "db_combo_box").currentData().get("id"),
-                current_tab.findChild(
-                    QTextEdit, "query_editor").toPlainText().strip(),
+                self._running_query_text(current_tab),
                 "Cancelled", 0, 0
             )
             self.stop_spinner(current_tab, success=False)
@@ -923,7 +2320,10 @@ class MainWindow(QMainWindow):
         if not index.isValid() or not history_details_view:
             return
         data = index.model().itemFromIndex(index).data(Qt.ItemDataRole.UserRole)
-        details_text = f"Timestamp: {data['timestamp']}\nStatus: {data['status']}\nDuration: {data['duration']:.3f} sec\nRows: {data['rows']}\n\n-- Query --\n{data['query']}"
+        details_text = f"Timestamp: {data['timestamp']}\nStatus: {data['status']}\nDuration: {data['duration']:.3f} sec\nRows: {data['rows']}\n"
+        if data.get('has_plan'):
+            details_text += "Plan: stored (use Show Plan)\n"
+        details_text += f"\n-- Query --\n{data['query']}"
         history_details_view.setText(details_text)
 
     def _get_selected_history_item(self, target_tab):
@@ -938,6 +2338,81 @@ class MainWindow(QMainWindow):
         item = selected_indexes[0].model().itemFromIndex(selected_indexes[0])
         return item.data(Qt.ItemDataRole.UserRole)
 
+    def show_history_plan(self, target_tab):
+        history_data = self._get_selected_history_item(target_tab)
+        if not history_data:
+            return
+        plan = self.db_manager.get_history_plan(history_data['id'])
+        if not plan:
+            QMessageBox.information(
+                self, "No Plan", "The selected history entry has no stored plan.")
+            return
+        self.populate_plan_tree(target_tab, plan)
+        self._show_results_page(target_tab, self.PLAN_PAGE)
+
+    def compare_history_results(self, target_tab):
+        history_data = self._get_selected_history_item(target_tab)
+        if not history_data:
+            return
+        conn_data = target_tab.findChild(QComboBox, "db_combo_box").currentData()
+        # Re-run the historic query against the same (or another chosen) connection
+        side = (conn_data, history_data['query'])
+        self.compare_results(left=side, right=side)
+
+    def replay_workload(self, history_tab=None):
+        """Replays the history of the current tab's connection; from the history panel, its selection."""
+        current_tab = history_tab or self.tab_widget.currentWidget()
+        if not current_tab or self.db_manager is None:
+            return
+        if current_tab in self.running_queries:
+            QMessageBox.warning(self, "Query in Progress",
+                                "A query is already running in this tab.")
+            return
+        conn_data = current_tab.findChild(QComboBox, "db_combo_box").currentData()
+        if not conn_data:
+            self.status.showMessage("Select a connection first", 3000)
+            return
+        selected = []
+        if history_tab is not None:
+            history_list_view = current_tab.findChild(QTreeView, "history_list_view")
+            selected = [index.model().itemFromIndex(index).data(Qt.ItemDataRole.UserRole)
+                        for index in history_list_view.selectionModel().selectedIndexes()]
+        dialog = LoadTestDialog(self, self.connection_proxy, conn_data, len(selected))
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        data = dialog.get_data()
+        if not data["target"]:
+            return
+        if data["use_selected"]:
+            entries = selected
+        else:
+            entries = self.db_manager.get_history_for_replay(
+                conn_data.get("id"), data["since"], data["until"])
+        if not entries:
+            self.status.showMessage("No successful history entries to replay", 3000)
+            return
+
+        self._start_progress(current_tab)
+        signals = ReplaySignals()
+        runnable = RunnableWorkloadReplay(data["target"], entries, data["options"], signals)
+        signals.finished.connect(partial(self.handle_replay_result, current_tab))
+        signals.error.connect(partial(self.handle_diff_error, current_tab))
+        signals.progress.connect(self.status_message_label.setText)
+        self.running_queries[current_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        self.thread_pool.start(runnable)
+        self.status_message_label.setText(f"Replaying {len(entries):,} history entries...")
+
+    def handle_replay_result(self, target_tab, report):
+        self._finish_diff(target_tab)
+        table_view = target_tab.findChild(QTableView, "result_table")
+        self._set_result_model(table_view, ResultTableModel(REPORT_COLUMNS, report_rows(report)))
+        target_tab.findChild(QTextEdit, "message_view").setText(format_replay_summary(report))
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Replay | {report['statements']:,} statements, {report['throughput']:,.1f}/s, "
+            f"{report['errors']:,} errors")
+        self.stop_spinner(target_tab, success=True)
+
     def copy_history_query(self, target_tab):
         history_data = self._get_selected_history_item(target_tab)
         if history_data:
@@ -949,7 +2424,7 @@ class MainWindow(QMainWindow):
         history_data = self._get_selected_history_item(target_tab)
         if history_data:
             editor_stack = target_tab.findChild(QStackedWidget, "editor_stack")
-            query_editor = target_tab.findChild(QTextEdit, "query_editor")
+            query_editor = target_tab.findChild(SqlEditor, "query_editor")
             query_editor.setPlainText(history_data['query'])
 
             # Switch back to the query editor view
@@ -1006,14 +2481,163 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(
                     self, "Error", f"Failed to clear history for this connection:\n{e}")
 
+    # --- Slow Query Analysis Methods ---
+    def run_history_analysis(self):
+        if self.db_manager is None or self._history_analysis_running:
+            return
+        self._history_analysis_running = True
+        self._analyzer_signals = AnalyzerSignals()
+        self._analyzer_signals.flagged.connect(self.handle_flagged_queries)
+        self._analyzer_signals.error.connect(self.handle_history_analysis_error)
+        self.thread_pool.start(RunnableHistoryAnalysis(
+            self.db_manager, self._analyzer_signals))
+
+    def handle_history_analysis_error(self, error_message):
+        self._history_analysis_running = False
+        self.status.showMessage(f"Slow query analysis failed: {error_message}", 5000)
+
+    def handle_flagged_queries(self, flagged):
+        self._history_analysis_running = False
+        for entry in flagged:
+            if entry["reason"] != "regression":
+                continue
+            short_query = ' '.join(entry["query"].split())[:70]
+            text = (f"Latency regression: {entry['duration']:.2f} sec vs baseline "
+                    f"{entry['baseline']:.2f} sec ({entry['duration'] / entry['baseline']:.1f}x) | {short_query}")
+            if not self.post_notification(entry["conn_id"], text):
+                self.status.showMessage(text, 5000)
+
+    def post_notification(self, conn_id, text):
+        """Adds a line to the Notification pane of every tab on the connection; returns whether any tab took it."""
+        posted = False
+        for tab in self._tabs_on_connection(conn_id):
+            tab.findChild(QListView, "notification_list").model().add(text)
+            posted = True
+        return posted
+
+    # --- LISTEN/NOTIFY ---
+    def listen_channel(self, target_tab):
+        conn_data = target_tab.findChild(QComboBox, "db_combo_box").currentData()
+        channel = target_tab.findChild(QLineEdit, "listen_channel").text().strip()
+        if not conn_data or conn_data.get("db_path"):
+            self.status.showMessage("LISTEN needs a PostgreSQL connection", 3000)
+            return
+        if not channel:
+            self.status.showMessage("Enter a channel name to listen on", 3000)
+            return
+        listener = self.listeners.get(conn_data["id"])
+        if listener is None:
+            signals = ListenerSignals()
+            listener = NotificationListener(conn_data, signals)
+            signals.received.connect(partial(self.handle_notifications, listener))
+            signals.error.connect(partial(self.handle_listener_error, listener))
+            self.listeners[conn_data["id"]] = listener
+        listener.listen(channel)
+        self.post_notification(conn_data["id"], f"Listening on {channel}")
+        self._update_listen_stats(conn_data["id"], {"channels": sorted(listener.channels)})
+
+    def unlisten_channel(self, target_tab):
+        conn_data = target_tab.findChild(QComboBox, "db_combo_box").currentData()
+        listener = self.listeners.get(conn_data.get("id")) if conn_data else None
+        if listener is None:
+            return
+        channel = target_tab.findChild(QLineEdit, "listen_channel").text().strip()
+        # An empty channel stops every subscription on the connection
+        for name in [channel] if channel else sorted(listener.channels):
+            listener.unlisten(name)
+            self.post_notification(conn_data["id"], f"Stopped listening on {name}")
+        if not listener.channels:
+            listener.stop()
+            del self.listeners[conn_data["id"]]
+        self._update_listen_stats(conn_data["id"], {"channels": sorted(listener.channels)})
+
+    def _tabs_on_connection(self, conn_id):
+        for i in range(self.tab_widget.count()):
+            tab = self.tab_widget.widget(i)
+            conn_data = tab.findChild(QComboBox, "db_combo_box").currentData()
+            if conn_data and conn_data.get("id") == conn_id:
+                yield tab
+
+    def handle_notifications(self, listener, batch, stats):
+        conn_id = listener.conn_data["id"]
+        if self.listeners.get(conn_id) is not listener:
+            return  # Stopped while the batch was queued
+        if batch:
+            # Formatted once per batch, however many tabs show it
+            lines = [(stamp, f"{channel}: {payload} (pid {pid})" if payload else f"{channel} (pid {pid})")
+                     for stamp, channel, payload, pid in batch]
+            for tab in self._tabs_on_connection(conn_id):
+                view = tab.findChild(QListView, "notification_list")
+                scroll_bar = view.verticalScrollBar()
+                at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+                view.model().add_many(lines)
+                if at_bottom:
+                    view.scrollToBottom()
+        self._update_listen_stats(conn_id, stats)
+
+    def _update_listen_stats(self, conn_id, stats):
+        channels = stats.get("channels")
+        if channels:
+            text = (f"Listening on {', '.join(channels)} | {stats.get('received', 0):,} received | "
+                    f"{stats.get('rate', 0.0):,.0f}/s")
+            if stats.get("dropped"):
+                text += f" | {stats['dropped']:,} dropped"
+        else:
+            text = "Not listening"
+        for tab in self._tabs_on_connection(conn_id):
+            tab.findChild(QLabel, "listen_stats_label").setText(text)
+
+    def handle_listener_error(self, listener, error_message):
+        conn_id = listener.conn_data["id"]
+        if self.listeners.get(conn_id) is listener:
+            del self.listeners[conn_id]
+        text = f"Notification listener stopped: {error_message}"
+        if not self.post_notification(conn_id, text):
+            self.status.showMessage(text, 5000)
+        self._update_listen_stats(conn_id, {})
+
+    def edit_slow_query_thresholds(self, conn_data):
+        thresholds = self.db_manager.get_slow_query_thresholds(conn_data["id"])
+        dialog = SlowQueryThresholdDialog(self, conn_data.get("name", ""), thresholds)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            try:
+                self.db_manager.set_slow_query_thresholds(conn_data["id"], dialog.get_data())
+            except Exception as e:
+                QMessageBox.critical(
+                    self, "Error", f"Failed to save thresholds:\n{e}")
+
+    def show_slow_query_log(self, conn_data):
+        target_tab = self.tab_widget.currentWidget()
+        try:
+            rows = self.db_manager.get_slow_query_log(conn_data["id"])
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load slow query log:\n{e}")
+            return
+        table_view = target_tab.findChild(QTableView, "result_table")
+        self._set_result_model(table_view, ResultTableModel(
+            ["Timestamp", "Reason", "Duration (sec)", "Baseline (sec)", "Query"], rows))
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Slow query log for {conn_data.get('name')} | {len(rows)} entries")
+        self._show_results_page(target_tab, 0)
+
     def show_schema_context_menu(self, position):
         index = self.schema_tree.indexAt(position)
         if not index.isValid():
             return
 
-        item = self.schema_model.itemFromIndex(index)
+        # The row estimate columns carry no data; act on the name column
+        item = self.schema_model.itemFromIndex(index.siblingAtColumn(0))
         item_data = item.data(Qt.ItemDataRole.UserRole)
 
+        if item_data and item_data.get('db_type') == 'postgres' and not item.parent():
+            menu = QMenu()
+            refresh_action = QAction("Refresh Row Estimates", self)
+            refresh_action.triggered.connect(
+                lambda: self.postgres_connector.refresh_table_stats(item, self.status.showMessage))
+            menu.addAction(refresh_action)
+            menu.exec(self.schema_tree.viewport().mapToGlobal(position))
+            return
+
         # Check if it's a table/view item based on depth and data
         is_table_or_view = False
         if item_data:
@@ -1047,13 +2671,78 @@ class MainWindow(QMainWindow):
             lambda: self.query_table_rows(item_data, table_name, limit=100, order='desc', execute_now=True))
         view_menu.addAction(last_100_action)
 
+        browse_action = QAction("Browse Table (paged)", self)
+        browse_action.triggered.connect(
+            lambda: self.browse_table(item_data, table_name))
+        view_menu.addAction(browse_action)
+
         query_tool_action = QAction("Query Tool", self)
         query_tool_action.triggered.connect(
             lambda: self.open_query_tool_for_table(item_data, table_name))
         menu.addAction(query_tool_action)
 
+        copy_table_action = QAction("Copy table to...", self)
+        copy_table_action.triggered.connect(
+            lambda: self.copy_table(item_data, table_name))
+        menu.addAction(copy_table_action)
+
+        refresh_stats_action = QAction("Refresh Row Estimates", self)
+        refresh_stats_action.triggered.connect(
+            lambda: self.refresh_schema_row_estimates(item))
+        menu.addAction(refresh_stats_action)
+
         menu.exec(self.schema_tree.viewport().mapToGlobal(position))
 
+    def copy_table(self, item_data, table_name):
+        if not item_data:
+            return
+        conn_data = item_data.get('conn_data')
+        source = (conn_data, item_data.get('schema_name'), table_name)
+        source_label = f"{conn_data.get('name')}: " + (
+            f"{item_data.get('schema_name')}.{table_name}" if item_data.get('db_type') == 'postgres' else table_name)
+        dialog = TableCopyDialog(self, self.connection_proxy, source_label, table_name)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        data = dialog.get_data()
+        target_data, _, target_table = data["target"]
+        if not target_data or not target_table:
+            self.status.showMessage("Choose a target connection and table name", 3000)
+            return
+
+        new_tab = self.add_tab()
+        self.tab_widget.setCurrentWidget(new_tab)
+        new_tab.findChild(SqlEditor, "query_editor").setPlainText(
+            f"-- Copying {source_label} to {target_data.get('name')}: {target_table}")
+        self._start_progress(new_tab)
+        signals = CopySignals()
+        runnable = RunnableTableCopy(source, data["target"], data["if_exists"], signals)
+        signals.finished.connect(partial(self.handle_copy_result, new_tab))
+        signals.error.connect(partial(self.handle_diff_error, new_tab))
+        # Rows copied and rows/s show in the tab status label like a query's rows received
+        signals.progress.connect(partial(self.handle_query_progress, new_tab))
+        self.running_queries[new_tab] = runnable
+        self.cancel_action.setEnabled(True)
+        self.thread_pool.start(runnable)
+        self.status_message_label.setText("Copying table...")
+
+    def handle_copy_result(self, target_tab, summary, elapsed_time):
+        self._finish_diff(target_tab)
+        target_tab.findChild(QTextEdit, "message_view").setText(
+            format_copy_summary(summary, elapsed_time))
+        target_tab.findChild(QLabel, "tab_status_label").setText(
+            f"Copied {summary['rows']:,} rows to {summary['target']} | Time: {elapsed_time:.2f} sec")
+        self.stop_spinner(target_tab, success=True)
+        self._show_results_page(target_tab, 1)
+
+    def refresh_schema_row_estimates(self, table_item):
+        item_data = table_item.data(Qt.ItemDataRole.UserRole)
+        if item_data.get('db_type') == 'postgres':
+            self.postgres_connector.refresh_table_stats(
+                table_item.parent(), self.status.showMessage)
+        elif item_data.get('db_type') == 'sqlite':
+            self.sqlite_connector.refresh_table_stats(
+                item_data.get('conn_data'), self.schema_model, self.status.showMessage)
+
     def open_query_tool_for_table(self, item_data, table_name):
         self.query_table_rows(item_data, table_name, execute_now=False)
 
@@ -1062,7 +2751,7 @@ class MainWindow(QMainWindow):
             return
         conn_data = item_data.get('conn_data')
         new_tab = self.add_tab()
-        query_editor = new_tab.findChild(QTextEdit, "query_editor")
+        query_editor = new_tab.findChild(SqlEditor, "query_editor")
         db_combo_box = new_tab.findChild(QComboBox, "db_combo_box")
 
         # Set the correct connection in the new tab's combobox
@@ -1091,6 +2780,132 @@ class MainWindow(QMainWindow):
             self.tab_widget.setCurrentWidget(new_tab)
             self.execute_query()
 
+    # --- Table Browser (keyset pagination) Methods ---
+    def browse_table(self, item_data, table_name):
+        if not item_data:
+            return
+        conn_data = item_data.get('conn_data')
+        new_tab = self.add_tab()
+        db_combo_box = new_tab.findChild(QComboBox, "db_combo_box")
+        for i in range(db_combo_box.count()):
+            data = db_combo_box.itemData(i)
+            if data and data.get('id') == conn_data.get('id'):
+                db_combo_box.setCurrentIndex(i)
+                break
+
+        browser = TableBrowser(
+            item_data, table_name,
+            defer_large=self.defer_large_columns_action.isChecked())
+        self.table_browsers[new_tab] = browser
+        new_tab.findChild(SqlEditor, "query_editor").setPlainText(
+            f"-- Browsing {browser.qualified_name} in pages of {browser.page_size} rows")
+
+        browser_bar = QWidget()
+        browser_bar.setObjectName("browser_bar")
+        bar_layout = QHBoxLayout(browser_bar)
+        bar_layout.setContentsMargins(5, 2, 5, 2)
+        bar_layout.addWidget(QLabel(f"Browsing {browser.qualified_name}"))
+        bar_layout.addStretch()
+        first_btn = QPushButton("First Page")
+        last_btn = QPushButton("Last Page")
+        last_btn.setObjectName("browser_last_btn")
+        first_btn.clicked.connect(lambda: self.fetch_browser_page(new_tab, 'head'))
+        last_btn.clicked.connect(lambda: self.fetch_browser_page(new_tab, 'tail'))
+        bar_layout.addWidget(first_btn)
+        bar_layout.addWidget(last_btn)
+        new_tab.layout().insertWidget(1, browser_bar)
+
+        table_view = new_tab.findChild(QTableView, "result_table")
+        table_view.verticalScrollBar().valueChanged.connect(
+            partial(self._browser_scrolled, new_tab))
+        self.tab_widget.setCurrentWidget(new_tab)
+        self.fetch_browser_page(new_tab, 'head')
+
+    def _browser_scrolled(self, tab, value):
+        browser = self.table_browsers.get(tab)
+        if not browser or browser.busy:
+            return
+        scroll_bar = tab.findChild(QTableView, "result_table").verticalScrollBar()
+        if value >= scroll_bar.maximum() - 5 and not browser.at_tail:
+            self.fetch_browser_page(tab, 'next')
+        elif value <= 0 and not browser.at_head:
+            self.fetch_browser_page(tab, 'prev')
+
+    def fetch_browser_page(self, tab, direction):
+        browser = self.table_browsers.get(tab)
+        if not browser or browser.busy:
+            return
+        browser.busy = True
+        tab.findChild(QLabel, "tab_status_label").setText("Fetching page...")
+        signals = BrowseSignals()
+        signals.page.connect(partial(self.handle_browser_page, tab))
+        signals.error.connect(partial(self.handle_browser_error, tab))
+        browser.signals = signals  # Keep the QObject alive until the page arrives
+        self.thread_pool.start(RunnableBrowsePage(browser, direction, signals))
+
+    def handle_browser_page(self, tab, direction, columns, rows):
+        browser = self.table_browsers.get(tab)
+        if not browser:
+            return
+        browser.busy = False
+        display_rows = browser.consume(direction, rows)
+        table_view = tab.findChild(QTableView, "result_table")
+        model = table_view.model()
+        scroll_bar = table_view.verticalScrollBar()
+        if direction in ('head', 'tail') or not isinstance(model, ResultTableModel):
+            self._set_result_model(table_view, ResultTableModel(columns, display_rows))
+            if direction == 'tail':
+                table_view.scrollToBottom()
+        elif direction == 'next':
+            model.append_rows(display_rows)
+        else:
+            position = scroll_bar.value()
+            model.prepend_rows(display_rows)
+            scroll_bar.setValue(position + len(display_rows))
+
+        last_btn = tab.findChild(QPushButton, "browser_last_btn")
+        if last_btn:
+            last_btn.setEnabled(browser.can_jump_to_tail)
+        loaded = table_view.model().rowCount()
+        more = "end of table" if browser.at_tail else "scroll for more"
+        tab.findChild(QLabel, "tab_status_label").setText(
+            f"Browsing {browser.qualified_name} | {loaded} rows loaded | key: {browser.describe_key()} | {more}")
+        # A ctid block range can be empty (deleted tuples); keep walking until rows appear
+        if not display_rows and direction in ('next', 'prev') and not (browser.at_tail if direction == 'next' else browser.at_head):
+            self.fetch_browser_page(tab, direction)
+
+    def handle_browser_error(self, tab, error_message):
+        browser = self.table_browsers.get(tab)
+        if browser:
+            browser.busy = False
+        tab.findChild(QLabel, "tab_status_label").setText(f"Error: {error_message}")
+        tab.findChild(QTextEdit, "message_view").setText(f"Error:\n\n{error_message}")
+
+    # --- Cell Viewer Methods ---
+    def open_cell_viewer(self, target_tab, index):
+        model = index.model()
+        if not isinstance(model, ResultTableModel) or model.change_set is not None:
+            return  # While editing, double-click edits the cell instead
+        column_name = model.headerData(index.column(), Qt.Orientation.Horizontal)
+        value = model.raw_value(index.row(), index.column())
+        if isinstance(value, LargeValue) and value.is_deferred:
+            browser = self.table_browsers.get(target_tab)
+            if not browser:
+                return
+            self.status_message_label.setText(f"Fetching {column_name}...")
+            signals = ValueSignals()
+            signals.fetched.connect(self.show_cell_value)
+            signals.error.connect(
+                lambda error: self.status.showMessage(f"Error fetching value: {error}", 5000))
+            self._value_signals = signals  # Keep alive until the value arrives
+            self.thread_pool.start(RunnableFetchValue(browser, value, signals))
+            return
+        self.show_cell_value(column_name, value)
+
+    def show_cell_value(self, column_name, value):
+        self.status_message_label.setText("Ready")
+        CellViewerDialog(self, column_name, value).exec()
+
 # test-2
 
 # test
@@ -1101,9 +2916,13 @@ if __name__ == "__main__":
     if not os.path.exists("assets"):
         os.makedirs("assets")
 
-    # DatabaseManager now handles its own initialization of hierarchy.db
-    # No need to call sqlite.connect directly here.
+    # DatabaseManager now handles its own initialization of hierarchy.db.
+    # MainWindow opens it in the background once the window has been painted.
 
     window = MainWindow()
+    app.aboutToQuit.connect(window.connection_pool.close_all)
+    app.aboutToQuit.connect(window.async_engine.stop)
+    app.aboutToQuit.connect(lambda: [listener.stop() for listener in window.listeners.values()])
+    app.aboutToQuit.connect(lambda: [s.close() for s in window.sessions.values()])
     window.show()
     sys.exit(app.exec())
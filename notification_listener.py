@@ -0,0 +1,138 @@
+# notification_listener.py
+# PostgreSQL LISTEN subscriptions for a saved connection: one dedicated connection
+# per saved connection, waited on with select() on a background thread.
+import select
+import socket
+import threading
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from query_worker import open_connection
+from table_browser import quote_ident
+
+# Notifications are handed to the GUI in batches at most this often
+FLUSH_INTERVAL_SEC = 0.1
+# How long select() waits with nothing pending, so the rate shown decays to 0
+LOOP_TICK_SEC = 1.0
+# Held between flushes; beyond this the oldest are dropped (and counted) rather than queued
+MAX_PENDING = 50_000
+
+
+class NotificationListener:
+    """LISTENs on a set of channels over one connection and emits batches of notifications.
+
+    Each batch is a list of (received time, channel, payload, sender pid) tuples,
+    emitted through signals.received together with a stats dict.
+    """
+
+    def __init__(self, conn_data, signals):
+        self.conn_data = conn_data
+        self.signals = signals
+        self.channels = set()
+        self._commands = deque()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._thread = None
+        self._stopping = False
+        self.received = 0
+        self.dropped = 0
+
+    def listen(self, channel):
+        if channel in self.channels:
+            return
+        self.channels.add(channel)
+        self._send(f"LISTEN {quote_ident(channel)}")
+
+    def unlisten(self, channel):
+        if channel not in self.channels:
+            return
+        self.channels.discard(channel)
+        self._send(f"UNLISTEN {quote_ident(channel)}")
+
+    def stop(self, timeout=5):
+        """Closes the connection, which drops every subscription."""
+        self._stopping = True
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _send(self, command):
+        self._commands.append(command)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-listener", daemon=True)
+            self._thread.start()
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Buffer full means a wake-up is already pending
+
+    def _drain_wake(self):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    # --- Listener thread ---
+    def _run(self):
+        conn = None
+        pending = deque(maxlen=MAX_PENDING)
+        last_flush = time.time()
+        rate = 0.0
+        rate_start, rate_count = time.time(), 0
+        try:
+            conn = open_connection(self.conn_data)
+            conn.autocommit = True  # LISTEN takes effect at commit; notifications arrive between transactions
+            cursor = conn.cursor()
+            while not self._stopping:
+                while self._commands:
+                    cursor.execute(self._commands.popleft())
+                timeout = FLUSH_INTERVAL_SEC if pending else LOOP_TICK_SEC
+                ready, _, _ = select.select([conn, self._wake_reader], [], [], timeout)
+                if self._wake_reader in ready:
+                    self._drain_wake()
+                if conn in ready:
+                    conn.poll()
+                    if conn.notifies:
+                        now = time.time()
+                        notifies = conn.notifies[:]
+                        del conn.notifies[:]
+                        overflow = len(pending) + len(notifies) - MAX_PENDING
+                        if overflow > 0:
+                            self.dropped += overflow
+                        pending.extend((now, n.channel, n.payload, n.pid) for n in notifies)
+                        self.received += len(notifies)
+                        rate_count += len(notifies)
+                now = time.time()
+                if now - rate_start >= 1.0:
+                    rate = rate_count / (now - rate_start)
+                    rate_start, rate_count = now, 0
+                # Flush on schedule, and once a second while idle so stats stay current
+                if now - last_flush >= (FLUSH_INTERVAL_SEC if pending else LOOP_TICK_SEC):
+                    self.signals.received.emit(list(pending), {
+                        "received": self.received, "rate": rate, "dropped": self.dropped,
+                        "channels": sorted(self.channels)})
+                    pending.clear()
+                    last_flush = now
+        except Exception as e:
+            if not self._stopping:
+                self.signals.error.emit(str(e))
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._wake_reader.close()
+            self._wake_writer.close()
+
+
+# --- Signals class for notification listeners ---
+class ListenerSignals(QObject):
+    received = pyqtSignal(list, dict)  # [(time, channel, payload, pid), ...], stats
+    error = pyqtSignal(str)
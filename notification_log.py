@@ -0,0 +1,51 @@
+# notification_log.py
+import datetime
+from collections import deque
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class NotificationLogModel(QAbstractListModel):
+    """Bounded, newest-last list of notification lines for a worksheet's Notification pane."""
+    MAX_ENTRIES = 10_000
+
+    def __init__(self, max_entries=None, parent=None):
+        super().__init__(parent)
+        self._entries = deque(maxlen=max_entries or self.MAX_ENTRIES)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self._entries[index.row()]
+
+    def add(self, text):
+        stamp = datetime.datetime.now().strftime('%H:%M:%S')
+        if len(self._entries) == self._entries.maxlen:
+            # Drop the oldest line so the model never grows past its bound
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self._entries.popleft()
+            self.endRemoveRows()
+        row = len(self._entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.append(f"[{stamp}] {text}")
+        self.endInsertRows()
+
+    def add_many(self, lines):
+        """Appends (timestamp, text) lines with one remove and one insert, however many there are."""
+        lines = lines[-self._entries.maxlen:]
+        if not lines:
+            return
+        overflow = len(self._entries) + len(lines) - self._entries.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._entries.popleft()
+            self.endRemoveRows()
+        row = len(self._entries)
+        self.beginInsertRows(QModelIndex(), row, row + len(lines) - 1)
+        self._entries.extend(
+            f"[{datetime.datetime.fromtimestamp(stamp).strftime('%H:%M:%S.%f')[:-3]}] {text}"
+            for stamp, text in lines)
+        self.endInsertRows()
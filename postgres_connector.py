@@ -1,10 +1,12 @@
 # postgres_connector.py
+import time
 import psycopg2
 from PyQt6.QtWidgets import QDialog, QFormLayout, QLineEdit, QHBoxLayout, QPushButton, QVBoxLayout, QMessageBox
 from PyQt6.QtGui import QIcon, QStandardItem
 from PyQt6.QtCore import Qt, QModelIndex
 
 from db_connections import DBConnector
+from formatting import format_count, format_size
 
 class PostgresConnectionDialog(QDialog):
     def __init__(self, parent=None, is_editing=False):
@@ -80,6 +82,9 @@ class PostgresConnectionDialog(QDialog):
 
 
 class PostgresConnector(DBConnector):
+    # Row estimates older than this are refreshed the next time the schema is expanded
+    STATS_TTL_SEC = 300
+
     def __init__(self):
         self.pg_conn = None # Store the connection for schema Browse
 
@@ -117,7 +122,7 @@ class PostgresConnector(DBConnector):
     def load_schema(self, conn_data, schema_model, status_callback, schema_tree_expanded_signal_connect_callback):
         try:
             schema_model.clear()
-            schema_model.setHorizontalHeaderLabels(["Schemas"])
+            schema_model.setHorizontalHeaderLabels(["Schemas", "Rows (est.)", "Size"])
             
             # Close existing schema connection if open
             if self.pg_conn:
@@ -148,7 +153,11 @@ class PostgresConnector(DBConnector):
     def load_tables_on_expand(self, index: QModelIndex, schema_model, status_callback):
         item = schema_model.itemFromIndex(index)
         if not item or (item.rowCount() > 0 and item.child(0).text() != "Loading..."):
-            return # Already loaded or not a schema item to expand
+            # Already loaded; only refresh stale row estimates
+            item_data = item.data(Qt.ItemDataRole.UserRole) if item else None
+            if item_data and item_data.get('stats_loaded_at', 0) < time.time() - self.STATS_TTL_SEC:
+                self.refresh_table_stats(item, status_callback)
+            return
 
         item.removeRows(0, item.rowCount()) # Clear the "Loading..." placeholder
 
@@ -172,7 +181,8 @@ class PostgresConnector(DBConnector):
                 # Pass the original conn_data and schema_name to the table item for query tool
                 table_item_data = item_data.copy()
                 table_item.setData(table_item_data, Qt.ItemDataRole.UserRole)
-                item.appendRow(table_item)
+                item.appendRow([table_item, self._stat_item(), self._stat_item()])
+            self.refresh_table_stats(item, status_callback)
         except Exception as e:
             status_callback(f"Error expanding schema '{schema_name}': {e}", 5000)
             # Re-add "Loading..." or show an error item if expansion failed
@@ -182,6 +192,45 @@ class PostgresConnector(DBConnector):
                 self.pg_conn.close()
                 self.pg_conn = None
 
+    def _stat_item(self, text=""):
+        stat_item = QStandardItem(text)
+        stat_item.setEditable(False)
+        stat_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return stat_item
+
+    def fetch_table_stats(self, schema_name):
+        """Row estimates and on-disk sizes for every relation of a schema, in one catalog query."""
+        cursor = self.pg_conn.cursor()
+        cursor.execute("""
+            SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relkind IN ('r', 'm', 'p', 'f')
+        """, (schema_name,))
+        return {name: (rows, size) for name, rows, size in cursor.fetchall()}
+
+    def refresh_table_stats(self, schema_item, status_callback):
+        item_data = schema_item.data(Qt.ItemDataRole.UserRole)
+        if not item_data:
+            return
+        try:
+            if not self.pg_conn:
+                self.pg_conn = self.connect(item_data.get('conn_data'))
+            stats = self.fetch_table_stats(item_data.get('schema_name'))
+        except Exception as e:
+            status_callback(f"Error loading row estimates: {e}", 5000)
+            return
+        for row in range(schema_item.rowCount()):
+            name_item = schema_item.child(row, 0)
+            if name_item is None or schema_item.child(row, 1) is None:
+                continue
+            # reltuples is -1 (or 0) until the table has been vacuumed/analyzed
+            rows, size = stats.get(name_item.text(), (None, None))
+            schema_item.child(row, 1).setText(format_count(rows, approximate=True) if rows is not None else "")
+            schema_item.child(row, 2).setText(format_size(size) if size is not None else "")
+            name_item.setToolTip("Estimated from pg_class.reltuples and pg_total_relation_size")
+        item_data['stats_loaded_at'] = time.time()
+        schema_item.setData(item_data, Qt.ItemDataRole.UserRole)
+
     def get_connection_dialog(self, parent=None, conn_data=None, is_editing=False):
         dialog = PostgresConnectionDialog(parent, is_editing)
         if is_editing and conn_data:
@@ -0,0 +1,48 @@
+# query_analyzer.py
+# Query fingerprinting and the slow-query/regression rules applied to query_history.
+import re
+
+DEFAULT_THRESHOLDS = {
+    "min_duration_sec": 1.0,     # Runs faster than this are never logged
+    "regression_factor": 3.0,    # Slower than factor x the fingerprint's mean is a regression
+    "min_samples": 5,            # Baseline runs needed before regressions are reported
+}
+# A lasting slowdown becomes the new baseline after this many regressions in a row
+REBASELINE_AFTER_REGRESSIONS = 5
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(query):
+    """Normalizes a query so runs that differ only in literals share a baseline."""
+    text = _COMMENT_RE.sub(" ", query or "")
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(?+)", text)
+    text = _SPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+    return text.lower()
+
+
+def evaluate_run(duration, runs, mean, thresholds):
+    """Classifies one run against its fingerprint baseline (before the run is added).
+
+    Returns None, 'slow' (over the absolute threshold) or 'regression'.
+    """
+    if duration is None or duration < thresholds["min_duration_sec"]:
+        return None
+    if runs >= thresholds["min_samples"] and mean and duration > thresholds["regression_factor"] * mean:
+        return "regression"
+    return "slow"
+
+
+def update_baseline(runs, mean, m2, duration):
+    """Welford's online update of count, mean and sum of squared deviations."""
+    runs += 1
+    delta = duration - mean
+    mean += delta / runs
+    m2 += delta * (duration - mean)
+    return runs, mean, m2
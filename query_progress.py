@@ -0,0 +1,90 @@
+# query_progress.py
+# Live progress of a running PostgreSQL statement, read from pg_stat_activity and the
+# pg_stat_progress_* views over a side connection, plus the worksheet status text.
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+# Probes start once a query has run this long, then repeat at this interval
+PROBE_AFTER_SEC = 1.0
+PROBE_INTERVAL_SEC = 2.0
+
+# (minimum server version, view, label, phase, done, total)
+PROGRESS_VIEWS = (
+    (120000, "pg_stat_progress_create_index", "CREATE INDEX", "phase",
+     "CASE WHEN blocks_total > 0 THEN blocks_done ELSE tuples_done END",
+     "CASE WHEN blocks_total > 0 THEN blocks_total ELSE tuples_total END"),
+    (90600, "pg_stat_progress_vacuum", "VACUUM", "phase",
+     "heap_blks_scanned", "heap_blks_total"),
+    (130000, "pg_stat_progress_analyze", "ANALYZE", "phase",
+     "sample_blks_scanned", "sample_blks_total"),
+    (120000, "pg_stat_progress_cluster", "CLUSTER", "phase",
+     "heap_blks_scanned", "heap_blks_total"),
+    # bytes_total is 0 for COPY FROM STDIN, so fall back to a row count
+    (140000, "pg_stat_progress_copy", "COPY", "command",
+     "CASE WHEN bytes_total > 0 THEN bytes_processed ELSE tuples_processed END",
+     "bytes_total"),
+)
+
+
+def probe_backend(conn, pid):
+    """What backend `pid` is doing: state, wait event and any command progress."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT state, wait_event_type, wait_event FROM pg_stat_activity WHERE pid = %s", (pid,))
+    row = cursor.fetchone()
+    probe = {"pid": pid, "state": None, "wait_event_type": None, "wait_event": None, "progress": []}
+    if row is None:
+        return probe
+    probe["state"], probe["wait_event_type"], probe["wait_event"] = row
+    views = [v for v in PROGRESS_VIEWS if conn.server_version >= v[0]]
+    if views:
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT '{label}', {phase}::text, ({done})::bigint, ({total})::bigint "
+            f"FROM {view} WHERE pid = %(pid)s"
+            for _, view, label, phase, done, total in views), {"pid": pid})
+        probe["progress"] = cursor.fetchall()
+    return probe
+
+
+def format_progress(elapsed, rows=None, rate=None, probe=None):
+    parts = [f"Running... {elapsed:.1f} sec"]
+    if rows:
+        parts.append(f"{rows:,} rows received ({rate:,.0f} rows/s)")
+    if probe:
+        for label, phase, done, total in probe["progress"]:
+            text = f"{label}: {phase}"
+            if total:
+                text += f" {100 * done / total:.0f}%"
+            elif done:
+                text += f" ({done:,} processed)"
+            parts.append(text)
+        if probe["wait_event_type"] and probe["state"] == "active":
+            parts.append(f"waiting on {probe['wait_event_type']}: {probe['wait_event']}")
+    return " | ".join(parts)
+
+
+# --- Signals class for progress probes ---
+class ProgressSignals(QObject):
+    probed = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class RunnableProgressProbe(QRunnable):
+    """Probes a running backend on a connection borrowed from the pool, never the query's own."""
+
+    def __init__(self, pool, conn_data, pid, signals):
+        super().__init__()
+        self.pool = pool
+        self.conn_data = conn_data
+        self.pid = pid
+        self.signals = signals
+
+    def run(self):
+        conn = None
+        try:
+            conn = self.pool.acquire(self.conn_data)
+            self.signals.probed.emit(probe_backend(conn, self.pid))
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            if conn is not None:
+                self.pool.release(self.conn_data, conn)
@@ -1,76 +1,140 @@
 # query_worker.py
+import re
 import time
 from PyQt6.QtCore import Qt, QObject, pyqtSignal, QRunnable
 import psycopg2
 import sqlite3 as sqlite
 
+from result_decoder import POOL_DECODE_MIN_ROWS, decode_in_pool
+from result_store import DEFAULT_TAB_BUDGET_BYTES, FETCH_BATCH_ROWS, RowStore
+from sql_params import find_placeholders, strip_literals, to_pyformat, to_named, to_positional
+from sqlite_profile import connect_sqlite
+
+# TCP keepalives let idle pooled connections survive NAT/firewall timeouts and
+# make a dead peer show up in seconds instead of at the next query
+PG_KEEPALIVE_OPTIONS = {"keepalives": 1, "keepalives_idle": 30,
+                        "keepalives_interval": 10, "keepalives_count": 3}
+PG_CONNECT_TIMEOUT_SEC = 10
+# Compiled statements kept per SQLite connection, so pooled reruns skip re-preparing
+SQLITE_STATEMENT_CACHE = 256
+# Statements that PostgreSQL can PREPARE
+PREPARABLE_VERBS = ("select", "insert", "update", "delete", "values", "with")
+# Rows-received progress is emitted at most this often while fetching
+ROW_PROGRESS_INTERVAL_SEC = 0.5
+
+def open_connection(conn_data, thread_shared=False):
+    """Opens a DB-API connection for a saved connection item.
+
+    thread_shared SQLite connections may be used from any (one at a time) thread,
+    which pooled and session connections need. SQLite files are opened with the
+    item's performance profile (read-only URI, mmap and cache PRAGMAs).
+    """
+    if not conn_data:
+        raise ConnectionError("Incomplete connection information.")
+    if "db_path" in conn_data and conn_data["db_path"]:
+        return connect_sqlite(conn_data["db_path"], conn_data.get("sqlite_profile"),
+                              check_same_thread=not thread_shared,
+                              cached_statements=SQLITE_STATEMENT_CACHE)
+    return psycopg2.connect(
+        host=conn_data["host"], database=conn_data["database"],
+        user=conn_data["user"], password=conn_data["password"],
+        port=int(conn_data["port"]), connect_timeout=PG_CONNECT_TIMEOUT_SEC,
+        **PG_KEEPALIVE_OPTIONS
+    )
+
+
 # --- Signals class for QRunnable worker ---
 class QuerySignals(QObject):
-    finished = pyqtSignal(dict, str, list, list, int, float, bool)
+    # results is a result_store.RowStore, or a result_decoder.DecodedResult
+    finished = pyqtSignal(dict, str, object, list, int, float, bool)
     error = pyqtSignal(str)
+    progress = pyqtSignal(int, float)  # rows received so far, rows/sec
 
 
 # --- Worker now inherits from QRunnable for use with QThreadPool ---
 class RunnableQuery(QRunnable):
-    def __init__(self, conn_data, query, signals):
+    def __init__(self, conn_data, query, signals, decode_in_pool=False, params=None,
+                 memory_budget_bytes=DEFAULT_TAB_BUDGET_BYTES, pool=None, session=None):
         super().__init__()
+        self.pool = pool  # connection_pool.ConnectionPool to borrow a warm connection from
+        self.session = session  # session.WorksheetSession to run on instead, if any
         self.conn_data = conn_data
         self.query = query
+        self.params = params  # {name: value} for :name / %(name)s placeholders
         self.signals = signals
+        self.decode_in_pool = decode_in_pool
+        self.memory_budget_bytes = memory_budget_bytes
         self._is_cancelled = False
         self.conn = None # To hold the connection object
+        self.backend_pid = None  # PostgreSQL server process, for progress probes
 
     def cancel(self):
         self._is_cancelled = True
+        if self.session:
+            try:
+                self.session.cancel()
+            except Exception as e:
+                print(f"Error cancelling session statement: {e}")
+            return
         # Attempt to close the connection if it's open
         if self.conn:
             try:
-                self.conn.close()
+                if isinstance(self.conn, sqlite.Connection):
+                    # Safe from another thread, unlike close()
+                    self.conn.interrupt()
+                else:
+                    self.conn.close()
             except Exception as e:
                 print(f"Error closing connection during cancel: {e}")
 
     def run(self):
         try:
             start_time = time.time()
-            if not self.conn_data:
-                raise ConnectionError("Incomplete connection information.")
-
-            # Determine connection type and establish connection
-            if "db_path" in self.conn_data and self.conn_data["db_path"]:
-                self.conn = sqlite.connect(self.conn_data["db_path"])
+            if self.session:
+                self.session.lock.acquire()
+                self.session.busy = True
+                self.conn = self.session.connect()
+            elif self.pool:
+                self.conn = self.pool.acquire(self.conn_data)
             else:
-                self.conn = psycopg2.connect(
-                    host=self.conn_data["host"], database=self.conn_data["database"],
-                    user=self.conn_data["user"], password=self.conn_data["password"],
-                    port=int(self.conn_data["port"])
-                )
+                self.conn = open_connection(self.conn_data)
+            if not isinstance(self.conn, sqlite.Connection):
+                self.backend_pid = self.conn.get_backend_pid()
 
-            cursor = self.conn.cursor()
-            cursor.execute(self.query)
+            is_select_query = self.query.lower().strip().startswith("select")
+            cursor = self._execute(is_select_query)
 
             if self._is_cancelled:
-                self.conn.close()
+                self._drop_connection()
                 return
 
             row_count = 0
-            is_select_query = self.query.lower().strip().startswith("select")
             results = []
             columns = []
 
             if is_select_query:
+                batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+                # Named cursors only have a description after the first fetch
                 if cursor.description:
                     columns = [desc[0] for desc in cursor.description]
-                    if not self._is_cancelled:
-                        results = cursor.fetchall()
-                        row_count = len(results)
-                else:
-                    row_count = 0
+                    results = self._fetch_into_store(cursor, batch, len(columns), start_time)
+                    if results is None:
+                        return
+                    row_count = len(results)
+                    if self.decode_in_pool and row_count >= POOL_DECODE_MIN_ROWS and not results.is_spilled:
+                        store = results
+                        results = decode_in_pool(store.rows, len(columns))
+                        store.release()
             else:
-                self.conn.commit()
+                if not self.session:
+                    # Session connections autocommit unless the user began a transaction
+                    self.conn.commit()
                 row_count = cursor.rowcount if cursor.rowcount != -1 else 0
 
             if self._is_cancelled:
-                self.conn.close()
+                if isinstance(results, RowStore):
+                    results.release()
+                self._drop_connection()
                 return
 
             elapsed_time = time.time() - start_time
@@ -81,5 +145,108 @@ class RunnableQuery(QRunnable):
             if not self._is_cancelled:
                 self.signals.error.emit(str(e))
         finally:
-            if self.conn:
-                self.conn.close()
\ No newline at end of file
+            if self.session:
+                self.session.busy = False
+                self.session.touch()
+                self.session.lock.release()
+            elif self.conn and self.pool:
+                self.pool.release(self.conn_data, self.conn)
+            elif self.conn:
+                self.conn.close()
+
+    def _drop_connection(self):
+        # A session keeps its connection; anything else is closed after a cancel
+        if not self.session:
+            self.conn.close()
+
+    def _execute(self, is_select_query):
+        is_sqlite = isinstance(self.conn, sqlite.Connection)
+        if self.params is not None and is_sqlite:
+            cursor = self.conn.cursor()
+            cursor.execute(to_named(self.query), self.params)
+            return cursor
+        if self.params is not None and self.pool and self._is_preparable():
+            return self._execute_prepared()
+        if is_select_query and not is_sqlite and not self.session and self._is_plain_select():
+            # Server-side cursor (needs a transaction, so not on autocommit sessions): rows arrive in batches instead of all at once in libpq
+            cursor = self.conn.cursor(name="sqlclient_result")
+            cursor.itersize = FETCH_BATCH_ROWS
+        else:
+            cursor = self.conn.cursor()
+        if self.params is None:
+            cursor.execute(self.query)
+        else:
+            cursor.execute(to_pyformat(self.query), self.params)
+        return cursor
+
+    def _is_plain_select(self):
+        """A single SELECT that DECLARE can wrap: no second statement and no SELECT ... INTO."""
+        code = strip_literals(self.query).strip().rstrip(";")
+        return ";" not in code and not re.search(r"\binto\b", code, re.IGNORECASE)
+
+    def _is_preparable(self):
+        words = self.query.lstrip("( \t\r\n").split(None, 1)
+        return bool(words) and words[0].lower() in PREPARABLE_VERBS
+
+    def _execute_prepared(self):
+        """PREPAREs the statement once per pooled connection, then EXECUTEs it with the values."""
+        names = find_placeholders(self.query)
+        statement = to_positional(self.query.strip().rstrip(";"), names)
+        cursor = self.conn.cursor()
+        try:
+            name, is_prepared = self.pool.prepared_statement(self.conn, statement)
+            if not is_prepared:
+                cursor.execute(f"PREPARE {name} AS {statement}")
+                self.pool.mark_prepared(self.conn, statement, name)
+            args = [self.params.get(n) for n in names]
+            if args:
+                cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", args)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+        except Exception:
+            # Don't trust this connection's statement list after a failure
+            self.pool.forget_prepared(self.conn)
+            raise
+        return cursor
+
+    def _fetch_into_store(self, cursor, batch, column_count, start_time):
+        """Streams the rest of the result into a RowStore; None if cancelled midway."""
+        store = RowStore(column_count, self.memory_budget_bytes)
+        last_report = time.time()
+        try:
+            while batch:
+                if self._is_cancelled:
+                    store.release()
+                    return None
+                store.extend(batch)
+                now = time.time()
+                if now - last_report >= ROW_PROGRESS_INTERVAL_SEC:
+                    last_report = now
+                    self.signals.progress.emit(len(store), len(store) / (now - start_time))
+                batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+        except Exception:
+            store.release()
+            raise
+        return store
+
+# --- Signals class for the background slow-query analyzer ---
+class AnalyzerSignals(QObject):
+    flagged = pyqtSignal(list)
+    error = pyqtSignal(str)
+
+
+class RunnableHistoryAnalysis(QRunnable):
+    """Runs one incremental DatabaseManager.analyze_history_batch pass off the UI thread."""
+
+    def __init__(self, db_manager, signals, batch_size=5000):
+        super().__init__()
+        self.db_manager = db_manager
+        self.signals = signals
+        self.batch_size = batch_size
+
+    def run(self):
+        try:
+            flagged = self.db_manager.analyze_history_batch(self.batch_size)
+            self.signals.flagged.emit(flagged)
+        except Exception as e:
+            self.signals.error.emit(str(e))
@@ -0,0 +1,287 @@
+# result_decoder.py
+# Decodes large result sets in worker processes. Kept free of Qt imports so the
+# spawned workers start quickly.
+import atexit
+import bisect
+import math
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+from decimal import Decimal
+from multiprocessing import shared_memory
+
+# Results smaller than this are formatted lazily in the UI thread instead
+POOL_DECODE_MIN_ROWS = 200_000
+POOL_CHUNK_ROWS = 100_000
+# Binary values over LARGE_BINARY_BYTES and text over LARGE_TEXT_CHARS are shown as a
+# preview in the grid; the full value is only decoded when a cell viewer opens
+LARGE_BINARY_BYTES = 256
+LARGE_TEXT_CHARS = 1000
+PREVIEW_BYTES = 32
+PREVIEW_CHARS = 200
+
+_pool = None
+
+
+class LargeValue:
+    """A value the grid shows as a preview.
+
+    Either the full value is held in `value`, or (for columns deferred by the
+    table browser) only `size` and `preview` were transferred and `key`/`column`
+    identify the row and column to fetch it from.
+    """
+    __slots__ = ("size", "preview", "is_binary", "value", "key", "column")
+
+    def __init__(self, size, preview, is_binary, value=None, key=None, column=None):
+        self.size = size
+        self.preview = preview
+        self.is_binary = is_binary
+        self.value = value
+        self.key = key
+        self.column = column
+
+    @property
+    def is_deferred(self):
+        return self.value is None and self.key is not None
+
+    def __str__(self):
+        if self.is_binary:
+            return _binary_preview(self.size, self.preview)
+        return _text_preview(self.size, self.preview)
+
+
+def _binary_preview(size, head):
+    return f"<{size:,} bytes> \\x{bytes(head[:PREVIEW_BYTES]).hex()}..."
+
+
+def _text_preview(size, head):
+    return f"{head[:PREVIEW_CHARS]}... <{size:,} chars>"
+
+
+def is_large(value):
+    if isinstance(value, memoryview):
+        return value.nbytes > LARGE_BINARY_BYTES
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) > LARGE_BINARY_BYTES
+    return isinstance(value, str) and len(value) > LARGE_TEXT_CHARS
+
+
+def format_cell(value):
+    """Display string for a single driver value; large values are only previewed."""
+    if isinstance(value, LargeValue):
+        return str(value)
+    if isinstance(value, memoryview):
+        if value.nbytes > LARGE_BINARY_BYTES:
+            return _binary_preview(value.nbytes, value[:PREVIEW_BYTES].tobytes())
+        value = value.tobytes()
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) > LARGE_BINARY_BYTES:
+            return _binary_preview(len(value), value[:PREVIEW_BYTES])
+        return "\\x" + value.hex()
+    if isinstance(value, str) and len(value) > LARGE_TEXT_CHARS:
+        return _text_preview(len(value), value)
+    return str(value)
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent process runs Qt and database driver threads
+        _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(_pool.shutdown, cancel_futures=True)
+    return _pool
+
+
+def _decode_chunk(rows, column_count):
+    """Worker: formats one chunk into a shared-memory block, one buffer set per column.
+
+    Layout per column: (rows + 1) uint64 offsets followed by the UTF-8 blob, then
+    for numeric columns a float64 array (NaN for NULL) usable as a sort key.
+    """
+    row_count = len(rows)
+    parts = []
+    meta = []
+    stats = []
+    # Full large values go back by position so a cell viewer can still open them
+    large = {}
+    for col in range(column_count):
+        offsets = array("Q", [0])
+        blob = bytearray()
+        numeric = array("d")
+        is_numeric = True
+        nulls = 0
+        max_width = 0
+        low = high = None
+        for row_index, row in enumerate(rows):
+            value = row[col]
+            if is_large(value):
+                large[(row_index, col)] = value
+            if value is None:
+                nulls += 1
+                numeric.append(math.nan)
+            elif is_numeric and isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                number = float(value)
+                numeric.append(number)
+                low = number if low is None or number < low else low
+                high = number if high is None or number > high else high
+            else:
+                is_numeric = False
+            text = format_cell(value).encode("utf-8")
+            blob += text
+            offsets.append(len(blob))
+            if len(text) > max_width:
+                max_width = len(text)
+        column_parts = [offsets.tobytes(), bytes(blob)]
+        if is_numeric and nulls < row_count:
+            column_parts.append(numeric.tobytes())
+        else:
+            low = high = None
+        meta.append([len(p) for p in column_parts])
+        parts.extend(column_parts)
+        stats.append({"nulls": nulls, "max_width": max_width, "min": low, "max": high})
+
+    size = max(1, sum(len(p) for p in parts))
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    position = 0
+    for part in parts:
+        shm.buf[position:position + len(part)] = part
+        position += len(part)
+    name = shm.name
+    shm.close()
+    return {"shm": name, "rows": row_count, "layout": meta, "stats": stats, "large": large}
+
+
+class _DecodedChunk:
+    def __init__(self, info):
+        self.rows = info["rows"]
+        self.shm = shared_memory.SharedMemory(name=info["shm"])
+        buf = self.shm.buf
+        self.columns = []
+        position = 0
+        for sizes in info["layout"]:
+            offsets = buf[position:position + sizes[0]].cast("Q")
+            position += sizes[0]
+            blob = buf[position:position + sizes[1]]
+            position += sizes[1]
+            numeric = None
+            if len(sizes) > 2:
+                numeric = buf[position:position + sizes[2]].cast("d")
+                position += sizes[2]
+            self.columns.append((offsets, blob, numeric))
+
+    def cell(self, row, col):
+        offsets, blob, _ = self.columns[col]
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def release(self):
+        for offsets, blob, numeric in self.columns:
+            offsets.release()
+            blob.release()
+            if numeric is not None:
+                numeric.release()
+        self.columns = []
+        self.shm.close()
+        self.shm.unlink()
+
+
+class DecodedResult:
+    """Read-only, row-indexable view over the shared-memory chunks of a decoded result."""
+
+    def __init__(self, chunk_infos, column_count):
+        self.column_count = column_count
+        self.chunks = [_DecodedChunk(info) for info in chunk_infos]
+        self._starts = []
+        total = 0
+        for chunk in self.chunks:
+            self._starts.append(total)
+            total += chunk.rows
+        self._length = total
+        self.column_stats = self._merge_stats([info["stats"] for info in chunk_infos])
+        self.large_values = {}
+        for start, info in zip(self._starts, chunk_infos):
+            for (row, col), value in info["large"].items():
+                self.large_values[(start + row, col)] = value
+
+    def _merge_stats(self, chunk_stats):
+        merged = []
+        for col in range(self.column_count):
+            column = [stats[col] for stats in chunk_stats]
+            lows = [s["min"] for s in column if s["min"] is not None]
+            highs = [s["max"] for s in column if s["max"] is not None]
+            merged.append({
+                "nulls": sum(s["nulls"] for s in column),
+                "max_width": max((s["max_width"] for s in column), default=0),
+                "min": min(lows) if lows else None,
+                "max": max(highs) if highs else None,
+            })
+        return merged
+
+    def __len__(self):
+        return self._length
+
+    def _locate(self, row):
+        index = bisect.bisect_right(self._starts, row) - 1
+        return self.chunks[index], row - self._starts[index]
+
+    def cell(self, row, col):
+        chunk, local_row = self._locate(row)
+        return chunk.cell(local_row, col)
+
+    def raw_value(self, row, col):
+        """The original value for large cells, otherwise the display string."""
+        if (row, col) in self.large_values:
+            return self.large_values[(row, col)]
+        return self.cell(row, col)
+
+    def __getitem__(self, row):
+        chunk, local_row = self._locate(row)
+        return tuple(chunk.cell(local_row, col) for col in range(self.column_count))
+
+    def column_values(self, col):
+        """One column as a list: floats (NaN for NULL) for numeric columns, else display strings."""
+        if self.chunks and all(chunk.columns[col][2] is not None for chunk in self.chunks):
+            values = []
+            for chunk in self.chunks:
+                values.extend(chunk.columns[col][2].tolist())
+            return values
+        return [chunk.cell(row, col) for chunk in self.chunks for row in range(chunk.rows)]
+
+    def release(self):
+        for chunk in self.chunks:
+            chunk.release()
+        self.chunks = []
+        self._starts = []
+        self._length = 0
+        self.large_values = {}
+
+
+def _picklable_rows(rows):
+    # psycopg2 returns bytea as memoryview, which cannot cross a process boundary.
+    # Every row is checked: a bytea column can be NULL for the first rows of a chunk.
+    if not any(isinstance(v, memoryview) for row in rows for v in row):
+        return rows
+    return [tuple(v.tobytes() if isinstance(v, memoryview) else v for v in row) for row in rows]
+
+
+def decode_in_pool(rows, column_count, chunk_rows=POOL_CHUNK_ROWS):
+    """Formats rows in the process pool and returns a DecodedResult backed by shared memory."""
+    pool = get_pool()
+    futures = [
+        pool.submit(_decode_chunk, _picklable_rows(rows[start:start + chunk_rows]), column_count)
+        for start in range(0, len(rows), chunk_rows)
+    ]
+    # Every chunk has to settle first: a later one may still be writing its segment
+    wait(futures)
+    failed = next((future.exception() for future in futures if future.exception()), None)
+    if failed is not None:
+        for future in futures:
+            if future.exception() is None:
+                try:
+                    orphan = shared_memory.SharedMemory(name=future.result()["shm"])
+                    orphan.close()
+                    orphan.unlink()
+                except FileNotFoundError:
+                    pass
+        raise failed
+    chunk_infos = [future.result() for future in futures]
+    return DecodedResult(chunk_infos, column_count)
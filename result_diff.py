@@ -0,0 +1,226 @@
+# result_diff.py
+# Compares two result sets by key columns or by row hash. Both sides are streamed
+# into a temporary SQLite file and diffed there, so memory stays bounded.
+import hashlib
+import json
+import os
+import sqlite3 as sqlite
+import tempfile
+import time
+from decimal import Decimal
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+from result_store import FETCH_BATCH_ROWS
+
+# Changed/added/removed rows listed in the grid; the counts always cover everything
+MAX_REPORTED_ROWS = 1000
+
+
+def _canonical(value):
+    """Text form used for hashing, so equal values from Postgres and SQLite compare equal."""
+    if value is None:
+        return "\x00NULL"
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, (bytes, bytearray)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float, Decimal)):
+        number = Decimal(value) if not isinstance(value, float) else Decimal(repr(value))
+        if not number.is_finite():
+            return str(number)  # Infinity, -Infinity, NaN
+        if number == number.to_integral_value():
+            return str(int(number))
+        return str(number.normalize())
+    return str(value)
+
+
+def _row_hash(canonical_values):
+    digest = hashlib.blake2b(digest_size=16)
+    for text in canonical_values:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.digest()
+
+
+def _decode_row(row_json):
+    return [None if text == "\x00NULL" else text for text in json.loads(row_json)]
+
+
+def _strip_statement(query):
+    return query.strip().rstrip(";").strip()
+
+
+class ResultDiff:
+    """Streams two queries into a scratch database and reports their differences."""
+
+    def __init__(self, left, right, key_columns=None, is_cancelled=None, progress=None):
+        # left/right are (conn_data, query) pairs
+        self.left = left
+        self.right = right
+        self.key_columns = [c.strip() for c in (key_columns or []) if c.strip()]
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.progress = progress or (lambda text: None)
+        self.columns = None
+
+    def run(self):
+        fd, path = tempfile.mkstemp(prefix="sqlclient_diff_", suffix=".db")
+        os.close(fd)
+        scratch = sqlite.connect(path, isolation_level=None)
+        try:
+            scratch.execute("PRAGMA journal_mode = OFF")
+            scratch.execute("PRAGMA synchronous = OFF")
+            for side, (conn_data, query) in (("l", self.left), ("r", self.right)):
+                if not self._load_side(scratch, side, conn_data, query):
+                    return None
+            self.progress("Comparing...")
+            return self._compare(scratch)
+        finally:
+            scratch.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _key_positions(self, columns):
+        lookup = {name.lower(): i for i, name in enumerate(columns)}
+        missing = [c for c in self.key_columns if c.lower() not in lookup]
+        if missing:
+            raise ValueError(f"Key column(s) not in result: {', '.join(missing)}")
+        return [lookup[c.lower()] for c in self.key_columns]
+
+    def _load_side(self, scratch, side, conn_data, query):
+        conn = open_connection(conn_data)
+        try:
+            if conn_data.get("db_path"):
+                cursor = conn.cursor()
+            else:
+                cursor = conn.cursor(name="sqlclient_diff")
+                cursor.itersize = FETCH_BATCH_ROWS
+            cursor.execute(_strip_statement(query))
+            batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+            if not cursor.description:
+                raise ValueError("Both queries must return rows.")
+            columns = [desc[0] for desc in cursor.description]
+            if self.columns is None:
+                self.columns = columns
+            elif [c.lower() for c in columns] != [c.lower() for c in self.columns]:
+                raise ValueError(
+                    f"Result columns differ:\n  {', '.join(self.columns)}\n  {', '.join(columns)}")
+            key_positions = self._key_positions(columns)
+            scratch.execute(f"CREATE TABLE {side} (k TEXT, h BLOB, row_json TEXT)")
+            loaded = 0
+            while batch:
+                if self.is_cancelled():
+                    return False
+                records = []
+                for row in batch:
+                    canonical = [_canonical(v) for v in row]
+                    key = json.dumps([canonical[i] for i in key_positions]) if key_positions else None
+                    records.append((key, _row_hash(canonical), json.dumps(canonical)))
+                scratch.execute("BEGIN")
+                scratch.executemany(f"INSERT INTO {side} VALUES (?, ?, ?)", records)
+                scratch.execute("COMMIT")
+                loaded += len(batch)
+                self.progress(f"{'Left' if side == 'l' else 'Right'} side: {loaded:,} rows")
+                batch = cursor.fetchmany(FETCH_BATCH_ROWS)
+            index_column = "k" if key_positions else "h"
+            scratch.execute(f"CREATE INDEX {side}_idx ON {side} ({index_column})")
+            return True
+        finally:
+            conn.close()
+
+    def _compare(self, scratch):
+        counts = {}
+        samples = []
+
+        def collect(change, sql, count_sql):
+            counts[change] = scratch.execute(count_sql).fetchone()[0]
+            room = MAX_REPORTED_ROWS - len(samples)
+            if room > 0:
+                for (row_json,) in scratch.execute(f"{sql} LIMIT {room}"):
+                    samples.append((change, _decode_row(row_json)))
+
+        if self.key_columns:
+            collect("added",
+                    "SELECT r.row_json FROM r LEFT JOIN l ON l.k = r.k WHERE l.k IS NULL",
+                    "SELECT count(*) FROM r LEFT JOIN l ON l.k = r.k WHERE l.k IS NULL")
+            collect("removed",
+                    "SELECT l.row_json FROM l LEFT JOIN r ON r.k = l.k WHERE r.k IS NULL",
+                    "SELECT count(*) FROM l LEFT JOIN r ON r.k = l.k WHERE r.k IS NULL")
+            counts["changed"] = scratch.execute(
+                "SELECT count(*) FROM l JOIN r ON r.k = l.k WHERE l.h != r.h").fetchone()[0]
+            room = MAX_REPORTED_ROWS - len(samples)
+            if room > 0:
+                for before, after in scratch.execute(
+                        f"SELECT l.row_json, r.row_json FROM l JOIN r ON r.k = l.k "
+                        f"WHERE l.h != r.h LIMIT {room // 2}"):
+                    samples.append(("changed (before)", _decode_row(before)))
+                    samples.append(("changed (after)", _decode_row(after)))
+            counts["unchanged"] = scratch.execute(
+                "SELECT count(*) FROM l JOIN r ON r.k = l.k WHERE l.h = r.h").fetchone()[0]
+            duplicates = scratch.execute(
+                "SELECT (SELECT count(*) - count(DISTINCT k) FROM l) + "
+                "(SELECT count(*) - count(DISTINCT k) FROM r)").fetchone()[0]
+            if duplicates:
+                counts["duplicate keys"] = duplicates
+        else:
+            # Without a key, rows are a multiset of hashes; a changed row is a removal plus an addition
+            scratch.execute("CREATE TABLE lc AS SELECT h, count(*) AS n, min(row_json) AS row_json FROM l GROUP BY h")
+            scratch.execute("CREATE TABLE rc AS SELECT h, count(*) AS n, min(row_json) AS row_json FROM r GROUP BY h")
+            scratch.execute("CREATE INDEX lc_idx ON lc (h)")
+            scratch.execute("CREATE INDEX rc_idx ON rc (h)")
+            added = ("FROM rc LEFT JOIN lc ON lc.h = rc.h WHERE rc.n > coalesce(lc.n, 0)")
+            removed = ("FROM lc LEFT JOIN rc ON rc.h = lc.h WHERE lc.n > coalesce(rc.n, 0)")
+            collect("added", f"SELECT rc.row_json {added}",
+                    f"SELECT coalesce(sum(rc.n - coalesce(lc.n, 0)), 0) {added}")
+            collect("removed", f"SELECT lc.row_json {removed}",
+                    f"SELECT coalesce(sum(lc.n - coalesce(rc.n, 0)), 0) {removed}")
+            counts["unchanged"] = scratch.execute(
+                "SELECT coalesce(sum(min(lc.n, rc.n)), 0) FROM lc JOIN rc ON rc.h = lc.h").fetchone()[0]
+        return {"columns": self.columns, "counts": counts, "rows": samples,
+                "key_columns": self.key_columns}
+
+
+def format_summary(diff, elapsed):
+    mode = f"key ({', '.join(diff['key_columns'])})" if diff["key_columns"] else "row hash"
+    lines = [f"Result diff by {mode} | Time: {elapsed:.2f} sec", ""]
+    lines.extend(f"{name.capitalize()}: {count:,}" for name, count in diff["counts"].items())
+    shown = len(diff["rows"])
+    if shown >= MAX_REPORTED_ROWS:
+        lines.append(f"\nOnly the first {shown:,} differing rows are listed in the Output grid.")
+    return "\n".join(lines)
+
+
+# --- Signals class for result diffs ---
+class DiffSignals(QObject):
+    finished = pyqtSignal(object, float)
+    progress = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+
+class RunnableResultDiff(QRunnable):
+    def __init__(self, left, right, key_columns, signals):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.key_columns = key_columns
+        self.signals = signals
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            start_time = time.time()
+            diff = ResultDiff(self.left, self.right, self.key_columns,
+                              is_cancelled=lambda: self._is_cancelled,
+                              progress=self.signals.progress.emit).run()
+            if diff is not None and not self._is_cancelled:
+                self.signals.finished.emit(diff, time.time() - start_time)
+        except Exception as e:
+            if not self._is_cancelled:
+                self.signals.error.emit(str(e))
@@ -0,0 +1,273 @@
+# result_filter.py
+# Client-side sort and filter over fetched result rows, using the native column values.
+import datetime
+import math
+import operator
+import re
+from array import array
+from decimal import Decimal
+
+_NUMERIC_TYPES = (int, float, Decimal)
+_OPERATORS = {
+    "=": operator.eq, "!=": operator.ne, "<>": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+_CONDITION_RE = re.compile(
+    r'^\s*(?:"(?P<qcol>[^"]+)"|(?P<col>[\w.]+))\s*'
+    r'(?:(?P<null>is\s+(?:not\s+)?null)|(?P<op>!=|<>|<=|>=|=|<|>|~)\s*(?P<value>.*?))\s*$',
+    re.IGNORECASE)
+_AND_RE = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _unquote(text):
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    return text
+
+
+def parse_filter(text, columns):
+    """Parses 'col op value [and ...]' into conditions; anything else is a text search.
+
+    Operators are = != <> < <= > >= and ~ (case-insensitive contains), plus
+    'is null' / 'is not null'. Returns a list of (column_index, op, operand),
+    where column_index None with op '~' searches every column.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    lookup = {name.lower(): i for i, name in enumerate(columns)}
+    conditions = []
+    for part in _AND_RE.split(text):
+        match = _CONDITION_RE.match(part)
+        if not match:
+            return [(None, "~", _unquote(text))]
+        name = match.group("qcol") or match.group("col")
+        if name.lower() not in lookup:
+            # A bare word followed by an operator-like character is still just a search
+            return [(None, "~", _unquote(text))]
+        column = lookup[name.lower()]
+        if match.group("null"):
+            op = "is not null" if "not" in match.group("null").lower() else "is null"
+            conditions.append((column, op, None))
+        else:
+            conditions.append((column, match.group("op"), _unquote(match.group("value"))))
+    return conditions
+
+
+def _column_kind(values):
+    for value in values[:1000]:
+        if _is_null(value):
+            continue
+        if isinstance(value, _NUMERIC_TYPES) and not isinstance(value, bool):
+            return "number"
+        if isinstance(value, (datetime.date, datetime.time)):
+            return "temporal"
+        return "text"
+    return "text"
+
+
+def _temporal_operand(values, operand):
+    """operand as the column's date/datetime/time type, or None to compare display forms."""
+    sample = next((v for v in values if v is not None), None)
+    try:
+        parsed = type(sample).fromisoformat(operand)
+        sample < parsed  # Raises TypeError for naive vs aware datetimes
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return parsed
+
+
+class ColumnCache:
+    """Per-column values and the keys derived from them, built on first use.
+
+    Sorting and filtering the same result again (another column, the other
+    direction, a new filter) reuses them instead of re-extracting the column
+    and re-stringifying every value. invalidate() whenever the rows change.
+    """
+
+    def __init__(self, extract):
+        self._extract = extract  # column -> list of native values
+        self.invalidate()
+
+    def invalidate(self):
+        self._values = {}
+        self._kinds = {}
+        self._texts = {}
+        self._lowered = {}
+        self._numbers = {}
+        self._orders = {}
+
+    def values(self, col):
+        values = self._values.get(col)
+        if values is None:
+            values = self._values[col] = self._extract(col)
+        return values
+
+    def kind(self, col):
+        kind = self._kinds.get(col)
+        if kind is None:
+            kind = self._kinds[col] = _column_kind(self.values(col))
+        return kind
+
+    def texts(self, col):
+        """Display form of each value (what text and date comparisons use), None for NULL."""
+        texts = self._texts.get(col)
+        if texts is None:
+            # v != v is NaN, which marks NULL in decoded numeric columns
+            texts = self._texts[col] = [None if v is None or v != v else v if type(v) is str else str(v)
+                                        for v in self.values(col)]
+        return texts
+
+    def lowered(self, col):
+        """Lower-cased display form for searching, "" for NULL."""
+        lowered = self._lowered.get(col)
+        if lowered is None:
+            lowered = self._lowered[col] = [t.lower() if t is not None else "" for t in self.texts(col)]
+        return lowered
+
+    def numbers(self, col):
+        numbers = self._numbers.get(col)
+        if numbers is None:
+            numbers = self._numbers[col] = [None if v is None or v != v else float(v)
+                                            for v in self.values(col)]
+        return numbers
+
+    def order(self, col):
+        """(row numbers of non-NULL values in ascending order, row numbers of NULLs)."""
+        order = self._orders.get(col)
+        if order is None:
+            values = self.values(col)
+            nulls = [i for i, v in enumerate(values) if v is None or v != v]
+            if nulls:
+                present = [i for i, v in enumerate(values) if not (v is None or v != v)]
+            else:
+                present = list(range(len(values)))
+            try:
+                present.sort(key=values.__getitem__)
+            except TypeError:
+                # Mixed types in one column: fall back to the display form
+                present.sort(key=self.texts(col).__getitem__)
+            order = self._orders[col] = (array("q", present), array("q", nulls))
+        return order
+
+
+def _select(pool, keys, test):
+    return [i for i in pool if keys[i] is not None and test(keys[i])]
+
+
+def matching_indices(conditions, cache, column_count, candidates=None):
+    """Row numbers satisfying all conditions, using the keys held in a ColumnCache."""
+    indices = candidates
+    for column, op, operand in conditions:
+        if column is None:
+            indices = _search_indices(operand.lower(), cache, column_count, indices)
+            continue
+        values = cache.values(column)
+        pool = range(len(values)) if indices is None else indices
+        if op in ("is null", "is not null"):
+            texts = cache.texts(column)
+            want_null = op == "is null"
+            indices = [i for i in pool if (texts[i] is None) == want_null]
+        elif op == "~":
+            needle = operand.lower()
+            lowered = cache.lowered(column)
+            indices = [i for i in pool if needle in lowered[i]]
+        elif cache.kind(column) == "number":
+            try:
+                number = float(operand)
+            except ValueError:
+                raise ValueError(f"'{operand}' is not a number")
+            compare = _OPERATORS[op]
+            indices = _select(pool, cache.numbers(column), lambda value: compare(value, number))
+        else:
+            compare = _OPERATORS[op]
+            moment = _temporal_operand(values, operand) if cache.kind(column) == "temporal" else None
+            if moment is not None:
+                indices = _select(pool, values, lambda value: compare(value, moment))
+            else:
+                # Text compares by display form (as do dates the operand doesn't parse as)
+                indices = _select(pool, cache.texts(column), lambda value: compare(value, operand))
+    return indices
+
+
+def _search_indices(needle, cache, column_count, candidates):
+    looks_numeric = bool(needle) and all(ch in "0123456789.-+e" for ch in needle)
+    looks_temporal = bool(needle) and all(ch in "0123456789-:.+ t" for ch in needle)
+    matched = None
+    for col in range(column_count):
+        lowered_values = None
+        kind = cache.kind(col)
+        if (kind == "text" or (kind == "number" and looks_numeric)
+                or (kind == "temporal" and looks_temporal)):
+            lowered_values = cache.lowered(col)
+        if matched is None:
+            matched = bytearray(len(cache.values(col)))
+        if lowered_values is None:
+            continue
+        if candidates is None:
+            hits = [i for i, text in enumerate(lowered_values) if needle in text]
+        else:
+            hits = [i for i in candidates if needle in lowered_values[i]]
+        for i in hits:
+            matched[i] = 1
+    if matched is None:
+        return []
+    pool = range(len(matched)) if candidates is None else candidates
+    return [i for i in pool if matched[i]]
+
+
+def sorted_indices(cache, col, descending=False, candidates=None):
+    """Argsort of one column by native value; NULLs always go last."""
+    present, nulls = cache.order(col)
+    if descending:
+        present = present[::-1]
+    if candidates is None:
+        return present + nulls
+    keep = bytearray(len(cache.values(col)))
+    for i in candidates:
+        keep[i] = 1
+    return array("q", [i for i in present if keep[i]] + [i for i in nulls if keep[i]])
+
+
+def spill_query(conditions, column_types, column_count, sort_column=None, descending=False):
+    """Translates conditions and sort into SQL over a result_store.SpillStore table."""
+
+    def ref(col):
+        # Decimals are spilled as text; compare and order them numerically
+        if column_types[col] is Decimal:
+            return f"CAST(c{col} AS REAL)"
+        return f"c{col}"
+
+    clauses = []
+    params = []
+    for column, op, operand in conditions:
+        if column is None:
+            clauses.append("(" + " OR ".join(
+                f"instr(lower(CAST(c{col} AS TEXT)), ?) > 0" for col in range(column_count)) + ")")
+            params.extend([operand.lower()] * column_count)
+        elif op in ("is null", "is not null"):
+            clauses.append(f"c{column} {op.upper()}")
+        elif op == "~":
+            clauses.append(f"instr(lower(CAST(c{column} AS TEXT)), ?) > 0")
+            params.append(operand.lower())
+        else:
+            is_number = column_types[column] in _NUMERIC_TYPES and column_types[column] is not bool
+            if is_number:
+                try:
+                    operand = float(operand)
+                except ValueError:
+                    raise ValueError(f"'{operand}' is not a number")
+            clauses.append(f"{ref(column)} {'!=' if op == '<>' else op} ?")
+            params.append(operand)
+    sql = "SELECT rowid - 1 FROM r"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if sort_column is not None:
+        sql += f" ORDER BY c{sort_column} IS NULL, {ref(sort_column)} {'DESC' if descending else 'ASC'}"
+    else:
+        sql += " ORDER BY rowid"
+    return sql, params
@@ -0,0 +1,297 @@
+# result_model.py
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from change_set import ChangeSet, coerce
+from result_decoder import format_cell, DecodedResult, LargeValue
+from result_store import RowStore, estimate_rows_bytes
+from result_filter import ColumnCache, parse_filter, matching_indices, sorted_indices, spill_query
+
+
+# Backgrounds for pending changes while a result is being edited
+EDITED_COLOR = QColor("#fff3bf")
+INSERTED_COLOR = QColor("#d3f9d8")
+DELETED_COLOR = QColor("#ffc9c9")
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Table model over fetched rows. Cells are formatted only when the view asks for them.
+
+    Sorting and filtering build `_view`, a list of source row numbers, over the
+    native values; the rows themselves are never copied or reordered.
+    """
+
+    def __init__(self, columns, rows, parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._rows = rows
+        self._view = None
+        self._sort = None        # (column, descending)
+        self._conditions = []
+        self._cache = ColumnCache(self._column_values)  # Sort and filter keys; cleared when rows change
+        self.origin = None      # (conn_data, query) of a query result, which may be edited in place
+        self.change_set = None  # change_set.ChangeSet while editing; inserted rows follow the fetched ones
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        count = len(self._view) if self._view is not None else len(self._rows)
+        return count + len(self.change_set.inserted) if self.change_set is not None else count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def _source_row(self, row):
+        return self._view[row] if self._view is not None else row
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.change_set is not None:
+            return self._edit_data(index, role)
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = self._source_row(index.row())
+        if isinstance(self._rows, DecodedResult):
+            return self._rows.cell(row, index.column())
+        return format_cell(self._rows[row][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._columns[section] if section < len(self._columns) else None
+        if self._inserted_row(section) is not None:
+            return "*"
+        return self._source_row(section) + 1
+
+    def original_value(self, source_row, col):
+        """The fetched value of a cell, by source row number."""
+        if isinstance(self._rows, DecodedResult):
+            return self._rows.raw_value(source_row, col)
+        return self._rows[source_row][col]
+
+    def raw_value(self, row, col):
+        """The unformatted value behind a cell, for the cell viewer."""
+        if self.change_set is not None:
+            return self._current_value(row, col)
+        return self.original_value(self._source_row(row), col)
+
+    # --- In-place editing (see change_set.py) ---
+    def _inserted_row(self, row):
+        """The values dict of an inserted row shown at `row`, or None for fetched rows."""
+        if self.change_set is None:
+            return None
+        offset = row - (len(self._view) if self._view is not None else len(self._rows))
+        return self.change_set.inserted[offset] if offset >= 0 else None
+
+    def _current_value(self, row, col):
+        inserted = self._inserted_row(row)
+        if inserted is not None:
+            return inserted.get(col)
+        source_row = self._source_row(row)
+        edits = self.change_set.updates.get(source_row)
+        if edits and col in edits:
+            return edits[col]
+        return self.original_value(source_row, col)
+
+    def _edit_data(self, index, role):
+        row, col = index.row(), index.column()
+        inserted = self._inserted_row(row)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if inserted is not None:
+                return INSERTED_COLOR
+            source_row = self._source_row(row)
+            if source_row in self.change_set.deleted:
+                return DELETED_COLOR
+            return EDITED_COLOR if col in self.change_set.updates.get(source_row, ()) else None
+        if role == Qt.ItemDataRole.EditRole:
+            value = self._current_value(row, col)
+            return "NULL" if value is None else format_cell(value)
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if inserted is not None and col not in inserted:
+            return None  # Left to the column default
+        return format_cell(self._current_value(row, col))
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if self.change_set is None or index.column() not in self.change_set.target.editable:
+            return flags
+        if self._inserted_row(index.row()) is None:
+            source_row = self._source_row(index.row())
+            if source_row in self.change_set.deleted:
+                return flags
+            if isinstance(self.original_value(source_row, index.column()), LargeValue):
+                return flags  # Only a preview of the value was fetched
+        return flags | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not (self.flags(index) & Qt.ItemFlag.ItemIsEditable):
+            return False
+        row, col = index.row(), index.column()
+        inserted = self._inserted_row(row)
+        if inserted is not None:
+            if value.strip():
+                inserted[col] = coerce(value, None)
+            else:
+                inserted.pop(col, None)
+        else:
+            source_row = self._source_row(row)
+            original = self.original_value(source_row, col)
+            self.change_set.set_value(source_row, col, coerce(value, original), original)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def start_editing(self, target):
+        self.beginResetModel()
+        self._cache.invalidate()
+        self.change_set = ChangeSet(target)
+        self.endResetModel()
+
+    def stop_editing(self):
+        """Leaves edit mode, dropping any pending changes."""
+        self.beginResetModel()
+        self._cache.invalidate()
+        self.change_set = None
+        self.endResetModel()
+
+    def has_pending_changes(self):
+        return self.change_set is not None and not self.change_set.is_empty()
+
+    def insert_row(self):
+        """Appends an empty row to insert; returns its view row."""
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.change_set.inserted.append({})
+        self.endInsertRows()
+        return row
+
+    def delete_rows(self, rows):
+        """Marks fetched rows for deletion (again to unmark); inserted rows are just removed."""
+        for row in sorted(set(rows), reverse=True):
+            inserted = self._inserted_row(row)
+            if inserted is not None:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.change_set.inserted.remove(inserted)
+                self.endRemoveRows()
+                continue
+            source_row = self._source_row(row)
+            if source_row in self.change_set.deleted:
+                self.change_set.deleted.discard(source_row)
+            else:
+                self.change_set.deleted.add(source_row)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._columns) - 1))
+
+    # --- Sort and filter ---
+    def source_row_count(self):
+        return len(self._rows)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0 or column >= len(self._columns):
+            if self._sort is None:
+                return
+            self._sort = None
+        else:
+            self._sort = (column, order == Qt.SortOrder.DescendingOrder)
+        self.layoutAboutToBeChanged.emit()
+        self._rebuild_view()
+        self.layoutChanged.emit()
+
+    def set_filter(self, text):
+        """Applies a filter expression (see result_filter.parse_filter); raises ValueError if invalid."""
+        conditions = parse_filter(text, self._columns)
+        previous = self._conditions
+        self.beginResetModel()
+        self._conditions = conditions
+        try:
+            self._rebuild_view()
+        except ValueError:
+            self._conditions = previous
+            self._rebuild_view()
+            raise
+        finally:
+            self.endResetModel()
+
+    def _column_values(self, col):
+        if isinstance(self._rows, DecodedResult):
+            return self._rows.column_values(col)
+        rows = self._rows.rows if isinstance(self._rows, RowStore) else self._rows
+        return [row[col] for row in rows]
+
+    def _rebuild_view(self):
+        if not self._sort and not self._conditions:
+            self._view = None
+            return
+        sort_column, descending = self._sort or (None, False)
+        if self.is_spilled():
+            # Spilled rows are sorted and filtered by the spill database itself
+            spill = self._rows.spill
+            sql, params = spill_query(
+                self._conditions, spill.column_types, len(self._columns), sort_column, descending)
+            self._view = spill.select_indices(sql, params)
+            return
+        candidates = None
+        if self._conditions:
+            candidates = matching_indices(self._conditions, self._cache, len(self._columns))
+        if sort_column is not None:
+            self._view = sorted_indices(self._cache, sort_column, descending, candidates)
+        else:
+            self._view = candidates
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        if self._view is not None:
+            self.beginResetModel()
+            self._rows.extend(rows)
+            self._cache.invalidate()
+            self._rebuild_view()
+            self.endResetModel()
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self._cache.invalidate()
+        self.endInsertRows()
+
+    def prepend_rows(self, rows):
+        if not rows:
+            return
+        if self._view is not None:
+            self.beginResetModel()
+            self._rows[:0] = rows
+            self._cache.invalidate()
+            self._rebuild_view()
+            self.endResetModel()
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+        self._rows[:0] = rows
+        self._cache.invalidate()
+        self.endInsertRows()
+
+    def column_stats(self):
+        if isinstance(self._rows, DecodedResult):
+            return self._rows.column_stats
+        return None
+
+    def is_spilled(self):
+        return isinstance(self._rows, RowStore) and self._rows.is_spilled
+
+    def resident_bytes(self):
+        """Approximate memory held by the rows (spilled rows count only their read cache)."""
+        view_bytes = len(self._view) * 8 if self._view is not None else 0
+        if isinstance(self._rows, RowStore):
+            return self._rows.resident_bytes + view_bytes
+        if isinstance(self._rows, DecodedResult):
+            return sum(chunk.shm.size for chunk in self._rows.chunks) + view_bytes
+        return estimate_rows_bytes(self._rows) + view_bytes
+
+    def release(self):
+        """Frees shared-memory buffers, budget reservations and spill files held by the model."""
+        if isinstance(self._rows, (DecodedResult, RowStore)):
+            self.beginResetModel()
+            self._rows.release()
+            self._cache.invalidate()
+            self._view = None
+            self.endResetModel()
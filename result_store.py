@@ -0,0 +1,202 @@
+# result_store.py
+# Memory-bounded storage for fetched result rows, spilling to a temp SQLite file.
+import atexit
+import os
+import sqlite3 as sqlite
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from decimal import Decimal
+
+DEFAULT_TAB_BUDGET_BYTES = 256 * 1024 * 1024
+DEFAULT_GLOBAL_BUDGET_BYTES = 1024 * 1024 * 1024
+FETCH_BATCH_ROWS = 5000
+SPILL_BLOCK_ROWS = 512
+SPILL_CACHE_BLOCKS = 64
+
+
+class MemoryBudget:
+    """Process-wide accounting of result rows held in memory."""
+
+    def __init__(self, limit_bytes=DEFAULT_GLOBAL_BUDGET_BYTES):
+        self.limit_bytes = limit_bytes
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, num_bytes):
+        with self._lock:
+            if self._used + num_bytes > self.limit_bytes:
+                return False
+            self._used += num_bytes
+            return True
+
+    def release(self, num_bytes):
+        with self._lock:
+            self._used = max(0, self._used - num_bytes)
+
+    @property
+    def used_bytes(self):
+        return self._used
+
+
+GLOBAL_BUDGET = MemoryBudget()
+# Spill files still on disk, removed at exit if their models were never released
+_live_spill_paths = set()
+
+
+@atexit.register
+def _remove_spill_files():
+    for path in list(_live_spill_paths):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def estimate_rows_bytes(rows):
+    """Approximate in-memory size of a batch of row tuples, from a small sample."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // 20)
+    sample = rows[::step]
+    sample_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row) for row in sample)
+    return int(sample_bytes / len(sample) * len(rows))
+
+
+def _to_sqlite(value):
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, Decimal):
+        return str(value)
+    # dates, times, UUIDs, arrays... are kept as their display string
+    return str(value)
+
+
+class SpillStore:
+    """Rows in a temporary SQLite file, read back in cached blocks by row number."""
+
+    def __init__(self, column_count):
+        self.column_count = column_count
+        fd, self.path = tempfile.mkstemp(prefix="sqlclient_spill_", suffix=".db")
+        os.close(fd)
+        _live_spill_paths.add(self.path)
+        self._conn = sqlite.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = OFF")
+        self._conn.execute("PRAGMA synchronous = OFF")
+        cols = ", ".join(f"c{i}" for i in range(column_count))
+        self._conn.execute(f"CREATE TABLE r ({cols})")
+        self._insert_sql = f"INSERT INTO r VALUES ({', '.join('?' * column_count)})"
+        self._length = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Python type of the first non-NULL value per column, for typed sorting later
+        self.column_types = [None] * column_count
+
+    def extend(self, rows):
+        for row in rows[:50]:
+            for i, value in enumerate(row):
+                if self.column_types[i] is None and value is not None:
+                    self.column_types[i] = type(value)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(self._insert_sql, ([_to_sqlite(v) for v in row] for row in rows))
+            self._conn.execute("COMMIT")
+            self._length += len(rows)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, row):
+        block = row // SPILL_BLOCK_ROWS
+        with self._lock:
+            rows = self._cache.get(block)
+            if rows is None:
+                start = block * SPILL_BLOCK_ROWS + 1  # rowids start at 1
+                rows = self._conn.execute(
+                    "SELECT * FROM r WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                    (start, start + SPILL_BLOCK_ROWS - 1)).fetchall()
+                self._cache[block] = rows
+                if len(self._cache) > SPILL_CACHE_BLOCKS:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(block)
+        return rows[row % SPILL_BLOCK_ROWS]
+
+    def select_indices(self, sql, params=()):
+        """Runs a query returning row numbers, collected into a compact array."""
+        with self._lock:
+            return array("q", (row[0] for row in self._conn.execute(sql, params)))
+
+    @property
+    def resident_bytes(self):
+        return sum(estimate_rows_bytes(rows) for rows in list(self._cache.values()))
+
+    def release(self):
+        with self._lock:
+            self._cache.clear()
+            self._conn.close()
+        _live_spill_paths.discard(self.path)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class RowStore:
+    """Result rows kept in memory until the tab or global budget is exceeded, then spilled."""
+
+    def __init__(self, column_count, tab_budget_bytes=DEFAULT_TAB_BUDGET_BYTES, budget=GLOBAL_BUDGET):
+        self.column_count = column_count
+        self.tab_budget_bytes = tab_budget_bytes
+        self.budget = budget
+        self._rows = []
+        self._reserved = 0
+        self.spill = None
+
+    @property
+    def is_spilled(self):
+        return self.spill is not None
+
+    @property
+    def rows(self):
+        """The in-memory row list, or None once spilled."""
+        return None if self.spill else self._rows
+
+    def extend(self, rows):
+        if self.spill:
+            self.spill.extend(rows)
+            return
+        num_bytes = estimate_rows_bytes(rows)
+        if self._reserved + num_bytes <= self.tab_budget_bytes and self.budget.try_reserve(num_bytes):
+            self._rows.extend(rows)
+            self._reserved += num_bytes
+            return
+        # Over budget: move everything fetched so far to disk and keep streaming there
+        self.spill = SpillStore(self.column_count)
+        self.spill.extend(self._rows)
+        self.spill.extend(rows)
+        self._rows = []
+        self.budget.release(self._reserved)
+        self._reserved = 0
+
+    def __len__(self):
+        return len(self.spill) if self.spill else len(self._rows)
+
+    def __getitem__(self, row):
+        return self.spill[row] if self.spill else self._rows[row]
+
+    @property
+    def resident_bytes(self):
+        return self.spill.resident_bytes if self.spill else self._reserved
+
+    def release(self):
+        if self.spill:
+            self.spill.release()
+            self.spill = None
+        self._rows = []
+        self.budget.release(self._reserved)
+        self._reserved = 0
@@ -0,0 +1,426 @@
+# schema_diff.py
+# Compares the schemas of two connections: each catalog is read with a handful of
+# bulk queries, diffed in memory, and turned into a migration script for the target.
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+from table_browser import quote_ident
+
+Column = namedtuple("Column", "type not_null default")
+
+OBJECT_ORDER = ("table", "column", "constraint", "index")
+CONSTRAINT_TYPES = {"p": "primary key", "u": "unique", "f": "foreign key", "c": "check", "x": "exclusion"}
+
+
+class Catalog:
+    """Tables, columns, indexes and constraints of one connection, keyed for diffing."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.tables = {}       # (schema, table) -> {column name: Column}, in column order
+        self.indexes = {}      # (schema, index) -> (table, definition)
+        self.constraints = {}  # (schema, table, constraint) -> (type letter, definition)
+
+    @property
+    def object_count(self):
+        return (len(self.tables) + sum(len(c) for c in self.tables.values())
+                + len(self.indexes) + len(self.constraints))
+
+    def in_schema(self, schema, as_schema=None):
+        """A copy holding only `schema`'s objects, keyed under `as_schema` if given."""
+        copy = Catalog(self.kind)
+        name = as_schema or schema
+        copy.tables = {(name, table): columns for (s, table), columns in self.tables.items() if s == schema}
+        copy.indexes = {(name, index): value for (s, index), value in self.indexes.items() if s == schema}
+        copy.constraints = {(name,) + key[1:]: value for key, value in self.constraints.items()
+                            if key[0] == schema}
+        return copy
+
+
+# --- Catalog loading ---
+def _schema_filter(schemas, alias="n"):
+    if schemas:
+        return f"{alias}.nspname = ANY(%(schemas)s)"
+    return (f"{alias}.nspname NOT IN ('pg_catalog', 'information_schema') "
+            f"AND {alias}.nspname NOT LIKE 'pg\\_%%'")
+
+
+def _load_postgres(conn, schemas):
+    catalog = Catalog("postgres")
+    params = {"schemas": list(schemas or [])}
+    where = _schema_filter(schemas)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT n.nspname, c.relname
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND {where}
+    """, params)
+    for schema, table in cursor.fetchall():
+        catalog.tables[(schema, table)] = {}
+    cursor.execute(f"""
+        SELECT n.nspname, c.relname, a.attname, format_type(a.atttypid, a.atttypmod),
+               a.attnotnull, pg_get_expr(d.adbin, d.adrelid)
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped AND {where}
+        ORDER BY n.nspname, c.relname, a.attnum
+    """, params)
+    for schema, table, column, col_type, not_null, default in cursor.fetchall():
+        catalog.tables[(schema, table)][column] = Column(col_type, not_null, default)
+    # Indexes that back a constraint are created with it, so only the others are listed
+    cursor.execute(f"""
+        SELECT n.nspname, t.relname, i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = i.relnamespace
+        WHERE t.relkind IN ('r', 'p') AND {where}
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k
+                          WHERE k.conindid = x.indexrelid AND k.contype IN ('p', 'u', 'x'))
+    """, params)
+    for schema, table, index, definition in cursor.fetchall():
+        catalog.indexes[(schema, index)] = (table, definition)
+    cursor.execute(f"""
+        SELECT n.nspname, t.relname, k.conname, k.contype, pg_get_constraintdef(k.oid)
+        FROM pg_constraint k
+        JOIN pg_class t ON t.oid = k.conrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE k.contype IN ('p', 'u', 'f', 'c', 'x') AND t.relkind IN ('r', 'p') AND {where}
+    """, params)
+    for schema, table, name, con_type, definition in cursor.fetchall():
+        catalog.constraints[(schema, table, name)] = (con_type, definition)
+    return catalog
+
+
+def _load_sqlite(conn):
+    """SQLite keeps constraints in the CREATE TABLE text; the primary and foreign keys are read back
+    through the pragma table functions, all tables in one query each."""
+    catalog = Catalog("sqlite")
+    user_tables = "m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+    keys = {}
+    for table, column, col_type, not_null, default, pk in conn.execute(f"""
+            SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE {user_tables} ORDER BY m.name, p.cid"""):
+        catalog.tables.setdefault(("main", table), {})[column] = Column(col_type or "", bool(not_null), default)
+        if pk:
+            keys.setdefault(table, []).append((pk, column))
+    for table, columns in keys.items():
+        column_list = ", ".join(quote_ident(c) for _, c in sorted(columns))
+        catalog.constraints[("main", table, "PRIMARY KEY")] = ("p", f"PRIMARY KEY ({column_list})")
+    foreign = {}
+    for table, fk_id, ref_table, src, dst, on_update, on_delete in conn.execute(f"""
+            SELECT m.name, f.id, f."table", f."from", f."to", f.on_update, f.on_delete
+            FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+            WHERE {user_tables} ORDER BY m.name, f.id, f.seq"""):
+        entry = foreign.setdefault((table, fk_id), [ref_table, [], [], on_update, on_delete])
+        entry[1].append(src)
+        entry[2].append(dst)
+    for (table, _), (ref_table, src, dst, on_update, on_delete) in foreign.items():
+        definition = (f"FOREIGN KEY ({', '.join(quote_ident(c) for c in src)}) REFERENCES "
+                      f"{quote_ident(ref_table)}")
+        if any(dst):
+            definition += f" ({', '.join(quote_ident(c) for c in dst)})"
+        for action, rule in (("UPDATE", on_update), ("DELETE", on_delete)):
+            if rule and rule != "NO ACTION":
+                definition += f" ON {action} {rule}"
+        # SQLite foreign keys are usually unnamed; the columns identify them
+        catalog.constraints[("main", table, f"FOREIGN KEY ({', '.join(src)})")] = ("f", definition)
+    for index, table, definition in conn.execute(
+            "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"):
+        catalog.indexes[("main", index)] = (table, definition)
+    return catalog
+
+
+def load_catalog(conn_data, schemas=None):
+    conn = open_connection(conn_data)
+    try:
+        if conn_data.get("db_path"):
+            return _load_sqlite(conn)
+        return _load_postgres(conn, schemas)
+    finally:
+        conn.close()
+
+
+# --- Diff ---
+def _column_changes(old, new):
+    """Human-readable differences between two Column tuples."""
+    changes = []
+    if old.type != new.type:
+        changes.append(f"type {old.type} -> {new.type}")
+    if old.not_null != new.not_null:
+        changes.append("NOT NULL added" if new.not_null else "NOT NULL dropped")
+    if old.default != new.default:
+        changes.append(f"default {old.default or 'none'} -> {new.default or 'none'}")
+    return changes
+
+
+def align_catalogs(source, target, schemas=None):
+    """Keys a PostgreSQL catalog and a SQLite one ("main") under the same schema, so that
+    the same table on both sides compares as one table rather than one dropped and one added."""
+    if source.kind == target.kind:
+        return source, target
+    if schemas and len(schemas) > 1:
+        raise ValueError("Comparing PostgreSQL with SQLite needs a single schema (or none for public).")
+    schema = schemas[0] if schemas else "public"
+    pair = []
+    for catalog in (source, target):
+        if catalog.kind == "sqlite":
+            pair.append(catalog.in_schema("main", schema))
+        else:
+            pair.append(catalog.in_schema(schema))
+    return tuple(pair)
+
+
+def diff_catalogs(source, target):
+    """Differences that would make target look like source, as (change, object, name, detail) rows
+    plus the structured lists the script generator needs."""
+    rows = []
+    plan = {"create_tables": [], "drop_tables": [], "columns": [], "add_constraints": [],
+            "drop_constraints": [], "create_indexes": [], "drop_indexes": []}
+
+    def name_of(schema, *parts):
+        return ".".join((schema,) + parts) if source.kind == "postgres" else ".".join(parts)
+
+    new_tables = source.tables.keys() - target.tables.keys()
+    gone_tables = target.tables.keys() - source.tables.keys()
+    for key in sorted(new_tables):
+        rows.append(("added", "table", name_of(*key), f"{len(source.tables[key])} column(s)"))
+        plan["create_tables"].append((key, source.tables[key]))
+    for key in sorted(gone_tables):
+        rows.append(("removed", "table", name_of(*key), f"{len(target.tables[key])} column(s)"))
+        plan["drop_tables"].append(key)
+
+    for key in sorted(source.tables.keys() & target.tables.keys()):
+        old_columns, new_columns = target.tables[key], source.tables[key]
+        for column, definition in new_columns.items():
+            old = old_columns.get(column)
+            if old is None:
+                rows.append(("added", "column", name_of(*key, column), definition.type))
+                plan["columns"].append(("add", key, column, None, definition))
+            else:
+                changes = _column_changes(old, definition)
+                if changes:
+                    rows.append(("changed", "column", name_of(*key, column), "; ".join(changes)))
+                    plan["columns"].append(("alter", key, column, old, definition))
+        for column, old in old_columns.items():
+            if column not in new_columns:
+                rows.append(("removed", "column", name_of(*key, column), old.type))
+                plan["columns"].append(("drop", key, column, old, None))
+
+    for key, (con_type, definition) in sorted(source.constraints.items()):
+        old = target.constraints.get(key)
+        label = CONSTRAINT_TYPES.get(con_type, con_type)
+        if old is None:
+            rows.append(("added", "constraint", name_of(*key), f"{label}: {definition}"))
+            plan["add_constraints"].append((key, con_type, definition))
+        elif old[1] != definition:
+            rows.append(("changed", "constraint", name_of(*key), f"{old[1]} -> {definition}"))
+            plan["drop_constraints"].append((key, old[0]))
+            plan["add_constraints"].append((key, con_type, definition))
+    for key, (con_type, definition) in sorted(target.constraints.items()):
+        # Constraints of dropped tables go with the table
+        if key not in source.constraints and key[:2] not in gone_tables:
+            rows.append(("removed", "constraint", name_of(*key),
+                         f"{CONSTRAINT_TYPES.get(con_type, con_type)}: {definition}"))
+            plan["drop_constraints"].append((key, con_type))
+
+    for key, (table, definition) in sorted(source.indexes.items()):
+        old = target.indexes.get(key)
+        if old is None:
+            rows.append(("added", "index", name_of(*key), definition))
+            plan["create_indexes"].append((key, definition))
+        elif old[1] != definition:
+            rows.append(("changed", "index", name_of(*key), f"{old[1]} -> {definition}"))
+            plan["drop_indexes"].append(key)
+            plan["create_indexes"].append((key, definition))
+    for key, (table, definition) in sorted(target.indexes.items()):
+        if key not in source.indexes and (key[0], table) not in gone_tables:
+            rows.append(("removed", "index", name_of(*key), definition))
+            plan["drop_indexes"].append(key)
+
+    rows.sort(key=lambda row: (OBJECT_ORDER.index(row[1]), row[2], row[0]))
+    return rows, plan
+
+
+# --- Migration script ---
+def _table_name(kind, key):
+    schema, table = key
+    return f"{quote_ident(schema)}.{quote_ident(table)}" if kind == "postgres" else quote_ident(table)
+
+
+def _column_definition(name, column):
+    text = f"{quote_ident(name)} {column.type}".rstrip()
+    if column.default is not None:
+        text += f" DEFAULT {column.default}"
+    if column.not_null:
+        text += " NOT NULL"
+    return text
+
+
+def migration_script(plan, kind, source_kind):
+    """SQL that migrates the target, in dependency order: drops of dependents first,
+    then new tables, column changes, constraints (foreign keys last) and indexes."""
+    lines = []
+
+    def section(title, statements):
+        if statements:
+            lines.append(f"-- {title}")
+            lines.extend(statements)
+            lines.append("")
+
+    if kind != source_kind:
+        lines.extend([f"-- Source is {source_kind}, target is {kind}: copied types and definitions "
+                      f"may need adjusting.", ""])
+    new_tables = {key for key, _ in plan["create_tables"]}
+    sqlite_inline = {}  # SQLite can't add constraints later, so new tables get theirs inline
+    if kind == "sqlite":
+        for (schema, table, _), _, definition in plan["add_constraints"]:
+            if (schema, table) in new_tables:
+                sqlite_inline.setdefault((schema, table), []).append(definition)
+
+    drops = sorted(plan["drop_constraints"], key=lambda item: item[1] != "f")  # Foreign keys first
+    if kind == "postgres":
+        section("Dropped and changed constraints", [
+            f"ALTER TABLE {_table_name(kind, key[:2])} DROP CONSTRAINT {quote_ident(key[2])};"
+            for key, _ in drops])
+    else:
+        section("Dropped and changed constraints", [
+            f"-- {key[1]}: {key[2]} can't be dropped in SQLite without rebuilding the table"
+            for key, _ in drops])
+    section("Dropped and changed indexes", [
+        f"DROP INDEX {_table_name(kind, key)};" for key in plan["drop_indexes"]])
+
+    creates = []
+    for key, columns in plan["create_tables"]:
+        definitions = [_column_definition(name, column) for name, column in columns.items()]
+        definitions.extend(sqlite_inline.get(key, []))
+        creates.append(f"CREATE TABLE {_table_name(kind, key)} (\n    " + ",\n    ".join(definitions) + "\n);")
+    section("New tables", creates)
+
+    alters = []
+    for action, key, column, old, new in plan["columns"]:
+        table = _table_name(kind, key)
+        if action == "add":
+            alters.append(f"ALTER TABLE {table} ADD COLUMN {_column_definition(column, new)};")
+        elif action == "drop":
+            alters.append(f"ALTER TABLE {table} DROP COLUMN {quote_ident(column)};")
+        elif kind == "sqlite":
+            alters.append(f"-- {key[1]}.{column}: {'; '.join(_column_changes(old, new))} "
+                          f"(SQLite can't alter a column; rebuild the table)")
+        else:
+            prefix = f"ALTER TABLE {table} ALTER COLUMN {quote_ident(column)}"
+            if old.type != new.type:
+                alters.append(f"{prefix} TYPE {new.type} USING {quote_ident(column)}::{new.type};")
+            if old.default != new.default:
+                alters.append(f"{prefix} SET DEFAULT {new.default};" if new.default is not None
+                              else f"{prefix} DROP DEFAULT;")
+            if old.not_null != new.not_null:
+                alters.append(f"{prefix} {'SET' if new.not_null else 'DROP'} NOT NULL;")
+    section("Column changes", alters)
+
+    adds = sorted(plan["add_constraints"], key=lambda item: item[1] == "f")  # Foreign keys last
+    if kind == "postgres":
+        section("New and changed constraints", [
+            f"ALTER TABLE {_table_name(kind, key[:2])} ADD CONSTRAINT {quote_ident(key[2])} {definition};"
+            for key, _, definition in adds])
+    else:
+        section("New and changed constraints", [
+            f"-- {key[1]}: {definition} needs a table rebuild in SQLite"
+            for key, _, definition in adds if key[:2] not in new_tables])
+    section("New and changed indexes", [
+        definition.rstrip(";") + ";" for _, definition in plan["create_indexes"]])
+    section("Dropped tables (destructive: review before running)", [
+        f"DROP TABLE {_table_name(kind, key)};" for key in plan["drop_tables"]])
+    if not lines:
+        return "-- The schemas match; nothing to migrate.\n"
+    return "\n".join(lines)
+
+
+class SchemaDiff:
+    """Loads both catalogs at once (one connection each), then diffs them in memory."""
+
+    def __init__(self, source, target, schemas=None, is_cancelled=None, progress=None):
+        self.source = source  # conn_data whose schema is wanted
+        self.target = target  # conn_data the migration script is for
+        self.schemas = schemas
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.progress = progress or (lambda text: None)
+
+    def run(self):
+        start = time.perf_counter()
+        self.progress("Reading both catalogs...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            source_future = executor.submit(load_catalog, self.source, self.schemas)
+            target_future = executor.submit(load_catalog, self.target, self.schemas)
+            source, target = source_future.result(), target_future.result()
+        load_time = time.perf_counter() - start
+        if self.is_cancelled():
+            return None
+        self.progress("Comparing...")
+        source, target = align_catalogs(source, target, self.schemas)
+        rows, plan = diff_catalogs(source, target)
+        counts = {}
+        for change, _, _, _ in rows:
+            counts[change] = counts.get(change, 0) + 1
+        return {
+            "source": self.source.get("name", ""), "target": self.target.get("name", ""),
+            "target_id": self.target.get("id"),
+            "rows": rows, "counts": counts,
+            "objects": (source.object_count, target.object_count),
+            "script": migration_script(plan, target.kind, source.kind),
+            "load_time": load_time, "diff_time": time.perf_counter() - start - load_time,
+        }
+
+
+COLUMNS = ["Change", "Object", "Name", "Detail"]
+
+
+def format_summary(diff, elapsed):
+    counts = ", ".join(f"{count:,} {change}" for change, count in sorted(diff["counts"].items()))
+    return "\n".join([
+        f"Schema diff: {diff['source']} (source) -> {diff['target']} (target) | Time: {elapsed:.2f} sec",
+        "",
+        f"Objects: {diff['objects'][0]:,} in source, {diff['objects'][1]:,} in target",
+        f"Differences: {counts or 'none'}",
+        f"Catalog reads: {diff['load_time']:.2f} sec, diff and script: {diff['diff_time']:.2f} sec",
+        "",
+        "The migration script for the target is in the query editor. Review it before running.",
+    ])
+
+
+# --- Signals class for schema diffs ---
+class SchemaDiffSignals(QObject):
+    finished = pyqtSignal(object, float)
+    progress = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+
+class RunnableSchemaDiff(QRunnable):
+    def __init__(self, source, target, schemas, signals):
+        super().__init__()
+        self.source = source
+        self.target = target
+        self.schemas = schemas
+        self.signals = signals
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            start_time = time.time()
+            diff = SchemaDiff(self.source, self.target, self.schemas,
+                              is_cancelled=lambda: self._is_cancelled,
+                              progress=self.signals.progress.emit).run()
+            if diff is not None and not self._is_cancelled:
+                self.signals.finished.emit(diff, time.time() - start_time)
+        except Exception as e:
+            if not self._is_cancelled:
+                self.signals.error.emit(str(e))
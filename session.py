@@ -0,0 +1,129 @@
+# session.py
+# A worksheet's persistent connection: kept open between runs, with explicit transactions.
+import sqlite3 as sqlite
+import threading
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+
+# Warn when a transaction has been left open with nothing running for this long
+IDLE_IN_TRANSACTION_WARN_SEC = 60
+
+STATE_IDLE = "idle"
+STATE_IN_TRANSACTION = "in transaction"
+STATE_FAILED = "failed transaction"
+
+# psycopg2.extensions.TRANSACTION_STATUS_INTRANS / _INERROR
+_PG_INTRANS = 2
+_PG_INERROR = 3
+
+
+class WorksheetSession:
+    """One connection per worksheet, in autocommit mode unless a transaction was begun.
+
+    Statements run one at a time under `lock`; temp tables and SET values persist
+    until the session is closed.
+    """
+
+    def __init__(self, conn_data):
+        self.conn_data = conn_data
+        self.lock = threading.Lock()
+        self.conn = None
+        self.busy = False
+        self.last_activity = time.time()
+        self.transaction_started = None
+        self.warned = False
+
+    @property
+    def is_sqlite(self):
+        return bool(self.conn_data.get("db_path"))
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = open_connection(self.conn_data, thread_shared=True)
+            if self.is_sqlite:
+                self.conn.isolation_level = None  # BEGIN/COMMIT are issued explicitly
+            else:
+                self.conn.autocommit = True
+        return self.conn
+
+    @property
+    def state(self):
+        if self.conn is None:
+            return STATE_IDLE
+        if self.is_sqlite:
+            in_transaction = self.conn.in_transaction
+            failed = False
+        else:
+            status = self.conn.get_transaction_status()
+            in_transaction = status in (_PG_INTRANS, _PG_INERROR)
+            failed = status == _PG_INERROR
+        if failed:
+            return STATE_FAILED
+        return STATE_IN_TRANSACTION if in_transaction else STATE_IDLE
+
+    def touch(self):
+        """Records activity and the start of a transaction, after each statement."""
+        self.last_activity = time.time()
+        if self.conn is not None and not self.is_sqlite and self.conn.closed:
+            # Server went away; the next statement reconnects
+            self.conn = None
+        if self.state == STATE_IDLE:
+            self.transaction_started = None
+            self.warned = False
+        elif self.transaction_started is None:
+            self.transaction_started = self.last_activity
+
+    def idle_in_transaction_for(self):
+        """Seconds spent idle inside an open transaction, or 0."""
+        if self.busy or self.state == STATE_IDLE:
+            return 0
+        return time.time() - self.last_activity
+
+    def run_command(self, command):
+        """Runs BEGIN, COMMIT or ROLLBACK on the session connection."""
+        with self.lock:
+            conn = self.connect()
+            cursor = conn.cursor()
+            cursor.execute(command)
+            self.touch()
+
+    def cancel(self):
+        # Cancels the running statement but keeps the session (and its transaction) alive
+        if self.conn is None:
+            return
+        if isinstance(self.conn, sqlite.Connection):
+            self.conn.interrupt()
+        else:
+            self.conn.cancel()
+
+    def close(self):
+        """Closes the connection; an open transaction is rolled back by the server."""
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+
+# --- Signals class for session commands ---
+class SessionSignals(QObject):
+    done = pyqtSignal(str, str)   # command, resulting state
+    error = pyqtSignal(str)
+
+
+class RunnableSessionCommand(QRunnable):
+    def __init__(self, session, command, signals):
+        super().__init__()
+        self.session = session
+        self.command = command
+        self.signals = signals
+
+    def run(self):
+        try:
+            self.session.run_command(self.command)
+            self.signals.done.emit(self.command, self.session.state)
+        except Exception as e:
+            self.signals.error.emit(str(e))
@@ -0,0 +1,325 @@
+# sql_editor.py
+# The worksheet query editor: a plain-text document with incremental SQL highlighting
+# and a statement-boundary index kept per block, for "run statement under cursor".
+import re
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtGui import (QColor, QFont, QFontDatabase, QSyntaxHighlighter, QTextBlockUserData,
+                         QTextCharFormat, QTextCursor)
+from PyQt6.QtWidgets import QPlainTextEdit
+
+# Above this many lines, blocks far below the viewport are lexed in the background
+LARGE_DOCUMENT_BLOCKS = 20_000
+# Lines past the last visible one that are still lexed right away
+SYNC_MARGIN_BLOCKS = 200
+# Lines lexed per background step, roughly 10-30 ms of work between UI events
+BACKGROUND_CHUNK_BLOCKS = 1_000
+
+KEYWORDS = frozenset("""
+    ADD ALL ALTER AND ANY AS ASC BEGIN BETWEEN BY CASCADE CASE CHECK COLUMN COMMIT CONSTRAINT
+    COPY CREATE CROSS DEFAULT DELETE DESC DISTINCT DO DROP ELSE END EXCEPT EXISTS EXPLAIN FALSE
+    FOREIGN FROM FULL FUNCTION GRANT GROUP HAVING IF ILIKE IN INDEX INNER INSERT INTERSECT INTO IS
+    JOIN KEY LEFT LIKE LIMIT NOT NULL OFFSET ON OR ORDER OUTER PRIMARY REFERENCES RETURNING RETURNS
+    REVOKE RIGHT ROLLBACK SCHEMA SELECT SEQUENCE SET TABLE THEN TO TRANSACTION TRIGGER TRUE
+    TRUNCATE UNION UNIQUE UPDATE USING VALUES VIEW WHEN WHERE WITH
+""".split())
+
+# Lexical state carried from one line to the next (QTextBlock.userState)
+_NORMAL = 0
+_BLOCK_COMMENT = 1
+_STRING = 2
+_QUOTED_IDENT = 3
+_DOLLAR_BASE = 16  # + index into _dollar_tags, for $tag$ bodies
+
+_TOKEN = re.compile(r"""
+    (?P<comment>--.*)
+  | (?P<block>/\*)
+  | (?P<string>[EeBbXxNn]?')
+  | (?P<ident>")
+  | (?P<dollar>\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$)
+  | (?P<number>\b\d+(?:\.\d*)?(?:[eE][+-]?\d+)?\b)
+  | (?P<word>[A-Za-z_][A-Za-z_0-9$]*)
+  | (?P<semicolon>;)
+""", re.VERBOSE)
+_STRING_END = re.compile(r"(?:''|[^'])*'")
+_IDENT_END = re.compile(r'(?:""|[^"])*"')
+
+_dollar_tags = []  # Shared by every editor; a script uses only a handful of tags
+
+
+def _dollar_state(tag):
+    if tag not in _dollar_tags:
+        _dollar_tags.append(tag)
+    return _DOLLAR_BASE + _dollar_tags.index(tag)
+
+
+def _format(color, bold=False, italic=False):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    if bold:
+        fmt.setFontWeight(QFont.Weight.Bold)
+    fmt.setFontItalic(italic)
+    return fmt
+
+
+class BlockData(QTextBlockUserData):
+    """Offsets of the statement-ending semicolons in one line (not those in strings or comments)."""
+
+    def __init__(self, semicolons):
+        super().__init__()
+        self.semicolons = semicolons
+
+
+class SqlHighlighter(QSyntaxHighlighter):
+    """Highlights one line at a time from the state the previous line ended in.
+
+    QSyntaxHighlighter only calls highlightBlock for edited lines, carrying on while
+    a line's end state changes. On large documents that cascade (say, after typing
+    "/*") stops below the viewport and the rest is finished by a background timer.
+    """
+    # After each background step: the first line still to lex, or -1 once caught up
+    lexed = pyqtSignal(int)
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.formats = {
+            "keyword": _format("#0033b3", bold=True),
+            "string": _format("#067d17"),
+            "ident": _format("#871094"),
+            "number": _format("#1750eb"),
+            "comment": _format("#8c8c8c", italic=True),
+        }
+        self.visible_until = 0       # Last visible block number, kept up to date by the editor
+        self._stale_from = None      # QTextCursor at the first line left to lex, or None
+        self._stale_until = -1       # Block number of the last line left to lex
+        self._background_until = -1  # Lines before this may be lexed during a background step
+        self._lexed_through = -1
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._lex_stale)
+
+    def is_large(self):
+        return self.document().blockCount() > LARGE_DOCUMENT_BLOCKS
+
+    def highlightBlock(self, text):
+        number = self.currentBlock().blockNumber()
+        if (number >= self._background_until and number > self.visible_until + SYNC_MARGIN_BLOCKS
+                and self.is_large()):
+            self._mark_stale(self.currentBlock())
+            # Keeping the old state ends Qt's cascade here
+            self.setCurrentBlockState(self.currentBlockState())
+            return
+        self._lexed_through = number
+        state = self.previousBlockState()
+        semicolons = self._lex(text, state if state >= 0 else _NORMAL)
+        self.setCurrentBlockUserData(BlockData(semicolons))
+
+    def _lex(self, text, state):
+        """Formats the line, sets its end state and returns its top-level semicolon offsets."""
+        semicolons = []
+        pos = 0
+        length = len(text)
+        formats = self.formats
+        while pos < length:
+            if state == _BLOCK_COMMENT:
+                end = text.find("*/", pos)
+                stop = length if end < 0 else end + 2
+                self.setFormat(pos, stop - pos, formats["comment"])
+                if end < 0:
+                    break
+                state, pos = _NORMAL, stop
+            elif state in (_STRING, _QUOTED_IDENT):
+                match = (_STRING_END if state == _STRING else _IDENT_END).match(text, pos)
+                stop = match.end() if match else length
+                self.setFormat(pos, stop - pos, formats["string" if state == _STRING else "ident"])
+                if not match:
+                    break
+                state, pos = _NORMAL, stop
+            elif state >= _DOLLAR_BASE:
+                tag = _dollar_tags[state - _DOLLAR_BASE]
+                end = text.find(tag, pos)
+                stop = length if end < 0 else end + len(tag)
+                self.setFormat(pos, stop - pos, formats["string"])
+                if end < 0:
+                    break
+                state, pos = _NORMAL, stop
+            else:
+                match = _TOKEN.search(text, pos)
+                if match is None:
+                    break
+                kind = match.lastgroup
+                start, pos = match.span()
+                if kind == "comment":
+                    self.setFormat(start, pos - start, formats["comment"])
+                elif kind == "word":
+                    if match.group().upper() in KEYWORDS:
+                        self.setFormat(start, pos - start, formats["keyword"])
+                elif kind == "number":
+                    self.setFormat(start, pos - start, formats["number"])
+                elif kind == "semicolon":
+                    semicolons.append(start)
+                elif kind == "block":
+                    state, pos = _BLOCK_COMMENT, start
+                elif kind == "string":
+                    self.setFormat(start, pos - start, formats["string"])
+                    state = _STRING
+                elif kind == "ident":
+                    self.setFormat(start, pos - start, formats["ident"])
+                    state = _QUOTED_IDENT
+                else:
+                    self.setFormat(start, pos - start, formats["string"])
+                    state = _dollar_state(match.group())
+        self.setCurrentBlockState(state)
+        return semicolons
+
+    # --- Background lexing of large documents ---
+    def _mark_stale(self, block):
+        position = block.position()
+        if self._stale_from is None or position < self._stale_from.position():
+            # A cursor's position follows later edits, unlike a block number
+            self._stale_from = QTextCursor(self.document())
+            self._stale_from.setPosition(position)
+        self._stale_until = max(self._stale_until, block.blockNumber())
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _lex_stale(self):
+        """Lexes the next BACKGROUND_CHUNK_BLOCKS stale lines, and schedules itself again if needed."""
+        if self._stale_from is None:
+            return
+        block = self._stale_from.block()
+        until = self._stale_until
+        self._stale_from, self._stale_until = None, -1
+        self._background_until = block.blockNumber() + BACKGROUND_CHUNK_BLOCKS
+        try:
+            while block.isValid() and block.blockNumber() < self._background_until:
+                self._lexed_through = -1
+                self.rehighlightBlock(block)
+                # rehighlightBlock carries on by itself while end states change
+                block = self.document().findBlockByNumber(
+                    max(block.blockNumber(), self._lexed_through) + 1)
+        finally:
+            self._background_until = -1
+        if block.isValid() and block.blockNumber() <= until:
+            self._mark_stale(block)
+        self.lexed.emit(self._stale_from.block().blockNumber() if self._stale_from is not None else -1)
+
+    def stale_position(self):
+        """Where the lines still to lex start (their semicolons aren't known yet), or None."""
+        return self._stale_from.position() if self._stale_from is not None else None
+
+
+class SqlEditor(QPlainTextEdit):
+    """QPlainTextEdit lays out only the visible lines, so multi-megabyte scripts stay editable."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Wrapping would lay out every long line of a dump (e.g. multi-row INSERTs)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.highlighter = SqlHighlighter(self.document())
+        self.highlighter.lexed.connect(self._retry_statement_request)
+        self.verticalScrollBar().valueChanged.connect(self._update_visible_range)
+        self._statement_request = None  # (QTextCursor, callback) waiting for background lexing
+
+    def is_large(self):
+        return self.highlighter.is_large()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_visible_range()
+
+    def _update_visible_range(self):
+        # The vertical scroll bar of a QPlainTextEdit counts lines
+        line_height = max(1, self.fontMetrics().lineSpacing())
+        self.highlighter.visible_until = (self.verticalScrollBar().value()
+                                          + self.viewport().height() // line_height + 1)
+
+    def _semicolons(self, block, stale):
+        """The line's semicolon offsets, or None if it hasn't been lexed yet."""
+        if stale is not None and block.position() >= stale:
+            return None
+        data = block.userData()
+        return data.semicolons if isinstance(data, BlockData) else []
+
+    def statement_bounds(self, position):
+        """(start, end) of the statement around `position`; end includes its semicolon.
+
+        A cursor just after a semicolon belongs to the statement that semicolon ends.
+        Only the lines of that statement are looked at, however long the script is.
+        None if those lines are still waiting for background lexing; nothing is lexed here.
+        """
+        stale = self.highlighter.stale_position()
+        document = self.document()
+        block = document.findBlock(position)
+        offset = position - block.position()
+        end = None
+        current = block
+        while current.isValid() and end is None:
+            semicolons = self._semicolons(current, stale)
+            if semicolons is None:
+                return None
+            for semicolon in semicolons:
+                if current != block or semicolon >= offset - 1:
+                    end = current.position() + semicolon + 1
+                    break
+            current = current.next()
+        if end is None:
+            end = document.characterCount() - 1
+            limit = end
+        else:
+            limit = end - 1  # The statement's own semicolon
+        start = 0
+        current = document.findBlock(limit)
+        while current.isValid():
+            semicolons = self._semicolons(current, stale)
+            if semicolons is None:
+                return None
+            before = [current.position() + s + 1 for s in semicolons
+                      if current.position() + s < limit]
+            if before:
+                start = before[-1]
+                break
+            current = current.previous()
+        return start, end
+
+    def statement_at_cursor(self, cursor=None):
+        """The selected text, or else the statement under the cursor; None until it is lexed."""
+        cursor = QTextCursor(cursor if cursor is not None else self.textCursor())
+        if not cursor.hasSelection():
+            bounds = self.statement_bounds(cursor.position())
+            if bounds is None:
+                return None
+            cursor.setPosition(bounds[0])
+            cursor.setPosition(bounds[1], QTextCursor.MoveMode.KeepAnchor)
+        # selectedText() separates lines with U+2029
+        return cursor.selectedText().replace("\u2029", "\n").strip()
+
+    def request_statement(self, callback):
+        """Calls callback with statement_at_cursor() now if possible, else once background
+        lexing reaches it (for the cursor position at the time of the request).
+        Returns False if it has to wait; a newer request replaces a waiting one."""
+        statement = self.statement_at_cursor()
+        if statement is not None:
+            self._statement_request = None
+            callback(statement)
+            return True
+        # A cursor's position follows edits made while waiting
+        self._statement_request = (QTextCursor(self.textCursor()), callback)
+        return False
+
+    def _retry_statement_request(self):
+        if self._statement_request is None:
+            return
+        cursor, callback = self._statement_request
+        statement = self.statement_at_cursor(cursor)
+        if statement is not None:
+            self._statement_request = None
+            callback(statement)
+
+    def load_text(self, text):
+        """Replaces the script; highlighting below the first screen carries on in the background."""
+        self.highlighter.visible_until = 0
+        self.setPlainText(text)
+        self.moveCursor(QTextCursor.MoveOperation.Start)
+        self._update_visible_range()
@@ -0,0 +1,80 @@
+# sql_params.py
+# Named bind placeholders (:name or %(name)s) in editor SQL, converted per driver.
+import re
+
+_TOKEN_RE = re.compile(
+    r"""(?P<skip>'(?:[^']|'')*'          # string literal
+        |"(?:[^"]|"")*"                  # quoted identifier
+        |--[^\n]*                        # line comment
+        |/\*.*?\*/                       # block comment
+        |(?P<dollar>\$\w*\$).*?(?P=dollar)  # dollar-quoted body
+        |::                              # cast, never a placeholder
+        )
+      |(?P<pyformat>%\((?P<pyname>\w+)\)s)
+      |(?<![\w:]):(?P<colon>[A-Za-z_]\w*)
+      |(?P<percent>%)
+    """,
+    re.VERBOSE | re.DOTALL)
+
+
+def _scan(sql):
+    """Yields (match, name or None) for every placeholder and bare % outside literals."""
+    for match in _TOKEN_RE.finditer(sql):
+        if match.group("skip"):
+            continue
+        yield match, match.group("pyname") or match.group("colon")
+
+
+def find_placeholders(sql):
+    """Placeholder names in order of first appearance."""
+    names = []
+    for _, name in _scan(sql):
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def strip_literals(sql):
+    """The SQL with literals, quoted identifiers and comments blanked, for keyword and ; checks."""
+    return _TOKEN_RE.sub(lambda match: " " if match.group("skip") else match.group(0), sql)
+
+
+def _rewrite(sql, render):
+    parts = []
+    position = 0
+    for match, name in _scan(sql):
+        parts.append(sql[position:match.start()])
+        parts.append(render(match, name))
+        position = match.end()
+    parts.append(sql[position:])
+    return "".join(parts)
+
+
+def to_pyformat(sql):
+    """psycopg2 style: %(name)s, with literal % doubled since params are passed."""
+    return _rewrite(sql, lambda match, name: f"%({name})s" if name else "%%")
+
+
+def to_named(sql):
+    """sqlite3 style: :name."""
+    return _rewrite(sql, lambda match, name: f":{name}" if name else match.group(0))
+
+
+def to_positional(sql, names):
+    """PostgreSQL PREPARE style: $1..$n in the order of `names`."""
+    return _rewrite(sql, lambda match, name: f"${names.index(name) + 1}" if name else match.group(0))
+
+
+def parse_value(text):
+    """Types a value typed into the parameter panel: NULL, integers and decimals, else text."""
+    stripped = text.strip()
+    if stripped.upper() == "NULL":
+        return None
+    if re.fullmatch(r"[+-]?\d+", stripped):
+        return int(stripped)
+    if re.fullmatch(r"[+-]?(\d+\.\d*|\.\d+)([eE][+-]?\d+)?", stripped):
+        return float(stripped)
+    if len(stripped) >= 2 and stripped[0] == stripped[-1] == "'":
+        # Quoted in the panel to force text, e.g. '00123'
+        return stripped[1:-1]
+    return text
@@ -1,11 +1,14 @@
 # sqlite_connector.py
 import sqlite3 as sqlite
 import os
-from PyQt6.QtWidgets import QDialog, QFormLayout, QLineEdit, QHBoxLayout, QPushButton, QVBoxLayout, QMessageBox, QFileDialog
+from PyQt6.QtWidgets import (QDialog, QFormLayout, QLineEdit, QHBoxLayout, QPushButton, QVBoxLayout, QMessageBox,
+                             QFileDialog, QGroupBox, QCheckBox, QSpinBox, QComboBox)
 from PyQt6.QtGui import QIcon, QStandardItem
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QRunnable, QThreadPool
 
 from db_connections import DBConnector
+from formatting import format_count, format_size
+from sqlite_profile import BROWSING_PROFILE, TEMP_STORE_MODES, connect_sqlite, normalize
 
 class SQLiteConnectionDialog(QDialog):
     def __init__(self, parent=None, conn_data=None):
@@ -33,9 +36,12 @@ class SQLiteConnectionDialog(QDialog):
         path_layout.addWidget(self.create_btn)
         form.addRow("", path_layout)
 
+        profile_group = self._create_profile_group()
+
         if is_editing:
             self.name_input.setText(self.conn_data.get("name", ""))
             self.path_input.setText(self.conn_data.get("db_path", ""))
+        self.set_profile(normalize(self.conn_data.get("sqlite_profile") if self.conn_data else None))
 
         self.save_btn = QPushButton("Update" if is_editing else "Save")
         self.save_btn.clicked.connect(self.save_connection)
@@ -49,9 +55,64 @@ class SQLiteConnectionDialog(QDialog):
 
         layout = QVBoxLayout()
         layout.addLayout(form)
+        layout.addWidget(profile_group)
         layout.addLayout(button_layout)
         self.setLayout(layout)
 
+    def _create_profile_group(self):
+        group = QGroupBox("Performance")
+        self.read_only_check = QCheckBox("Open read-only (mode=ro)")
+        self.immutable_check = QCheckBox("Immutable file (no locking; only for files nothing else writes)")
+        self.immutable_check.toggled.connect(self._immutable_toggled)
+        self.query_only_check = QCheckBox("Refuse writes (query_only)")
+        self.mmap_spin = QSpinBox()
+        self.mmap_spin.setRange(0, 64 * 1024)
+        self.mmap_spin.setSuffix(" MB")
+        self.mmap_spin.setSpecialValueText("Off")
+        self.cache_spin = QSpinBox()
+        self.cache_spin.setRange(0, 16 * 1024)
+        self.cache_spin.setSuffix(" MB")
+        self.cache_spin.setSpecialValueText("SQLite default")
+        self.temp_store_combo = QComboBox()
+        self.temp_store_combo.addItems(TEMP_STORE_MODES)
+        preset_btn = QPushButton("Use Browsing Preset")
+        preset_btn.setToolTip("Read-only, 1 GB memory map, 256 MB page cache, temp tables in memory")
+        preset_btn.clicked.connect(lambda: self.set_profile(normalize(BROWSING_PROFILE)))
+
+        profile_form = QFormLayout(group)
+        profile_form.addRow(self.read_only_check)
+        profile_form.addRow(self.immutable_check)
+        profile_form.addRow(self.query_only_check)
+        profile_form.addRow("Memory map (mmap_size):", self.mmap_spin)
+        profile_form.addRow("Page cache (cache_size):", self.cache_spin)
+        profile_form.addRow("Temp store:", self.temp_store_combo)
+        profile_form.addRow("", preset_btn)
+        return group
+
+    def _immutable_toggled(self, checked):
+        # immutable=1 implies a read-only open
+        if checked:
+            self.read_only_check.setChecked(True)
+        self.read_only_check.setEnabled(not checked)
+
+    def set_profile(self, profile):
+        self.immutable_check.setChecked(profile["immutable"])
+        self.read_only_check.setChecked(profile["read_only"] or profile["immutable"])
+        self.query_only_check.setChecked(profile["query_only"])
+        self.mmap_spin.setValue(int(profile["mmap_size_mb"]))
+        self.cache_spin.setValue(int(profile["cache_size_mb"]))
+        self.temp_store_combo.setCurrentText(profile["temp_store"])
+
+    def get_profile(self):
+        return {
+            "read_only": self.read_only_check.isChecked(),
+            "immutable": self.immutable_check.isChecked(),
+            "query_only": self.query_only_check.isChecked(),
+            "mmap_size_mb": self.mmap_spin.value(),
+            "cache_size_mb": self.cache_spin.value(),
+            "temp_store": self.temp_store_combo.currentText(),
+        }
+
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Select SQLite DB", "", "SQLite Database (*.db *.sqlite *.sqlite3)")
@@ -81,16 +142,53 @@ class SQLiteConnectionDialog(QDialog):
         return {
             "name": self.name_input.text(),
             "db_path": self.path_input.text(),
+            "sqlite_profile": self.get_profile(),
             "id": self.conn_data.get("id") if self.conn_data else None
         }
 
 
+# --- Signals class for table stats loaded off the UI thread ---
+class TableStatsSignals(QObject):
+    finished = pyqtSignal(object)  # table name -> (rows, size)
+    error = pyqtSignal(str)
+
+
+class RunnableTableStats(QRunnable):
+    """Reads row estimates and sizes on a pool thread; dbstat can scan the whole file."""
+
+    def __init__(self, connector, conn_data, table_names, signals):
+        super().__init__()
+        self.connector = connector
+        self.conn_data = conn_data
+        self.table_names = table_names
+        self.signals = signals
+
+    def run(self):
+        try:
+            conn = self.connector.connect(self.conn_data)
+            try:
+                tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                stats = self.connector.fetch_table_stats(conn, [name for name in self.table_names if name in tables])
+            finally:
+                self.connector.close(conn)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(stats)
+
+
 class SQLiteConnector(DBConnector):
+    # dbstat visits every page of the file, so it is skipped for files larger than this
+    DBSTAT_MAX_FILE_BYTES = 256 * 1024 * 1024
+
+    def __init__(self):
+        self._stats_signals = None  # the latest stats load; older ones are ignored
+
     def connect(self, conn_data):
         db_path = conn_data.get("db_path")
         if not db_path or not os.path.exists(db_path):
             raise ConnectionError(f"SQLite DB path not found: {db_path}")
-        return sqlite.connect(db_path)
+        return connect_sqlite(db_path, conn_data.get("sqlite_profile"))
 
     def close(self, conn):
         if conn:
@@ -118,7 +216,7 @@ class SQLiteConnector(DBConnector):
 
     def load_schema(self, conn_data, schema_model, status_callback):
         schema_model.clear()
-        schema_model.setHorizontalHeaderLabels(["Tables & Views"])
+        schema_model.setHorizontalHeaderLabels(["Tables & Views", "Rows (est.)", "Size"])
         db_path = conn_data.get("db_path")
         if not db_path or not os.path.exists(db_path):
             status_callback(f"Error: SQLite DB path not found: {db_path}", 5000)
@@ -135,9 +233,95 @@ class SQLiteConnector(DBConnector):
                 item = QStandardItem(icon, name)
                 item.setEditable(False)
                 item.setData({'db_type': 'sqlite', 'conn_data': conn_data}, Qt.ItemDataRole.UserRole)
-                schema_model.appendRow(item)
+                schema_model.appendRow([item, self._stat_item(), self._stat_item()])
+            self._load_table_stats(conn_data, [name for name, type in tables if type == 'table'],
+                                   schema_model, status_callback)
         except Exception as e:
             status_callback(f"Error loading SQLite schema: {e}", 5000)
 
+    def _stat_item(self, text=""):
+        stat_item = QStandardItem(text)
+        stat_item.setEditable(False)
+        stat_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return stat_item
+
+    def fetch_table_stats(self, conn, table_names):
+        """Row estimates and sizes per table, each from a single bulk query.
+
+        Rows come from sqlite_stat1 (written by ANALYZE); tables it does not cover
+        fall back to MAX(rowid), which is an index seek. Sizes come from the dbstat
+        virtual table when SQLite was built with it.
+        """
+        cursor = conn.cursor()
+        rows = {}
+        try:
+            cursor.execute("SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl")
+            rows = dict(cursor.fetchall())
+        except sqlite.Error:
+            pass  # Never analyzed
+
+        missing = [name for name in table_names if name not in rows]
+        if missing:
+            union = " UNION ALL ".join(
+                "SELECT ?, (SELECT COALESCE(MAX(rowid), 0) FROM \"{}\")".format(name.replace('"', '""')) for name in missing)
+            try:
+                cursor.execute(union, missing)
+                rows.update(cursor.fetchall())
+            except sqlite.Error:
+                # A WITHOUT ROWID table breaks the combined query; estimate the rest one by one
+                for name in missing:
+                    try:
+                        cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM \"{}\"".format(name.replace('"', '""')))
+                        rows[name] = cursor.fetchone()[0]
+                    except sqlite.Error:
+                        pass
+
+        sizes = {}
+        db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+        if db_path and os.path.getsize(db_path) <= self.DBSTAT_MAX_FILE_BYTES:
+            try:
+                cursor.execute("""
+                    SELECT COALESCE(m.tbl_name, d.name), SUM(d.pgsize)
+                    FROM dbstat d LEFT JOIN sqlite_master m ON m.name = d.name
+                    WHERE d.aggregate = TRUE GROUP BY 1
+                """)
+                sizes = dict(cursor.fetchall())
+            except sqlite.Error:
+                pass  # Built without SQLITE_ENABLE_DBSTAT_VTAB
+        return {name: (rows.get(name), sizes.get(name)) for name in table_names}
+
+    def _apply_table_stats(self, schema_model, stats):
+        for row in range(schema_model.rowCount()):
+            name_item = schema_model.item(row, 0)
+            if name_item is None or schema_model.item(row, 1) is None:
+                continue
+            table_rows, size = stats.get(name_item.text(), (None, None))
+            schema_model.item(row, 1).setText(format_count(table_rows, approximate=True) if name_item.text() in stats else "")
+            schema_model.item(row, 2).setText(format_size(size) if size is not None else "")
+
+    def refresh_table_stats(self, conn_data, schema_model, status_callback):
+        table_names = [schema_model.item(row, 0).text() for row in range(schema_model.rowCount())
+                       if schema_model.item(row, 0).data(Qt.ItemDataRole.UserRole)]
+        self._load_table_stats(conn_data, table_names, schema_model, status_callback)
+
+    def _load_table_stats(self, conn_data, table_names, schema_model, status_callback):
+        """Fills the Rows and Size columns once RunnableTableStats is done."""
+        signals = TableStatsSignals()
+        signals.finished.connect(lambda stats: self._table_stats_loaded(signals, conn_data, schema_model, stats))
+        signals.error.connect(lambda message: status_callback(f"Error loading row estimates: {message}", 5000))
+        self._stats_signals = signals
+        QThreadPool.globalInstance().start(RunnableTableStats(self, conn_data, table_names, signals))
+
+    def _table_stats_loaded(self, signals, conn_data, schema_model, stats):
+        if signals is not self._stats_signals:
+            return  # Superseded by a newer load
+        self._stats_signals = None
+        first = schema_model.item(0, 0)
+        item_data = first.data(Qt.ItemDataRole.UserRole) if first is not None else None
+        if not item_data or item_data.get('db_type') != 'sqlite' \
+                or item_data['conn_data'].get('id') != conn_data.get('id'):
+            return  # The tree shows another connection by now
+        self._apply_table_stats(schema_model, stats)
+
     def get_connection_dialog(self, parent=None, conn_data=None, is_editing=False):
         return SQLiteConnectionDialog(parent, conn_data)
\ No newline at end of file
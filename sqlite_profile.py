@@ -0,0 +1,89 @@
+# sqlite_profile.py
+# Per-connection SQLite performance profile: read-only URI flags plus cache/mmap PRAGMAs.
+import json
+import os
+import sqlite3 as sqlite
+from pathlib import Path
+from urllib.parse import urlencode
+
+TEMP_STORE_MODES = ("default", "file", "memory")
+
+# Every key is optional in a stored profile; missing keys take these values
+DEFAULT_PROFILE = {
+    "read_only": False,    # URI mode=ro
+    "immutable": False,    # URI immutable=1: no locking or change detection at all
+    "query_only": False,   # PRAGMA query_only, refuses writes even on a writable file
+    "mmap_size_mb": 0,     # PRAGMA mmap_size; 0 leaves memory mapping off
+    "cache_size_mb": 0,    # PRAGMA cache_size; 0 keeps SQLite's default (~2 MB)
+    "temp_store": "default",
+}
+
+# Suggested for browsing large analytics files
+BROWSING_PROFILE = dict(DEFAULT_PROFILE, read_only=True, query_only=True,
+                        mmap_size_mb=1024, cache_size_mb=256, temp_store="memory")
+
+
+def normalize(profile):
+    """A complete profile dict from a stored (possibly partial or JSON) one."""
+    if isinstance(profile, str):
+        profile = json.loads(profile) if profile else None
+    merged = dict(DEFAULT_PROFILE)
+    merged.update(profile or {})
+    if merged["temp_store"] not in TEMP_STORE_MODES:
+        merged["temp_store"] = "default"
+    return merged
+
+
+def to_json(profile):
+    """Stored form; None when the profile changes nothing, so old rows and new look alike."""
+    profile = normalize(profile)
+    return None if profile == DEFAULT_PROFILE else json.dumps(profile, sort_keys=True)
+
+
+def connect_sqlite(db_path, profile=None, **kwargs):
+    """sqlite3.connect with the profile's URI flags and PRAGMAs applied."""
+    profile = normalize(profile)
+    flags = {}
+    if profile["read_only"] or profile["immutable"]:
+        flags["mode"] = "ro"
+    if profile["immutable"]:
+        flags["immutable"] = 1
+    if flags:
+        # A URI is needed for the flags; as_uri() also percent-encodes the path
+        uri = f"{Path(os.path.abspath(db_path)).as_uri()}?{urlencode(flags)}"
+        conn = sqlite.connect(uri, uri=True, **kwargs)
+    else:
+        conn = sqlite.connect(db_path, **kwargs)
+    try:
+        if profile["mmap_size_mb"]:
+            conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size_mb']) * 1024 * 1024}")
+        if profile["cache_size_mb"]:
+            # Negative cache_size is in KiB rather than pages
+            conn.execute(f"PRAGMA cache_size = -{int(profile['cache_size_mb']) * 1024}")
+        if profile["temp_store"] != "default":
+            conn.execute(f"PRAGMA temp_store = {profile['temp_store'].upper()}")
+        if profile["query_only"]:
+            conn.execute("PRAGMA query_only = ON")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def describe(profile):
+    """Short summary for tooltips, e.g. 'read-only, mmap 1024 MB, cache 256 MB'."""
+    profile = normalize(profile)
+    parts = []
+    if profile["immutable"]:
+        parts.append("immutable")
+    elif profile["read_only"]:
+        parts.append("read-only")
+    if profile["query_only"]:
+        parts.append("query only")
+    if profile["mmap_size_mb"]:
+        parts.append(f"mmap {profile['mmap_size_mb']} MB")
+    if profile["cache_size_mb"]:
+        parts.append(f"cache {profile['cache_size_mb']} MB")
+    if profile["temp_store"] != "default":
+        parts.append(f"temp store in {profile['temp_store']}")
+    return ", ".join(parts) or "default settings"
@@ -0,0 +1,57 @@
+# startup.py
+import time
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from db_manager import DatabaseManager
+
+
+class StartupTrace:
+    """Records named startup milestones (in ms) relative to an origin timestamp."""
+
+    def __init__(self, origin=None, budget_ms=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.budget_ms = budget_ms or {}
+        self.marks = {}
+
+    def mark(self, name):
+        # Only the first occurrence of a milestone counts
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.origin) * 1000
+        return self.marks[name]
+
+    def over_budget(self):
+        return [(name, self.marks[name], budget)
+                for name, budget in self.budget_ms.items()
+                if name in self.marks and self.marks[name] > budget]
+
+    def report(self):
+        parts = []
+        for name, ms in sorted(self.marks.items(), key=lambda kv: kv[1]):
+            budget = self.budget_ms.get(name)
+            suffix = f" (budget {budget} ms)" if budget is not None else ""
+            parts.append(f"{name}={ms:.0f} ms{suffix}")
+        return "Startup: " + ", ".join(parts)
+
+
+# --- Signals class for the deferred startup loader ---
+class StartupSignals(QObject):
+    loaded = pyqtSignal(object, list, list)
+    error = pyqtSignal(str)
+
+
+class RunnableStartupLoad(QRunnable):
+    """Opens hierarchy.db (running migrations) and reads the connection store off the UI thread."""
+
+    def __init__(self, signals, db_file='hierarchy.db'):
+        super().__init__()
+        self.signals = signals
+        self.db_file = db_file
+
+    def run(self):
+        try:
+            db_manager = DatabaseManager(self.db_file)
+            hierarchy = db_manager.get_all_connections_hierarchy()
+            joined = db_manager.get_all_joined_connections()
+            self.signals.loaded.emit(db_manager, hierarchy, joined)
+        except Exception as e:
+            self.signals.error.emit(str(e))
@@ -0,0 +1,385 @@
+# table_browser.py
+import math
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+from result_decoder import LargeValue, PREVIEW_BYTES, PREVIEW_CHARS
+
+
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class TableBrowser:
+    """Keyset pagination state for browsing one table page by page.
+
+    The key is the rowid (SQLite), the primary key, or on Postgres tables without
+    one the physical ctid, paged by block ranges so no page needs a full sort.
+    Views fall back to LIMIT/OFFSET and cannot jump to the tail.
+
+    With defer_large, bytea/text-like columns are fetched as size + preview only
+    and the full value is read by key when a cell viewer asks for it.
+    """
+    PAGE_SIZE = 500
+
+    def __init__(self, item_data, table_name, page_size=None, defer_large=False):
+        self.db_type = item_data.get('db_type')
+        self.schema_name = item_data.get('schema_name')
+        self.table_name = table_name
+        self.conn_data = item_data.get('conn_data')
+        self.page_size = page_size or self.PAGE_SIZE
+        self.key_mode = None  # 'rowid', 'pk', 'ctid' or 'offset'
+        self.key_columns = []
+        self.key_exprs = []
+        self.first_key = None
+        self.last_key = None
+        self.at_head = True
+        self.at_tail = False
+        self.busy = False
+        # ctid mode bookkeeping
+        self.block_count = 0
+        self.blocks_per_page = 1
+        self.first_block = 0
+        self.next_block = 0
+        # offset mode bookkeeping
+        self.offset = 0
+        # Deferred column specs: (name, None | 'binary' | 'text')
+        self.defer_large = defer_large
+        self.columns = []
+
+    @property
+    def qualified_name(self):
+        if self.db_type == 'postgres':
+            return f"{quote_ident(self.schema_name)}.{quote_ident(self.table_name)}"
+        return quote_ident(self.table_name)
+
+    @property
+    def placeholder(self):
+        return "%s" if self.db_type == 'postgres' else "?"
+
+    @property
+    def can_jump_to_tail(self):
+        return self.key_mode != 'offset'
+
+    def describe_key(self):
+        if self.key_mode == 'pk':
+            return "primary key (" + ", ".join(self.key_columns) + ")"
+        return {'rowid': "rowid", 'ctid': "ctid block ranges", 'offset': "LIMIT/OFFSET"}.get(self.key_mode, "")
+
+    # --- Key discovery (runs in the worker thread) ---
+    def resolve_key(self, conn):
+        if self.key_mode is not None:
+            return
+        cursor = conn.cursor()
+        if self.db_type == 'sqlite':
+            self._resolve_sqlite_key(cursor)
+        else:
+            self._resolve_postgres_key(cursor)
+        # Deferred values are re-read by key, which views (offset mode) do not have
+        if self.defer_large and self.key_mode != 'offset':
+            self._resolve_columns(cursor)
+
+    def _resolve_columns(self, cursor):
+        if self.db_type == 'sqlite':
+            cursor.execute(f"PRAGMA table_info({quote_ident(self.table_name)})")
+            for col in cursor.fetchall():
+                declared = (col[2] or "").upper()
+                # SQLite's affinity rules, in their order: INT wins over CHAR ("POINT" is an integer)
+                if "INT" in declared:
+                    kind = None
+                elif "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+                    kind = 'text'
+                elif "BLOB" in declared:
+                    kind = 'binary'
+                else:
+                    kind = None
+                self.columns.append((col[1], kind))
+        else:
+            cursor.execute("""
+                SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a
+                JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s AND c.relname = %s AND a.attnum > 0 AND NOT a.attisdropped
+                ORDER BY a.attnum
+            """, (self.schema_name, self.table_name))
+            for name, type_name in cursor.fetchall():
+                base_type = type_name.split('(')[0]  # character varying(255) -> character varying
+                if base_type == 'bytea':
+                    kind = 'binary'
+                elif base_type in ('text', 'json', 'jsonb', 'xml', 'character varying', 'character'):
+                    kind = 'text'
+                else:
+                    kind = None
+                self.columns.append((name, kind))
+
+    def _deferred_exprs(self, name, kind):
+        column = quote_ident(name)
+        if self.db_type == 'sqlite':
+            size = f"length({column})"
+            preview = f"substr({column}, 1, {PREVIEW_BYTES if kind == 'binary' else PREVIEW_CHARS})"
+        elif kind == 'binary':
+            size = f"octet_length({column})"
+            preview = f"substring({column} from 1 for {PREVIEW_BYTES})"
+        else:
+            size = f"char_length({column}::text)"
+            preview = f"left({column}::text, {PREVIEW_CHARS})"
+        return f"{size}, {preview}"
+
+    def _resolve_sqlite_key(self, cursor):
+        cursor.execute("SELECT type, sql FROM sqlite_master WHERE name = ?", (self.table_name,))
+        row = cursor.fetchone()
+        if not row or row[0] != 'table':
+            self.key_mode = 'offset'
+            return
+        if "without rowid" in (row[1] or "").lower():
+            cursor.execute(f"PRAGMA table_info({quote_ident(self.table_name)})")
+            pk = sorted((col[5], col[1]) for col in cursor.fetchall() if col[5] > 0)
+            self.key_mode = 'pk'
+            self.key_columns = [name for _, name in pk]
+            self.key_exprs = [quote_ident(name) for name in self.key_columns]
+        else:
+            self.key_mode = 'rowid'
+            self.key_columns = ['rowid']
+            self.key_exprs = ['rowid']
+
+    def _resolve_postgres_key(self, cursor):
+        cursor.execute("""
+            SELECT c.oid, c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relname = %s
+        """, (self.schema_name, self.table_name))
+        row = cursor.fetchone()
+        if not row or row[1] not in ('r', 'm', 'p'):
+            self.key_mode = 'offset'
+            return
+        oid, relkind = row
+        cursor.execute("""
+            SELECT a.attname FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s AND i.indisprimary
+            ORDER BY array_position(i.indkey::int2[], a.attnum)
+        """, (oid,))
+        pk = [r[0] for r in cursor.fetchall()]
+        if pk:
+            self.key_mode = 'pk'
+            self.key_columns = pk
+            self.key_exprs = [quote_ident(name) for name in pk]
+        elif relkind == 'r':
+            # No primary key: walk the heap in ctid block ranges (TID Range Scan, PG 14+)
+            cursor.execute("""
+                SELECT pg_relation_size(%s) / current_setting('block_size')::int,
+                       CASE WHEN relpages > 0 AND reltuples > 0 THEN reltuples / relpages ELSE 0 END
+                FROM pg_class WHERE oid = %s
+            """, (oid, oid))
+            block_count, tuples_per_block = cursor.fetchone()
+            self.key_mode = 'ctid'
+            self.key_columns = ['ctid']
+            self.key_exprs = ['ctid']
+            self.block_count = int(block_count)
+            if tuples_per_block:
+                self.blocks_per_page = max(1, math.ceil(self.page_size / tuples_per_block))
+            else:
+                self.blocks_per_page = 8
+        else:
+            self.key_mode = 'offset'
+
+    # --- Query building ---
+    def _select_list(self):
+        if self.key_mode == 'offset':
+            return "*"
+        if self.columns:
+            exprs = [quote_ident(name) if kind is None else self._deferred_exprs(name, kind)
+                     for name, kind in self.columns]
+            return ", ".join(self.key_exprs + exprs)
+        return ", ".join(self.key_exprs) + ", *"
+
+    def display_columns(self, described_columns):
+        """Grid column names for a page, given the cursor's column names."""
+        if self.columns:
+            return [name for name, _ in self.columns]
+        key_width = 0 if self.key_mode == 'offset' else len(self.key_exprs)
+        return described_columns[key_width:]
+
+    def value_query(self, column):
+        """Returns the SQL fetching one column's full value by key (params: the key tuple)."""
+        if self.key_mode == 'ctid':
+            where = "ctid = %s::tid"
+        else:
+            where = f"{self._key_tuple_sql()} = {self._params_tuple_sql()}"
+        return f"SELECT {quote_ident(column)} FROM {self.qualified_name} WHERE {where}"
+
+    def _key_tuple_sql(self):
+        exprs = ", ".join(self.key_exprs)
+        return f"({exprs})" if len(self.key_exprs) > 1 else exprs
+
+    def _params_tuple_sql(self):
+        marks = ", ".join([self.placeholder] * len(self.key_exprs))
+        return f"({marks})" if len(self.key_exprs) > 1 else marks
+
+    def page_query(self, direction):
+        """Returns (sql, params) for direction 'head', 'next', 'prev' or 'tail'."""
+        select = f"SELECT {self._select_list()} FROM {self.qualified_name}"
+        if self.key_mode == 'offset':
+            offset = 0 if direction == 'head' else self.offset
+            return f"{select} LIMIT {self.page_size} OFFSET {offset}", None
+        if self.key_mode == 'ctid':
+            return self._ctid_query(select, direction)
+        order = ", ".join(self.key_exprs)
+        order_desc = ", ".join(f"{expr} DESC" for expr in self.key_exprs)
+        limit = f"LIMIT {self.page_size}"
+        if direction == 'head':
+            return f"{select} ORDER BY {order} {limit}", None
+        if direction == 'next':
+            return (f"{select} WHERE {self._key_tuple_sql()} > {self._params_tuple_sql()} ORDER BY {order} {limit}",
+                    tuple(self.last_key))
+        if direction == 'prev':
+            return (f"{select} WHERE {self._key_tuple_sql()} < {self._params_tuple_sql()} ORDER BY {order_desc} {limit}",
+                    tuple(self.first_key))
+        # tail: read the last page backwards through the key index
+        return f"{select} ORDER BY {order_desc} {limit}", None
+
+    def _ctid_query(self, select, direction):
+        if direction == 'head':
+            start = 0
+        elif direction == 'next':
+            start = self.next_block
+        elif direction == 'prev':
+            start = max(0, self.first_block - self.blocks_per_page)
+        else:
+            start = max(0, self.block_count - self.blocks_per_page)
+        end = self.first_block if direction == 'prev' else start + self.blocks_per_page
+        if direction == 'tail':
+            end = max(end, self.block_count + 1)
+        sql = f"{select} WHERE ctid >= %s::tid AND ctid < %s::tid ORDER BY ctid"
+        return sql, (f"({start},0)", f"({end},0)")
+
+    # --- Page bookkeeping ---
+    def consume(self, direction, rows):
+        """Updates the cursor state from a fetched page and returns the display rows in key order."""
+        key_width = 0 if self.key_mode == 'offset' else len(self.key_exprs)
+        if self.key_mode not in ('offset', 'ctid') and direction in ('prev', 'tail'):
+            rows = list(reversed(rows))
+
+        if self.key_mode == 'offset':
+            if direction == 'head':
+                self.offset = 0
+            self.offset += len(rows)
+            self.at_tail = len(rows) < self.page_size
+            return rows
+        if self.key_mode == 'ctid':
+            self._consume_ctid(direction, rows)
+        else:
+            exhausted = len(rows) < self.page_size
+            if direction == 'head':
+                self.at_head, self.at_tail = True, exhausted
+            elif direction == 'tail':
+                self.at_head, self.at_tail = exhausted, True
+            elif direction == 'next':
+                self.at_tail = exhausted
+            else:
+                self.at_head = exhausted
+            if rows:
+                if direction != 'next':
+                    self.first_key = rows[0][:key_width]
+                if direction != 'prev':
+                    self.last_key = rows[-1][:key_width]
+        if self.columns:
+            return [self._expand_deferred(row, key_width) for row in rows]
+        return [row[key_width:] for row in rows]
+
+    def _expand_deferred(self, row, key_width):
+        key = tuple(row[:key_width])
+        values = []
+        position = key_width
+        for name, kind in self.columns:
+            if kind is None:
+                values.append(row[position])
+                position += 1
+                continue
+            size, preview = row[position], row[position + 1]
+            position += 2
+            if isinstance(preview, memoryview):
+                preview = preview.tobytes()
+            if size is None:
+                values.append(None)
+            elif size <= (PREVIEW_BYTES if kind == 'binary' else PREVIEW_CHARS):
+                values.append(preview)  # The preview already is the whole value
+            else:
+                values.append(LargeValue(size, preview, kind == 'binary', key=key, column=name))
+        return tuple(values)
+
+    def _consume_ctid(self, direction, rows):
+        if direction == 'head':
+            self.first_block, self.next_block = 0, self.blocks_per_page
+        elif direction == 'next':
+            self.next_block += self.blocks_per_page
+        elif direction == 'prev':
+            self.first_block = max(0, self.first_block - self.blocks_per_page)
+        else:
+            self.first_block = max(0, self.block_count - self.blocks_per_page)
+            self.next_block = self.block_count + 1
+        self.at_head = self.first_block == 0
+        self.at_tail = self.next_block > self.block_count
+
+
+# --- Signals class for page fetches ---
+class BrowseSignals(QObject):
+    page = pyqtSignal(str, list, list)
+    error = pyqtSignal(str)
+
+
+class RunnableBrowsePage(QRunnable):
+    def __init__(self, browser, direction, signals):
+        super().__init__()
+        self.browser = browser
+        self.direction = direction
+        self.signals = signals
+
+    def run(self):
+        conn = None
+        try:
+            conn = open_connection(self.browser.conn_data)
+            self.browser.resolve_key(conn)
+            sql, params = self.browser.page_query(self.direction)
+            cursor = conn.cursor()
+            if params is None:
+                cursor.execute(sql)
+            else:
+                cursor.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+            self.signals.page.emit(self.direction, self.browser.display_columns(columns), rows)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            if conn:
+                conn.close()
+
+
+# --- Signals class for fetching one deferred value ---
+class ValueSignals(QObject):
+    fetched = pyqtSignal(str, object)
+    error = pyqtSignal(str)
+
+
+class RunnableFetchValue(QRunnable):
+    def __init__(self, browser, large_value, signals):
+        super().__init__()
+        self.browser = browser
+        self.large_value = large_value
+        self.signals = signals
+
+    def run(self):
+        conn = None
+        try:
+            conn = open_connection(self.browser.conn_data)
+            cursor = conn.cursor()
+            cursor.execute(self.browser.value_query(self.large_value.column), self.large_value.key)
+            row = cursor.fetchone()
+            value = row[0] if row else None
+            if isinstance(value, memoryview):
+                value = value.tobytes()
+            self.signals.fetched.emit(self.large_value.column, value)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,436 @@
+# table_copy.py
+# Copies a table between connections (PostgreSQL <-> SQLite, or server to server).
+# Rows are streamed in batches inside one target transaction, so memory stays flat.
+import datetime
+import io
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from decimal import Decimal
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+from query_worker import open_connection
+from result_store import FETCH_BATCH_ROWS
+from table_browser import quote_ident
+
+IF_EXISTS_MODES = ("fail", "append", "replace")
+# Server-to-server copies pipe COPY text through a queue of chunks of about this size
+PIPE_CHUNK_BYTES = 1 << 16
+PIPE_MAX_CHUNKS = 16
+
+
+def _kind(conn_data):
+    return "sqlite" if conn_data.get("db_path") else "postgres"
+
+
+def qualified(kind, schema, table):
+    if kind == "postgres":
+        return f"{quote_ident(schema or 'public')}.{quote_ident(table)}"
+    return quote_ident(table)
+
+
+# --- Source description ---
+def describe_table(conn, kind, schema, table):
+    """[(name, declared type, not null)] and the primary key column names, in order."""
+    cursor = conn.cursor()
+    if kind == "sqlite":
+        cursor.execute(f"PRAGMA table_info({quote_ident(table)})")
+        info = cursor.fetchall()
+        if not info:
+            raise ValueError(f"Table {table} not found.")
+        columns = [(name, col_type or "", bool(notnull)) for _, name, col_type, notnull, _, _ in info]
+        primary_key = [name for _, name, _, _, _, pk in sorted(info, key=lambda r: r[5]) if pk]
+        return columns, primary_key
+    relation = qualified(kind, schema, table)
+    cursor.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull
+        FROM pg_attribute a
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """, (relation,))
+    columns = cursor.fetchall()
+    cursor.execute("""
+        SELECT a.attname
+        FROM pg_index i JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = %s::regclass AND i.indisprimary
+        ORDER BY array_position(i.indkey::int2[], a.attnum)
+    """, (relation,))
+    return columns, [name for (name,) in cursor.fetchall()]
+
+
+# --- Type mapping ---
+_PG_TO_SQLITE = (
+    (r"^(smallint|integer|bigint|boolean|smallserial|serial|bigserial)\b", "INTEGER"),
+    (r"^(real|double precision)\b", "REAL"),
+    (r"^(numeric|decimal|money)\b", "NUMERIC"),
+    (r"^bytea\b", "BLOB"),
+)
+
+_SQLITE_TO_PG = (
+    # Checked in order, mirroring SQLite's own affinity rules where they apply
+    (r"BOOL", "boolean"),
+    (r"INT", "bigint"),
+    (r"CHAR|CLOB|TEXT", "text"),
+    (r"BLOB", "bytea"),
+    (r"REAL|FLOA|DOUB", "double precision"),
+    (r"^(DATETIME|TIMESTAMP)", "timestamp"),
+    (r"^DATE$", "date"),
+    (r"NUM|DEC", "numeric"),
+)
+
+
+def map_type(declared, source_kind, target_kind):
+    """Target column type for a source column's declared type."""
+    if source_kind == target_kind:
+        return declared or ("TEXT" if target_kind == "sqlite" else "text")
+    if target_kind == "sqlite":
+        for pattern, mapped in _PG_TO_SQLITE:
+            if re.search(pattern, declared):
+                return mapped
+        return "TEXT"  # dates, json, uuid, arrays... keep their text form
+    upper = (declared or "").upper()
+    for pattern, mapped in _SQLITE_TO_PG:
+        if re.search(pattern, upper):
+            return mapped
+    return "text"  # no declared type: values can be anything
+
+
+# --- Value encoding for the target ---
+def _sqlite_value(value):
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)  # Decimal, UUID, timedelta, ranges...
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_literal(values):
+    """A PostgreSQL array literal, e.g. {1,NULL,"a b"}, for a (nested) list."""
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, list):
+            elements.append(_array_literal(value))
+        elif isinstance(value, bool):
+            elements.append("t" if value else "f")
+        elif isinstance(value, (int, float, Decimal)):
+            elements.append(repr(value) if isinstance(value, float) else str(value))
+        else:
+            text = _text_value(value)
+            elements.append('"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(elements) + "}"
+
+
+def _text_value(value):
+    if isinstance(value, datetime.timedelta):
+        # str() gives "1 day, 2:00:00", which PostgreSQL doesn't parse
+        return f"{value.days} days {value.seconds} seconds {value.microseconds} microseconds"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    return str(value)
+
+
+def _copy_value(value, col_type=""):
+    """One field in COPY ... FROM STDIN text format, for a column of (source) type col_type."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, list) and col_type.endswith("]"):
+        value = _array_literal(value)
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str)
+    elif isinstance(value, float):
+        value = repr(value)
+    elif not isinstance(value, (str, int, Decimal, uuid.UUID)):
+        value = _text_value(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _CopyPipe:
+    """File-like pipe from COPY ... TO STDOUT (written on a helper thread) into
+    COPY ... FROM STDIN (read on the copy's thread), holding only a few chunks."""
+
+    def __init__(self, is_cancelled, on_rows, every_rows):
+        self.is_cancelled = is_cancelled
+        self.on_rows = on_rows  # Called with the row count about once per every_rows rows
+        self.every_rows = every_rows
+        self.rows = 0
+        self._queue = queue.Queue(maxsize=PIPE_MAX_CHUNKS)
+        self._parts = []
+        self._size = 0
+        self._pending = b""
+        self._reader_done = False
+
+    # Writer side (source connection)
+    def write(self, data):
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= PIPE_CHUNK_BYTES:
+            self._put(b"".join(self._parts))
+            self._parts, self._size = [], 0
+
+    def close_writer(self, error=None):
+        """Flushes and marks the end of the data; error makes the reader fail with it."""
+        try:
+            if error is None and self._parts:
+                self._put(b"".join(self._parts))
+            self._put(error or b"")
+        except _Cancelled:
+            pass
+
+    def _put(self, item):
+        while not self._reader_done:
+            try:
+                self._queue.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                pass
+        raise _Cancelled()  # The target side stopped reading
+
+    # Reader side (target connection)
+    def read(self, size=-1):
+        while not self._pending:
+            if self.is_cancelled():
+                raise _Cancelled()
+            try:
+                item = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                return b""
+            before = self.rows
+            self.rows += item.count(b"\n")  # Text format escapes newlines inside values
+            if self.rows // self.every_rows != before // self.every_rows:
+                self.on_rows(self.rows)
+            self._pending = item
+        if size is None or size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def close_reader(self):
+        self._reader_done = True
+
+
+class TableCopy:
+    """Copies source table rows into a (new or existing) target table.
+
+    source and target are (conn_data, schema, table); schema is ignored for SQLite.
+    """
+
+    def __init__(self, source, target, if_exists="fail", batch_size=FETCH_BATCH_ROWS,
+                 is_cancelled=None, progress=None):
+        self.source = source
+        self.target = target
+        self.if_exists = if_exists
+        self.batch_size = batch_size
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.progress = progress or (lambda rows, rate: None)
+
+    def run(self):
+        source_data, source_schema, source_table = self.source
+        target_data, target_schema, target_table = self.target
+        source_kind, target_kind = _kind(source_data), _kind(target_data)
+        source_name = qualified(source_kind, source_schema, source_table)
+        target_name = qualified(target_kind, target_schema, target_table)
+        if source_data.get("id") == target_data.get("id") and source_name == target_name:
+            raise ValueError("Source and target are the same table.")
+
+        source_conn = open_connection(source_data)
+        target_conn = open_connection(target_data)
+        try:
+            columns, primary_key = describe_table(source_conn, source_kind, source_schema, source_table)
+            if target_kind == "sqlite":
+                target_conn.isolation_level = None  # BEGIN/COMMIT below cover the DDL too
+                target_conn.execute("BEGIN")
+            try:
+                self._prepare_target(target_conn, target_kind, target_name, target_schema,
+                                     target_table, columns, primary_key, source_kind)
+                copied = self._stream(source_conn, source_kind, source_name,
+                                      target_conn, target_kind, target_name, columns)
+                if copied is None:
+                    self._rollback(target_conn, target_kind)
+                    return None
+                if target_kind == "sqlite":
+                    target_conn.execute("COMMIT")
+                else:
+                    target_conn.commit()
+            except Exception:
+                self._rollback(target_conn, target_kind)
+                raise
+            return {"source": source_name, "target": target_name, "rows": copied,
+                    "columns": [(name, map_type(col_type, source_kind, target_kind))
+                                for name, col_type, _ in columns]}
+        finally:
+            source_conn.close()
+            target_conn.close()
+
+    def _rollback(self, conn, kind):
+        try:
+            if kind == "sqlite":
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            else:
+                conn.rollback()
+        except Exception:
+            pass
+
+    def _target_exists(self, cursor, kind, schema, table):
+        if kind == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        else:
+            cursor.execute("SELECT to_regclass(%s)", (qualified(kind, schema, table),))
+            return cursor.fetchone()[0] is not None
+        return cursor.fetchone() is not None
+
+    def _prepare_target(self, conn, kind, name, schema, table, columns, primary_key, source_kind):
+        cursor = conn.cursor()
+        if self._target_exists(cursor, kind, schema, table):
+            if self.if_exists == "fail":
+                raise ValueError(f"Target table {name} already exists.")
+            if self.if_exists == "append":
+                return
+            cursor.execute(f"DROP TABLE {name}")
+        definitions = [
+            f"{quote_ident(col)} {map_type(col_type, source_kind, kind)}" + (" NOT NULL" if not_null else "")
+            for col, col_type, not_null in columns]
+        if primary_key:
+            definitions.append(f"PRIMARY KEY ({', '.join(quote_ident(c) for c in primary_key)})")
+        cursor.execute(f"CREATE TABLE {name} ({', '.join(definitions)})")
+
+    def _stream(self, source_conn, source_kind, source_name, target_conn, target_kind,
+                target_name, columns):
+        """Moves every row across; returns the row count, or None if cancelled."""
+        column_list = ", ".join(quote_ident(name) for name, _, _ in columns)
+        if source_kind == target_kind == "postgres":
+            return self._pipe(source_conn, source_name, target_conn, target_name, column_list)
+        if source_kind == "sqlite":
+            cursor = source_conn.cursor()
+        else:
+            # Server-side cursor: only one batch is ever held client-side
+            cursor = source_conn.cursor(name="sqlclient_copy")
+            cursor.itersize = self.batch_size
+        cursor.execute(f"SELECT {column_list} FROM {source_name}")
+        target_cursor = target_conn.cursor()
+        insert = (f"INSERT INTO {target_name} ({column_list}) "
+                  f"VALUES ({', '.join('?' * len(columns))})")
+        copy_sql = f"COPY {target_name} ({column_list}) FROM STDIN"
+        types = [col_type for _, col_type, _ in columns]
+        start = time.time()
+        copied = 0
+        batch = cursor.fetchmany(self.batch_size)
+        while batch:
+            if self.is_cancelled():
+                return None
+            if target_kind == "sqlite":
+                target_cursor.executemany(insert, ([_sqlite_value(v) for v in row] for row in batch))
+            else:
+                buffer = io.StringIO()
+                for row in batch:
+                    buffer.write("\t".join(_copy_value(v, t) for v, t in zip(row, types)))
+                    buffer.write("\n")
+                buffer.seek(0)
+                target_cursor.copy_expert(copy_sql, buffer)
+            copied += len(batch)
+            self.progress(copied, copied / max(time.time() - start, 1e-9))
+            batch = cursor.fetchmany(self.batch_size)
+        return copied
+
+    def _pipe(self, source_conn, source_name, target_conn, target_name, column_list):
+        """PostgreSQL to PostgreSQL: values keep their server text form (arrays, ranges,
+        intervals...) instead of going through Python objects."""
+        start = time.time()
+
+        def report(rows):
+            self.progress(rows, rows / max(time.time() - start, 1e-9))
+
+        pipe = _CopyPipe(self.is_cancelled, report, self.batch_size)
+
+        def copy_out():
+            error = None
+            try:
+                source_conn.cursor().copy_expert(
+                    f"COPY (SELECT {column_list} FROM {source_name}) TO STDOUT "
+                    f"WITH (FORMAT text, ENCODING 'UTF8')", pipe)
+            except Exception as e:
+                error = e
+            pipe.close_writer(error)
+
+        writer = threading.Thread(target=copy_out, name="table-copy-out", daemon=True)
+        writer.start()
+        try:
+            target_conn.cursor().copy_expert(
+                f"COPY {target_name} ({column_list}) FROM STDIN WITH (FORMAT text, ENCODING 'UTF8')",
+                pipe)
+        except Exception:
+            # psycopg2 may wrap what read() raised
+            if self.is_cancelled():
+                return None
+            raise
+        finally:
+            pipe.close_reader()
+            writer.join(0.5)
+            if writer.is_alive():
+                source_conn.cancel()  # Stops a COPY TO that is still waiting on the server
+                writer.join()
+        report(pipe.rows)
+        return pipe.rows
+
+
+def format_summary(summary, elapsed):
+    rate = summary["rows"] / elapsed if elapsed else 0
+    lines = [f"Copied {summary['rows']:,} rows from {summary['source']} to {summary['target']}",
+             f"Time: {elapsed:.2f} sec ({rate:,.0f} rows/s)", "", "Columns:"]
+    lines.extend(f"  {name} {col_type}" for name, col_type in summary["columns"])
+    return "\n".join(lines)
+
+
+# --- Signals class for table copies ---
+class CopySignals(QObject):
+    finished = pyqtSignal(object, float)
+    progress = pyqtSignal(int, float)  # rows copied, rows/sec
+    error = pyqtSignal(str)
+
+
+class RunnableTableCopy(QRunnable):
+    def __init__(self, source, target, if_exists, signals, batch_size=FETCH_BATCH_ROWS):
+        super().__init__()
+        self.source = source
+        self.target = target
+        self.if_exists = if_exists
+        self.batch_size = batch_size
+        self.signals = signals
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            start_time = time.time()
+            summary = TableCopy(self.source, self.target, self.if_exists, self.batch_size,
+                                is_cancelled=lambda: self._is_cancelled,
+                                progress=self.signals.progress.emit).run()
+            if summary is not None and not self._is_cancelled:
+                self.signals.finished.emit(summary, time.time() - start_time)
+        except Exception as e:
+            if not self._is_cancelled:
+                self.signals.error.emit(str(e))